@@ -0,0 +1,43 @@
+"""
+Helpers shared by the benchmark scripts.
+
+The scripts are meant to be run directly from the repository root:
+
+    $ python benchmarks/<script>.py
+
+"""
+from contextlib import contextmanager
+from tempfile import TemporaryDirectory
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+DEFAULT_MAP_SIZE = 2**32
+
+
+@contextmanager
+def temporary_binlog(model, **kwargs):
+    kwargs.setdefault('map_size', DEFAULT_MAP_SIZE)
+    with TemporaryDirectory() as tmpdir:
+        with model.open(tmpdir, **kwargs) as conn:
+            yield conn
+
+
+def measure(f, *args, **kwargs):
+    """Return `(result, seconds)` of calling `f(*args, **kwargs)`."""
+    start = time.perf_counter()
+    result = f(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def print_table(headers, rows):
+    rows = [[str(c) for c in row] for row in rows]
+    widths = [max(len(str(h)), *(len(r[i]) for r in rows))
+              for i, h in enumerate(headers)]
+    line = "  ".join("%%%ds" % w for w in widths)
+    print(line % tuple(headers))
+    print(line % tuple("-" * w for w in widths))
+    for row in rows:
+        print(line % tuple(row))
@@ -0,0 +1,89 @@
+"""
+Compare the intersection of `Reader.filter` (entries, unacked registry and
+index cursor) driven by its first operand, as `ANDIterSeek` used to do,
+against the leapfrog intersection starting from the operand with fewer
+values, for indexed values of decreasing selectivity.
+
+"""
+import argparse
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.abstract import Direction
+from binlog.databases import Entries
+from binlog.index import NumericIndex
+from binlog.model import Model
+from binlog.operations import ANDIterSeek
+
+
+class BenchModel(Model):
+    bucket = NumericIndex()
+
+
+class FirstDrivenANDIterSeek(ANDIterSeek):
+    """Intersection seeking every operand to the values of the first."""
+    def __init__(self, *things):
+        super(ANDIterSeek, self).__init__(*things)
+
+    def __next__(self):
+        first, rest = self.things[0], self.things[1:]
+        if self.seeked is not None:
+            first.seek(self.seeked)
+            self.seeked = None
+        for cf in first:
+            for t in rest:
+                t.seek(cf)
+                ct = next(t)
+                if cf != ct:
+                    first.seek(ct)
+                    break
+            else:
+                self.seeked = cf + self.direction.value
+                return cf
+        raise StopIteration
+
+
+def run(conn, reader, bucket, operator):
+    db_name = conn._get_index_name('bucket')
+    with conn.data(write=False) as res:
+        with Entries.cursor(res) as cursor, \
+                reader._iterseek(Direction.F) as unacked, \
+                NumericIndex.cursor(res, db_name=db_name) as index:
+            index.dupkey = bucket
+            return sum(1 for _ in operator(cursor, unacked, index))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=200000)
+    args = parser.parse_args()
+
+    # Bucket `b` holds one in 10**b entries.
+    buckets = (1, 2, 3, 4)
+
+    def bucket_of(i):
+        for b in reversed(buckets):
+            if i % 10**b == 0:
+                return b
+        return 0
+
+    rows = []
+    with temporary_binlog(BenchModel) as conn:
+        conn.bulk_create(BenchModel(bucket=bucket_of(i))
+                         for i in range(args.entries))
+        conn.register_reader('bench')
+        with conn.reader('bench') as reader:
+            for bucket in buckets:
+                for name, operator in (('first operand',
+                                        FirstDrivenANDIterSeek),
+                                       ('leapfrog', ANDIterSeek)):
+                    count, elapsed = measure(run, conn, reader, bucket,
+                                             operator)
+                    rows.append((bucket, count, name,
+                                 "%.1f" % (elapsed * 1000)))
+
+    print_table(("bucket", "matches", "intersection", "ms"), rows)
+
+
+if __name__ == '__main__':
+    main()
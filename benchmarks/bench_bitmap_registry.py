@@ -0,0 +1,82 @@
+"""
+Compare the 'segments' and 'bitmap' registry encodings acking pks in order
+and in random order (as parallel workers do): acks/sec, in-memory size of
+the acks, commit time, stored records and bytes, and the time to check pks
+against the committed registry.
+
+"""
+import argparse
+import random
+import tracemalloc
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.connection import REGISTRY_ENCODINGS
+from binlog.databases import Registry as RegistryDB
+from binlog.model import Model
+
+
+def stored_bytes(conn, name):
+    with conn.readers(write=False) as res:
+        db = res.db[RegistryDB.named(name).get_db_name(None)]
+        with res.txn.cursor(db) as cursor:
+            return sum(len(k) + len(v) for k, v in cursor.iternext())
+
+
+def memory_size(encoding, pks):
+    """Bytes allocated by the in-memory registry of `encoding` acking `pks`."""
+    tracemalloc.start()
+    try:
+        registry = REGISTRY_ENCODINGS[encoding][0]()
+        for pk in pks:
+            registry.add(pk)
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--acks', type=int, default=200000)
+    parser.add_argument('--ratio', type=float, default=0.5,
+                        help="fraction of the pk space acked")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    space = int(args.acks / args.ratio)
+    step = max(7, space // 10**6)
+    rnd = random.Random(args.seed)
+    orders = (('in order', list(range(args.acks))),
+              ('random', rnd.sample(range(space), args.acks)))
+
+    rows = []
+    for order, pks in orders:
+        for encoding in ('segments', 'bitmap'):
+            with temporary_binlog(Model) as conn:
+                conn.register_reader('bench', encoding=encoding)
+                with conn.reader('bench') as reader:
+                    _, ack_time = measure(
+                        lambda: [reader.ack(pk) for pk in pks])
+                    _, commit_time = measure(reader.commit)
+                    stats = reader.stats()
+
+                with conn.reader('bench') as reader:
+                    registry = reader.registry
+                    _, check_time = measure(
+                        lambda: sum(pk in registry
+                                    for pk in range(0, space, step)))
+
+                rows.append((order, encoding,
+                             "%.0f" % (len(pks) / ack_time),
+                             "%.0f" % (memory_size(encoding, pks) / 1024),
+                             "%.1f" % (commit_time * 1000),
+                             stats['segments'],
+                             stored_bytes(conn, 'bench'),
+                             "%.0f" % (space / step / check_time)))
+
+    print_table(("acks", "encoding", "acks/s", "memory KB", "commit ms",
+                 "records", "bytes", "lookups/s"), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare `bulk_create` index maintenance: the previous per-entry `put`
+(new cursor and index name formatting for every entry and index) against
+the sorted single-pass write per index.
+
+"""
+import argparse
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.connection import Connection
+from binlog.index import NumericIndex
+from binlog.model import Model
+
+
+class PerEntryConnection(Connection):
+    """Index every pair on its own cursor, as `bulk_create` used to do."""
+    def _bulk_index(self, res, pending):
+        for index_name, pairs in pending.items():
+            index = self.model._indexes[index_name]
+            for key, value in pairs:
+                db_name = self._get_index_name(index_name)
+                with index.cursor(res, db_name=db_name) as cursor:
+                    if not cursor.cursor.put(key, value, dupdata=True):
+                        raise RuntimeError("Cannot index %s" % index_name)
+
+
+def make_model(n_indexes, connection_class):
+    namespace = {'idx_%d' % i: NumericIndex() for i in range(n_indexes)}
+    namespace['__meta_connection_class__'] = connection_class
+    return type('Bench%dModel' % n_indexes, (Model, ), namespace)
+
+
+def run(model, entries, batch):
+    with temporary_binlog(model) as conn:
+        total = 0
+        for start in range(0, entries, batch):
+            chunk = [model({'idx_%d' % i: (pk * 7919 + i) % 1000
+                            for i in range(len(model._indexes))})
+                     for pk in range(start, min(start + batch, entries))]
+            _, elapsed = measure(conn.bulk_create, chunk)
+            total += elapsed
+        return entries / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--batch', type=int, default=10000)
+    args = parser.parse_args()
+
+    rows = []
+    for n_indexes in (1, 3, 8):
+        old = run(make_model(n_indexes, PerEntryConnection),
+                  args.entries, args.batch)
+        new = run(make_model(n_indexes, Connection),
+                  args.entries, args.batch)
+        rows.append((n_indexes, "%.0f" % old, "%.0f" % new,
+                     "%.2fx" % (new / old)))
+
+    print_table(("indexes", "per-entry/s", "sorted/s", "speedup"), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Measure the compression of verbose event entries: stored bytes per entry,
+compression ratio, LMDB pages used by the `Entries` database and
+written/read entries per second, for every compression and threshold.
+
+"""
+import argparse
+import random
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.model import Model
+
+CASES = ((None, None),
+         ('zlib', 256),
+         ('zlib', 1024),
+         ('lzma', 256))
+
+
+def event(rnd, i):
+    return {'ts': 1500000000.0 + i / 1000,
+            'event': rnd.choice(('page_view', 'click', 'add_to_cart')),
+            'user': {'id': rnd.randrange(10**6),
+                     'country': rnd.choice(('ES', 'FR', 'DE', 'US')),
+                     'agent': ('Mozilla/5.0 (X11; Linux x86_64) '
+                               'AppleWebKit/537.36 (KHTML, like Gecko) '
+                               'Chrome/%d.0 Safari/537.36'
+                               % rnd.randrange(50, 60))},
+            'page': {'url': 'https://shop.example.com/products/%d?ref=%s'
+                            % (rnd.randrange(10**4),
+                               rnd.choice(('home', 'search', 'mail'))),
+                     'referrer': 'https://www.example.com/search?q=%d'
+                                 % rnd.randrange(10**5),
+                     'title': 'Product %d - Example shop'
+                              % rnd.randrange(10**4)},
+            'properties': {'key_%d' % k: 'value %d' % rnd.randrange(100)
+                           for k in range(rnd.randrange(5, 40))}}
+
+
+def entries_size(conn):
+    """Return `(stored value bytes, pages, overflow pages)` of Entries."""
+    with conn.data(write=False) as res:
+        stat = res.txn.stat(res.db['entries'])
+        with res.txn.cursor(res.db['entries']) as cursor:
+            size = sum(len(v) for v in cursor.iternext(keys=False))
+    pages = (stat['branch_pages'] + stat['leaf_pages']
+             + stat['overflow_pages'])
+    return size, pages, stat['overflow_pages']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    events = [event(rnd, i) for i in range(args.entries)]
+
+    rows = []
+    raw_size = None
+    for compression, threshold in CASES:
+        model = type('BenchModel', (Model, ),
+                     {'__meta_compression__': compression,
+                      '__meta_compression_threshold__': threshold})
+        with temporary_binlog(model) as conn:
+            def write():
+                for start in range(0, len(events), args.batch):
+                    conn.bulk_create(
+                        model(e) for e in events[start:start + args.batch])
+            _, write_elapsed = measure(write)
+
+            with conn.reader() as reader:
+                count, read_elapsed = measure(
+                    lambda: sum(1 for _ in reader))
+
+            size, pages, overflow = entries_size(conn)
+            if raw_size is None:
+                raw_size = size
+
+            rows.append(("none" if compression is None else compression,
+                         "-" if threshold is None else threshold,
+                         "%.1f" % (size / count),
+                         "%.2f" % (raw_size / size),
+                         pages, overflow,
+                         "%.0f" % (count / write_elapsed),
+                         "%.0f" % (count / read_elapsed)))
+
+    print_table(("compression", "threshold", "bytes/entry", "ratio",
+                 "pages", "overflow", "writes/s", "reads/s"), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Find the pks acked by reader `a` but not by reader `b` filtering the acks
+of `a` in Python against `b`, and with the `-` operator seeking through
+both registries.
+
+"""
+import argparse
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.model import Model
+from binlog.registry import Registry, S
+
+
+def python_filter(a, b):
+    return sum(1 for pk in a.registry if pk not in b.registry)
+
+
+def diff(a, b):
+    total = 0
+    it = a.registry - b.registry
+    while True:
+        try:
+            L, R = it.next_range()
+        except StopIteration:
+            return total
+        total += R - L + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pks', type=int, default=200000)
+    parser.add_argument('--behind', type=int, nargs='+',
+                        default=[10, 1000, 100000],
+                        help="pks acked by `a` and not by `b`")
+    args = parser.parse_args()
+
+    rows = []
+    for behind in args.behind:
+        with temporary_binlog(Model) as conn:
+            conn.register_reader('a')
+            conn.register_reader('b')
+            conn.save_registry('a', Registry([S(0, args.pks - 1)]))
+            conn.save_registry('b', Registry([S(0, args.pks - behind - 1)]))
+
+            for name, f in (('python filter', python_filter),
+                            ('a - b', diff)):
+                with conn.reader('a') as a, conn.reader('b') as b:
+                    count, elapsed = measure(f, a, b)
+                    a.registry.close()
+                    b.registry.close()
+                rows.append((behind, name, count,
+                             "%.2f" % (elapsed * 1000)))
+
+    print_table(("behind", "query", "pks", "ms"), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Measure creates/sec of every durability profile on the `create` and
+`bulk_create` paths.
+
+The number of fsync-like system calls is counted running each case under
+`strace` when it is available.
+
+"""
+import argparse
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.model import Model, DURABILITY_PROFILES
+
+SYNC_SYSCALLS = ('fsync', 'fdatasync', 'msync', 'sync_file_range')
+
+# % time, seconds, usecs/call, calls, [errors], syscall
+STRACE_LINE = re.compile(r'^\s*[\d.]+\s+[\d.]+\s+\d+\s+'
+                         r'(\d+)\s+(?:\d+\s+)?(\w+)$')
+
+
+def run_case(profile, path, entries, batch):
+    with temporary_binlog(Model, durability=profile) as conn:
+        if path == 'create':
+            _, elapsed = measure(
+                lambda: [conn.create(idx=i) for i in range(entries)])
+        else:
+            def bulk():
+                for start in range(0, entries, batch):
+                    conn.bulk_create([Model(idx=i)
+                                      for i in range(start,
+                                                     min(start + batch,
+                                                         entries))])
+            _, elapsed = measure(bulk)
+    return entries / elapsed
+
+
+def count_syncs(profile, path, entries, batch):
+    strace = shutil.which('strace')
+    if strace is None:
+        return None
+
+    with tempfile.NamedTemporaryFile(mode='r') as output:
+        subprocess.check_call(
+            [strace, '-f', '-c', '-o', output.name,
+             '-e', 'trace=' + ','.join(SYNC_SYSCALLS),
+             sys.executable, __file__, '--worker', profile, path,
+             '--entries', str(entries), '--batch', str(batch)],
+            stdout=subprocess.DEVNULL)
+        total = 0
+        for line in output:
+            m = STRACE_LINE.match(line)
+            if m and m.group(2) in SYNC_SYSCALLS:
+                total += int(m.group(1))
+        return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=2000)
+    parser.add_argument('--batch', type=int, default=100)
+    parser.add_argument('--worker', nargs=2, metavar=('PROFILE', 'PATH'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_case(*args.worker, args.entries, args.batch)
+        return
+
+    rows = []
+    for path in ('create', 'bulk_create'):
+        for profile in sorted(DURABILITY_PROFILES):
+            rate = run_case(profile, path, args.entries, args.batch)
+            syncs = count_syncs(profile, path, args.entries, args.batch)
+            rows.append((path, profile, "%.0f" % rate,
+                         "n/a" if syncs is None else syncs))
+
+    print_table(("path", "profile", "creates/s", "fsyncs"), rows)
+    if not shutil.which('strace'):
+        print("\nInstall strace to count fsyncs.")
+
+
+if __name__ == '__main__':
+    main()
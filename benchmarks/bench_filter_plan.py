@@ -0,0 +1,83 @@
+"""
+Compare `Reader.filter` intersecting the entries cursor, the unacked
+registry and every index cursor, as it used to do, against the planned
+filter driven by the most selective index, which skips the entries cursor
+and the registry of readers with no acked pk among the candidates.
+
+"""
+import argparse
+from contextlib import ExitStack
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.abstract import Direction
+from binlog.databases import Entries
+from binlog.index import NumericIndex
+from binlog.model import Model
+
+
+class BenchModel(Model):
+    rare = NumericIndex()
+    common = NumericIndex()
+
+
+def unplanned_filter(reader, **filters):
+    """Filter `reader` the way `Reader.filter` used to."""
+    conn = reader.connection
+    with conn.data(write=False) as res:
+        with Entries.cursor(res) as cursor, \
+                reader._iterseek(Direction.F) as unacked:
+            it = cursor & unacked
+            non_index_filter = {}
+            with ExitStack() as index_filter:
+                for key, value in filters.items():
+                    index = conn.model._indexes.get(key)
+                    if index is None:
+                        non_index_filter[key] = value
+                    else:
+                        index_cursor = index_filter.enter_context(
+                            index.cursor(res,
+                                         db_name=conn._get_index_name(key)))
+                        index_cursor.dupkey = value
+                        it &= index_cursor
+
+                for pk in it:
+                    entry = reader._get_from_cursor(res, cursor, pk)
+                    for key, value in non_index_filter.items():
+                        if entry.get(key) != value:
+                            break
+                    else:
+                        yield entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=200000)
+    args = parser.parse_args()
+
+    filters = {'common': 0, 'rare': 0, 'parity': 0}
+
+    rows = []
+    with temporary_binlog(BenchModel) as conn:
+        conn.bulk_create(BenchModel(rare=i % 1000, common=i % 2,
+                                    parity=i % 4 // 2)
+                         for i in range(args.entries))
+        conn.register_reader('bench')
+        for acked in (0, args.entries // 2):
+            with conn.reader('bench') as reader:
+                reader.ack_range(0, acked)
+
+            with conn.reader('bench') as reader:
+                plan = reader.explain(**filters)
+                for name, filter_ in (('unplanned', unplanned_filter),
+                                      ('planned', type(reader).filter)):
+                    count, elapsed = measure(
+                        lambda: sum(1 for _ in filter_(reader, **filters)))
+                    rows.append((acked, count, plan['rows'], name,
+                                 "%.2f" % (elapsed * 1000)))
+
+    print_table(("acked", "matches", "est. rows", "filter", "ms"), rows)
+
+
+if __name__ == '__main__':
+    main()
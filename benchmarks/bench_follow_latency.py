@@ -0,0 +1,82 @@
+"""
+Measure the end-to-end latency (from `create` in a writer process until the
+entry is read) of `Reader.follow` against polling with a fixed sleep as
+the old `examples/reader.py` did.
+
+"""
+from tempfile import TemporaryDirectory
+import argparse
+import multiprocessing
+import time
+
+from _common import print_table, DEFAULT_MAP_SIZE
+
+from binlog.model import Model
+
+
+def write(path, entries, interval):
+    with Model.open(path, map_size=DEFAULT_MAP_SIZE) as db:
+        for i in range(entries):
+            time.sleep(interval)
+            db.create(idx=i, ts=time.time())
+
+
+def follow(reader, entries, poll_interval):
+    for entry in reader.follow():
+        yield entry
+        if entry['idx'] == entries - 1:
+            break
+
+
+def poll(reader, entries, poll_interval):
+    seen = 0
+    while seen < entries:
+        batch = reader.read_batch(entries)
+        if not batch:
+            time.sleep(poll_interval)
+        for entry in batch:
+            reader.ack(entry)
+            seen += 1
+            yield entry
+
+
+def run_case(consume, entries, interval, poll_interval):
+    with TemporaryDirectory() as tmpdir:
+        with Model.open(tmpdir, map_size=DEFAULT_MAP_SIZE) as db:
+            db.register_reader('bench')
+            ctx = multiprocessing.get_context('spawn')
+            writer = ctx.Process(target=write,
+                                 args=(tmpdir, entries, interval))
+            with db.reader('bench') as reader:
+                writer.start()
+                latencies = sorted(time.time() - e['ts']
+                                   for e in consume(reader,
+                                                    entries,
+                                                    poll_interval))
+            writer.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=50)
+    parser.add_argument('--interval', type=float, default=0.02,
+                        help="seconds between writes")
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    args = parser.parse_args()
+
+    rows = []
+    for name, consume in (('follow', follow), ('poll', poll)):
+        latencies = run_case(consume,
+                             args.entries,
+                             args.interval,
+                             args.poll_interval)
+        rows.append((name,) + tuple(
+            "%.2f" % (latencies[int(q * (len(latencies) - 1))] * 1000)
+            for q in (0.5, 0.99, 1)))
+
+    print_table(("reader", "p50 ms", "p99 ms", "max ms"), rows)
+
+
+if __name__ == '__main__':
+    main()
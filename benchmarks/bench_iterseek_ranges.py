@@ -0,0 +1,64 @@
+"""
+Count the pks acked by every reader (what `purge` removes) value by value
+with `next` and range by range with `next_range`, for readers with a few
+long segments and readers with many short ones.
+
+"""
+import argparse
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.model import Model
+from binlog.registry import Registry, S
+
+
+def count_values(it):
+    return sum(1 for _ in it)
+
+
+def count_ranges(it):
+    total = 0
+    while True:
+        try:
+            L, R = it.next_range()
+        except StopIteration:
+            return total
+        total += R - L + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pks', type=int, default=1000000)
+    parser.add_argument('--readers', type=int, default=3)
+    args = parser.parse_args()
+
+    cases = (('long', 1000), ('short', 10))
+    rows = []
+    for name, length in cases:
+        with temporary_binlog(Model) as conn:
+            for n in range(args.readers):
+                # Segments of every reader shifted by `n`.
+                acked = Registry([S(i + n, i + n + length - 1)
+                                  for i in range(0, args.pks,
+                                                 length + length // 10)])
+                conn.register_reader('reader%d' % n)
+                conn.save_registry('reader%d' % n, acked)
+
+            for how, count in (('next', count_values),
+                               ('next_range', count_ranges)):
+                readers = [conn.reader('reader%d' % n)
+                           for n in range(args.readers)]
+                registries = [r.registry for r in readers]
+                it = registries[0]
+                for registry in registries[1:]:
+                    it = it & registry
+                total, elapsed = measure(count, it)
+                for registry in registries:
+                    registry.close()
+                rows.append((name, how, total, "%.1f" % (elapsed * 1000)))
+
+    print_table(("segments", "counted with", "pks", "ms"), rows)
+
+
+if __name__ == '__main__':
+    main()
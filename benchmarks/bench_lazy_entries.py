@@ -0,0 +1,46 @@
+"""
+Compare eager and lazy (`Connection.reader(lazy=True)`) readers on a
+selective consumer reading only every `--every` entry and skipping the rest
+by pk.
+
+"""
+import argparse
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.model import Model
+
+
+def consume(reader, every):
+    """Read the payload of every `every` entry, return the entries seen."""
+    seen = []
+    for entry in reader:
+        seen.append(entry)
+        if entry.pk % every == 0:
+            entry['payload']
+    return seen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--every', type=int, default=10)
+    args = parser.parse_args()
+
+    rows = []
+    with temporary_binlog(Model) as conn:
+        conn.bulk_create(Model(idx=i, payload=list(range(20)))
+                         for i in range(args.entries))
+
+        for lazy in (False, True):
+            with conn.reader(lazy=lazy) as reader:
+                seen, elapsed = measure(consume, reader, args.every)
+            decodes = sum(e.decoded for e in seen) if lazy else len(seen)
+            rows.append(("lazy" if lazy else "eager", len(seen), decodes,
+                         "%.0f" % (len(seen) / elapsed)))
+
+    print_table(("reader", "entries", "decodes", "entries/s"), rows)
+
+
+if __name__ == '__main__':
+    main()
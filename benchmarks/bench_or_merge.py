@@ -0,0 +1,58 @@
+"""
+Measure the union of one index cursor per value (what `ack_from_filter`
+builds for a list of values) for 10, 100 and 1000 operands.
+
+"""
+import argparse
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.index import NumericIndex
+from binlog.model import Model
+from binlog.operations import ORIterSeek
+
+
+class BenchModel(Model):
+    bucket = NumericIndex()
+
+
+def union(conn, operands):
+    db_name = conn._get_index_name('bucket')
+    with conn.data(write=False) as res:
+        cursors = [NumericIndex.cursor(res, db_name=db_name)
+                   for _ in range(operands)]
+        proxies = [c.__enter__() for c in cursors]
+        try:
+            for value, proxy in enumerate(proxies):
+                proxy.dupkey = value
+            return sum(1 for _ in ORIterSeek(*proxies))
+        finally:
+            for c in cursors:
+                c.__exit__(None, None, None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=40000)
+    parser.add_argument('--operands', type=int, nargs='+',
+                        default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    rows = []
+    for operands in args.operands:
+        with temporary_binlog(BenchModel) as conn:
+            # Odd entries match no operand, so the union has no
+            # consecutive pks to join into ranges.
+            conn.bulk_create(
+                BenchModel(bucket=i // 2 % operands if i % 2 == 0
+                           else operands)
+                for i in range(args.entries))
+            count, elapsed = measure(union, conn, operands)
+        rows.append((operands, count, "%.1f" % (elapsed * 1000),
+                     "%.0f" % (count / elapsed)))
+
+    print_table(("operands", "pks", "ms", "pks/s"), rows)
+
+
+if __name__ == '__main__':
+    main()
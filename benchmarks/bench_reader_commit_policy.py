@@ -0,0 +1,49 @@
+"""
+Measure acks/sec, number of commits and mean commit latency of readers
+acking every other entry (a fragmented registry) with different automatic
+commit policies.
+
+"""
+import argparse
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.model import Model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=20000)
+    args = parser.parse_args()
+
+    policies = (('close only', {}),
+                ('commit_every=1', {'commit_every': 1}),
+                ('commit_every=100', {'commit_every': 100}),
+                ('commit_every=1000', {'commit_every': 1000}),
+                ('commit_interval=0.01', {'commit_interval': 0.01}),
+                ('commit_max_segments=100', {'commit_max_segments': 100}))
+
+    rows = []
+    with temporary_binlog(Model) as conn:
+        conn.bulk_create(Model(idx=i) for i in range(args.entries))
+        for n, (name, policy) in enumerate(policies):
+            reader_name = 'bench%d' % n
+            conn.register_reader(reader_name)
+
+            def ack_all():
+                with conn.reader(reader_name, **policy) as reader:
+                    for pk in range(0, args.entries, 2):
+                        reader.ack(pk)
+                return reader.stats()
+
+            stats, elapsed = measure(ack_all)
+            rows.append((name,
+                         "%.0f" % (args.entries / 2 / elapsed),
+                         stats['commits'],
+                         "%.2f" % (stats['mean_commit_latency'] * 1000)))
+
+    print_table(("policy", "acks/s", "commits", "mean commit ms"), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare entries/sec iterating a reader decoding every entry from the
+iteration cursor against looking each one up with `txn.get` in the
+iteration transaction (a B-tree lookup per entry) and with `reader[pk]`
+(a new transaction and B-tree lookup per entry).
+
+"""
+import argparse
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.abstract import Direction
+from binlog.databases import Entries
+from binlog.model import Model
+
+
+def lookup_iter(reader):
+    """Iterate `reader` the way `Reader.__iter__` used to."""
+    with reader.connection.data(write=False) as res:
+        with Entries.cursor(res) as cursor:
+            it = cursor & reader.__iterseek__(direction=Direction.F)
+            for pk in it:
+                try:
+                    yield reader[pk]
+                except IndexError:
+                    pass
+
+
+def get_iter(reader):
+    """
+    Iterate `reader` reading every value with `txn.get`, as
+    `Reader._get_from_cursor` does when the cursor is not on the entry.
+
+    """
+    def get_from_txn(res, cursor, pk):
+        raw_value = res.txn.get(Entries.K.db_value(pk), db=res.db['entries'])
+        if raw_value is None:
+            raise IndexError
+        return reader._to_model(pk, raw_value)
+
+    reader._get_from_cursor = get_from_txn
+    try:
+        yield from reader
+    finally:
+        del reader._get_from_cursor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--acked', type=int, default=1000,
+                        help="number of entries acked before reading")
+    args = parser.parse_args()
+
+    with temporary_binlog(Model) as conn:
+        conn.bulk_create(Model(idx=i, payload='x' * 100)
+                         for i in range(args.entries))
+        conn.register_reader('bench')
+        with conn.reader('bench') as reader:
+            for pk in range(args.acked):
+                reader.ack(pk)
+
+        rows = []
+        with conn.reader('bench') as reader:
+            for name, it in (('lookup', lambda: lookup_iter(reader)),
+                             ('txn.get', lambda: get_iter(reader)),
+                             ('cursor', lambda: iter(reader)),
+                             ('cursor reversed', lambda: reversed(reader))):
+                count, elapsed = measure(lambda: sum(1 for _ in it()))
+                rows.append((name, count, "%.0f" % (count / elapsed)))
+
+    print_table(("iteration", "entries", "entries/s"), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Measure `Connection.reader_lag` for many readers with fragmented registries
+against counting the acked entries scanning every registry.
+
+"""
+import argparse
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.model import Model
+from binlog.registry import DBRegistry, Registry, S
+
+
+def scan_lag(conn):
+    with conn.reader() as reader:
+        next_pk = reader[-1].pk + 1
+
+    lag = {}
+    for name in conn.list_readers():
+        with DBRegistry(name, conn) as registry:
+            acked = sum(1 for _ in registry)
+        lag[name] = next_pk - acked
+    return lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=200)
+    parser.add_argument('--segments', type=int, default=1000)
+    args = parser.parse_args()
+
+    with temporary_binlog(Model) as conn:
+        conn.bulk_create(Model(idx=i) for i in range(args.segments * 2))
+        acked = Registry([S(i, i) for i in range(0, args.segments * 2, 2)])
+        for n in range(args.readers):
+            name = 'reader%d' % n
+            conn.register_reader(name)
+            conn.save_registry(name, acked)
+
+        rows = []
+        for name, f in (('scan', lambda: scan_lag(conn)),
+                        ('reader_lag', conn.reader_lag)):
+            lag, elapsed = measure(f)
+            rows.append((name, len(lag), "%.2f" % (elapsed * 1000)))
+
+    print_table(("method", "readers", "ms"), rows)
+
+
+if __name__ == '__main__':
+    main()
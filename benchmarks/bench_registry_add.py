@@ -0,0 +1,50 @@
+"""
+Measure acks/sec of `Registry.add` acking in order and out of order (every
+other idx first, building up many segments), and of `Registry.add_range`.
+
+"""
+import argparse
+
+from _common import measure, print_table
+
+from binlog.registry import Registry
+
+
+def add_all(idxs):
+    registry = Registry()
+    for idx in idxs:
+        registry.add(idx)
+    return registry
+
+
+def add_ranges(count, size):
+    registry = Registry()
+    for start in range(0, count, size):
+        registry.add_range(start, min(start + size, count) - 1)
+    return registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--acks', type=int, default=100000)
+    parser.add_argument('--range-size', type=int, default=100)
+    args = parser.parse_args()
+
+    interleaved = (list(range(0, args.acks, 2))
+                   + list(range(1, args.acks, 2)))
+
+    rows = []
+    for name, f in (
+            ('add in order', lambda: add_all(range(args.acks))),
+            ('add out of order', lambda: add_all(interleaved)),
+            ('add_range', lambda: add_ranges(args.acks, args.range_size))):
+        registry, elapsed = measure(f)
+        rows.append((name,
+                     len(list(registry)),
+                     "%.0f" % (args.acks / elapsed)))
+
+    print_table(("case", "acked", "acks/s"), rows)
+
+
+if __name__ == '__main__':
+    main()
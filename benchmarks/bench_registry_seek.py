@@ -0,0 +1,46 @@
+"""
+Measure the cost of `RegistryIterSeek.seek` followed by `next` against the
+number of segments of the registry, seeking random positions forwards and
+backwards.
+
+"""
+import argparse
+import random
+
+from _common import measure, print_table
+
+from binlog.abstract import Direction
+from binlog.registry import Registry, RegistryIterSeek, S
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--segments', type=int, nargs='+',
+                        default=[10, 100, 1000, 10000])
+    parser.add_argument('--seeks', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    rows = []
+    for count in args.segments:
+        registry = Registry([S(i, i + 1) for i in range(0, count * 4, 4)])
+        positions = [rnd.randrange(count * 4) for _ in range(args.seeks)]
+        for direction in (Direction.F, Direction.B):
+            it = RegistryIterSeek(registry, direction=direction)
+
+            def seek_all():
+                for pos in positions:
+                    it.seek(pos)
+                    next(it, None)
+
+            _, elapsed = measure(seek_all)
+            rows.append((count, direction.name,
+                         "%.2f" % (elapsed / args.seeks * 1e6),
+                         "%.0f" % (args.seeks / elapsed)))
+
+    print_table(("segments", "direction", "us/seek", "seeks/s"), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Iterate a reader with a heavily fragmented registry (every other entry
+acked) and test membership in it, holding one read transaction per registry
+against beginning one on every segment lookup as it used to.
+
+"""
+from contextlib import contextmanager
+import argparse
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.model import Model
+from binlog.registry import DBRegistry, IDBRegistry, Registry, S
+
+
+@contextmanager
+def transaction_per_lookup():
+    originals = {cls: cls._get_segment_by_pos
+                 for cls in (DBRegistry, IDBRegistry)}
+
+    def wrap(f):
+        def _get_segment_by_pos(self, pos):
+            try:
+                return f(self, pos)
+            finally:
+                self.refresh()
+        return _get_segment_by_pos
+
+    for cls, f in originals.items():
+        cls._get_segment_by_pos = wrap(f)
+    try:
+        yield
+    finally:
+        for cls, f in originals.items():
+            cls._get_segment_by_pos = f
+
+
+def iterate(conn):
+    with conn.reader('bench') as reader:
+        return sum(1 for _ in reader)
+
+
+def contains(conn, entries):
+    with DBRegistry('bench', conn) as registry:
+        return sum(1 for pk in range(entries) if pk in registry)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=100000)
+    args = parser.parse_args()
+
+    rows = []
+    with temporary_binlog(Model) as conn:
+        conn.bulk_create(Model(idx=i) for i in range(args.entries))
+        conn.register_reader('bench')
+        conn.save_registry('bench', Registry([S(i, i) for i in
+                                              range(0, args.entries, 2)]))
+
+        for name, f in (('iterate', lambda: iterate(conn)),
+                        ('contains', lambda: contains(conn, args.entries))):
+            with transaction_per_lookup():
+                _, before = measure(f)
+            count, after = measure(f)
+            rows.append((name, count,
+                         "%.0f" % (args.entries / before),
+                         "%.0f" % (args.entries / after)))
+
+    print_table(("case", "found", "txn per lookup/s", "held txn/s"), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Measure `Connection.save_registry` committing highly fragmented registries:
+
+- `new`: isolated segments into an empty registry.
+- `interleaved`: isolated segments between the stored ones.
+- `bridge`: segments filling every gap between the stored ones.
+- `prepend`: segments right before each stored one.
+- `recommit`: segments already stored (readers commit all the acks made
+  since they were opened).
+
+"""
+import argparse
+
+from _common import temporary_binlog, measure, print_table
+
+from binlog.model import Model
+from binlog.registry import Registry, S
+
+
+def isolated(start, count):
+    """`count` non adjacent segments of one idx from `start`."""
+    return Registry([S(i, i) for i in range(start, start + count * 4, 4)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--segments', type=int, nargs='+',
+                        default=[1000, 10000, 100000])
+    args = parser.parse_args()
+
+    rows = []
+    for count in args.segments:
+        bridge = Registry([S(i, i + 2) for i in range(1, count * 4, 4)])
+        cases = (('new', None, isolated(0, count)),
+                 ('interleaved', isolated(0, count), isolated(2, count)),
+                 ('bridge', isolated(0, count), bridge),
+                 ('prepend', isolated(1, count), isolated(0, count)),
+                 ('recommit', isolated(0, count), isolated(0, count)))
+        for name, stored, added in cases:
+            with temporary_binlog(Model) as conn:
+                conn.register_reader('bench')
+                if stored is not None:
+                    conn.save_registry('bench', stored)
+                _, elapsed = measure(conn.save_registry, 'bench', added)
+                segments = conn.reader_stats('bench')['segments']
+            rows.append((name, count, segments,
+                         "%.1f" % (elapsed * 1000),
+                         "%.0f" % (count / elapsed)))
+
+    print_table(("case", "added", "stored after", "ms", "segments/s"), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare the entry serializers selectable with `__meta_serializer__` over
+event shaped entries: bytes per entry and encoded/decoded entries per
+second.
+
+"""
+import argparse
+import random
+
+from _common import measure, print_table
+
+from binlog.serializer import SERIALIZERS, StructSerializer
+
+
+class ClickSerializer(StructSerializer):
+    fields = (('ts', 'd'), ('user_id', 'Q'), ('status', 'H'))
+
+
+def click(rnd, i):
+    return {'ts': 1500000000.0 + i / 1000,
+            'user_id': rnd.randrange(10**6),
+            'status': rnd.choice((200, 200, 200, 302, 404)),
+            'event': 'click',
+            'path': '/products/%d' % rnd.randrange(1000),
+            'session': '%032x' % rnd.getrandbits(128)}
+
+
+def order(rnd, i):
+    return {'ts': 1500000000.0 + i / 1000,
+            'user_id': rnd.randrange(10**6),
+            'status': 0,
+            'event': 'order',
+            'total': round(rnd.uniform(1, 500), 2),
+            'currency': 'EUR',
+            'items': [{'sku': 'SKU-%05d' % rnd.randrange(10**5),
+                       'qty': rnd.randrange(1, 4)}
+                      for _ in range(rnd.randrange(1, 6))]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    serializers = dict(SERIALIZERS, struct=ClickSerializer)
+
+    rows = []
+    for shape in (click, order):
+        rnd = random.Random(args.seed)
+        entries = [shape(rnd, i) for i in range(args.entries)]
+        for name, serializer in sorted(serializers.items()):
+            raws, encode = measure(
+                lambda: [serializer.db_value(e) for e in entries])
+            _, decode = measure(
+                lambda: [serializer.python_value(memoryview(r))
+                         for r in raws])
+            size = sum(len(r) for r in raws) / len(raws)
+            rows.append((shape.__name__, name, "%.1f" % size,
+                         "%.0f" % (len(entries) / encode),
+                         "%.0f" % (len(entries) / decode)))
+
+    print_table(("shape", "serializer", "bytes/entry", "encode/s",
+                 "decode/s"), rows)
+
+
+if __name__ == '__main__':
+    main()
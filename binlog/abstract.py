@@ -57,6 +57,20 @@ class IterSeek(Iterator):
     def seek(self, pos):  # pragma: no cover
         pass
 
+    def cardinality(self):
+        """Estimated number of values, None if unknown."""
+        return None
+
+    def next_range(self):
+        """
+        Return the next range of consecutive values as a segment `S(L, R)`
+        (iterated from `R` to `L` backwards) and continue after it.
+
+        """
+        from .registry import S
+        value = next(self)
+        return S(value, value)
+
     def __and__(self, other):
         from .operations import ANDIterSeek
         return ANDIterSeek(self, other)
@@ -64,3 +78,11 @@ class IterSeek(Iterator):
     def __or__(self, other):
         from .operations import ORIterSeek
         return ORIterSeek(self, other)
+
+    def __sub__(self, other):
+        from .operations import DIFFIterSeek
+        return DIFFIterSeek(self, other)
+
+    def __invert__(self):
+        from .operations import NOTIterSeek
+        return NOTIterSeek(self)
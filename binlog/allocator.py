@@ -0,0 +1,88 @@
+from .databases import Entries
+from .exceptions import IntegrityError
+
+
+class IDAllocator:
+    """
+    Hand out entry ids from blocks reserved in the `Config` database.
+
+    `next_event_id` in `Config` is the end of the last reserved block of
+    any writer. Reserving a block costs one `Config` update; the ids of the
+    block are then handed out from memory, so multiple processes writing to
+    the same binlog never get the same id. Ids reserved and not used before
+    the connection is closed are never reused.
+
+    The first reservation of the connection checks `next_event_id` against
+    the last key of `Entries`.
+
+    The state is modified inside the caller's write transaction, so it must
+    be restored with `restore` if that transaction is aborted.
+
+    """
+    def __init__(self, connection, block_size=1):
+        if block_size < 1:
+            raise ValueError("block_size must be greater than 0")
+
+        self.connection = connection
+        self.block_size = block_size
+
+        self.next_id = None  # Next id to hand out
+        self.limit = None  # End (exclusive) of the reserved block
+        self.checked = False  # `Config` checked against `Entries`
+
+    def __len__(self):
+        """Number of reserved ids not handed out yet."""
+        if self.next_id is None:
+            return 0
+        else:
+            return self.limit - self.next_id
+
+    def snapshot(self):
+        return (self.next_id, self.limit, self.checked)
+
+    def restore(self, state):
+        self.next_id, self.limit, self.checked = state
+
+    def _check(self, res, next_event_idx):
+        with res.txn.cursor(res.db['entries']) as cursor:
+            if cursor.last():
+                last = Entries.K.python_value(cursor.key())
+                if last >= next_event_idx:
+                    raise IntegrityError(
+                        "next_event_id (%d) is behind the last entry (%d)" % (
+                            next_event_idx, last))
+        self.checked = True
+
+    def reserve(self, res, count):
+        """
+        Reserve `count` ids with one `Config` update. Return the first one.
+
+        The new block is merged with the current one when contiguous,
+        otherwise it replaces it.
+
+        """
+        if count < 1:
+            raise ValueError("count must be greater than 0")
+
+        start = self.connection._get_next_event_idx(res)
+        if not self.checked:
+            self._check(res, start)
+        self.connection._update_next_event_idx(res, start + count)
+
+        if len(self) and start == self.limit:
+            self.limit = start + count
+        else:
+            self.next_id, self.limit = start, start + count
+
+        return start
+
+    def peek(self, res):
+        """Return the next id to be handed out, reserving if needed."""
+        if not len(self):
+            self.reserve(res, self.block_size)
+        return self.next_id
+
+    def allocate(self, res):
+        pk = self.peek(res)
+        self.next_id += 1
+        return pk
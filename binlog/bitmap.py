@@ -0,0 +1,445 @@
+"""
+Roaring-style bitmap registries.
+
+The pk space is split in blocks of `BLOCK_SIZE` pks. The acked pks of each
+block are a container, kept in memory as a sorted array of positions while
+it has up to `ARRAY_MAX` of them and as a python int used as a bitset
+otherwise, and stored as the smallest of a sorted array of pks, a bitmap or
+a list of runs. Unlike segments, the size of a container is bounded no
+matter the order of the acks.
+
+"""
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+import lmdb
+
+from .abstract import Direction
+from .databases import Bitmap as BitmapDB
+from .exceptions import ReaderDoesNotExist
+from .registry import BaseDBRegistry, S
+from .util import MaskException, bit_runs, bits_from_positions, popcount
+
+BLOCK_BITS = 16
+BLOCK_SIZE = 1 << BLOCK_BITS
+FULL = (1 << BLOCK_SIZE) - 1
+#: Containers with up to this many positions are kept in memory as arrays,
+#: smaller than the bitset of their block.
+ARRAY_MAX = 4096
+
+
+def lowest(bits):
+    """Return the position of the lowest set bit of `bits`."""
+    return (bits & -bits).bit_length() - 1
+
+
+def mask(first, last):
+    """Return the bits from `first` to `last` (both included) set."""
+    return ((1 << (last - first + 1)) - 1) << first
+
+
+def compact(bits):
+    """Return the in-memory container of `bits`."""
+    if popcount(bits) <= ARRAY_MAX:
+        return array('H', [pos
+                           for first, last in bit_runs(bits)
+                           for pos in range(first, last + 1)])
+    return bits
+
+
+def to_bits(container):
+    """Return the bits of the in-memory `container`."""
+    if isinstance(container, int):
+        return container
+    return bits_from_positions(container, BLOCK_SIZE)
+
+
+def container_runs(container):
+    """Yield the first and last position of every run of `container`."""
+    if isinstance(container, int):
+        yield from bit_runs(container)
+    elif container:
+        first = last = container[0]
+        for pos in container[1:]:
+            if pos != last + 1:
+                yield first, last
+                first = pos
+            last = pos
+        yield first, last
+
+
+class BitmapSearch:
+    """
+    Search set and unset idxs across the containers of a bitmap.
+
+    Subclasses implement `_container`, `_next_key` and `_prev_key`.
+
+    """
+    def _container(self, key):  # pragma: no cover
+        """Return the bits of block `key` (0 if not stored)."""
+        raise NotImplementedError("Must be implemented in subclass.")
+
+    def _next_key(self, key):  # pragma: no cover
+        """Return the lowest stored key greater than `key` or None."""
+        raise NotImplementedError("Must be implemented in subclass.")
+
+    def _prev_key(self, key):  # pragma: no cover
+        """Return the greatest stored key lower than `key` or None."""
+        raise NotImplementedError("Must be implemented in subclass.")
+
+    def next_set(self, pos):
+        key, low = divmod(pos, BLOCK_SIZE)
+        bits = self._container(key) >> low
+        if bits:
+            return pos + lowest(bits)
+        key = self._next_key(key)
+        if key is None:
+            return None
+        return key * BLOCK_SIZE + lowest(self._container(key))
+
+    def next_unset(self, pos):
+        key, low = divmod(pos, BLOCK_SIZE)
+        while key * BLOCK_SIZE <= S.MAX:
+            free = (FULL ^ self._container(key)) >> low
+            if free:
+                return key * BLOCK_SIZE + low + lowest(free)
+            key, low = key + 1, 0
+        return None
+
+    def prev_set(self, pos):
+        key, low = divmod(pos, BLOCK_SIZE)
+        bits = self._container(key) & mask(0, low)
+        if bits:
+            return key * BLOCK_SIZE + bits.bit_length() - 1
+        key = self._prev_key(key)
+        if key is None:
+            return None
+        return key * BLOCK_SIZE + self._container(key).bit_length() - 1
+
+    def prev_unset(self, pos):
+        key, low = divmod(pos, BLOCK_SIZE)
+        while key >= 0:
+            free = (FULL ^ self._container(key)) & mask(0, low)
+            if free:
+                return key * BLOCK_SIZE + free.bit_length() - 1
+            key, low = key - 1, BLOCK_SIZE - 1
+        return None
+
+    def segment_at(self, pos, direction, inverted=False):
+        """
+        Return the segment of set idxs (unset if `inverted`) containing
+        `pos`, or the next one in `direction`. None if there is none.
+
+        """
+        if direction is Direction.F:
+            if inverted:
+                find, end = self.next_unset, self.next_set
+            else:
+                find, end = self.next_set, self.next_unset
+            start = find(pos)
+            if start is None:
+                return None
+            stop = end(start)
+            return S(start, S.MAX if stop is None else stop - 1)
+        else:
+            if inverted:
+                find, end = self.prev_unset, self.prev_set
+            else:
+                find, end = self.prev_set, self.prev_unset
+            start = find(pos)
+            if start is None:
+                return None
+            stop = end(start)
+            return S(S.MIN if stop is None else stop + 1, start)
+
+
+class BitmapRegistry(BitmapSearch):
+    """
+    In-memory bitmap registry, a drop-in for `Registry`.
+
+    `containers` maps each block key to its container (see `compact`). An
+    `inverted` registry contains the idxs not in its containers.
+
+    """
+    def __init__(self, containers=None, inverted=False):
+        self.containers = {} if containers is None else containers
+        self.keys = sorted(self.containers)
+        self.inverted = inverted
+        self._acked = None
+
+    @classmethod
+    def from_segments(cls, segments):
+        registry = cls()
+        for segment in segments:
+            registry.add_range(segment.L, segment.R)
+        return registry
+
+    def _container(self, key):
+        return to_bits(self.containers.get(key, 0))
+
+    def _next_key(self, key):
+        idx = bisect_right(self.keys, key)
+        return self.keys[idx] if idx < len(self.keys) else None
+
+    def _prev_key(self, key):
+        idx = bisect_left(self.keys, key)
+        return self.keys[idx - 1] if idx > 0 else None
+
+    def _set(self, key, bits):
+        if key not in self.containers:
+            insort(self.keys, key)
+        self.containers[key] = compact(bits)
+        self._acked = None
+
+    def __contains__(self, value):
+        key, low = divmod(value, BLOCK_SIZE)
+        container = self.containers.get(key, 0)
+        if isinstance(container, int):
+            found = bool(container >> low & 1)
+        else:
+            idx = bisect_left(container, low)
+            found = idx < len(container) and container[idx] == low
+        return found is not self.inverted
+
+    def __iter__(self):
+        def _iter():
+            for segment in self.acked:
+                yield from iter(range(segment.L, segment.R + 1))
+        return _iter()
+
+    def __repr__(self):  # pragma: no cover
+        return '<BitmapRegistry %s%r>' % ('~' if self.inverted else '',
+                                          self.keys)
+
+    def add(self, idx):
+        if not isinstance(idx, int):
+            raise TypeError("idx must be int")
+        elif self.inverted:
+            raise ValueError("Can't add to an inverted registry")
+
+        key, low = divmod(idx, BLOCK_SIZE)
+        container = self.containers.get(key)
+        if container is None:
+            insort(self.keys, key)
+            self.containers[key] = array('H', [low])
+            self._acked = None
+            return True
+        elif isinstance(container, array) and len(container) < ARRAY_MAX:
+            pos = bisect_left(container, low)
+            if pos < len(container) and container[pos] == low:
+                return False
+            container.insert(pos, low)
+            self._acked = None
+            return True
+
+        bits = to_bits(container)
+        if bits & 1 << low:
+            return False
+        self._set(key, bits | 1 << low)
+        return True
+
+    def add_range(self, L, R):
+        """
+        Add every idx from `L` to `R` (both included).
+
+        Return the number of idxs not previously in the registry.
+
+        """
+        if not isinstance(L, int) or not isinstance(R, int):
+            raise TypeError("idx must be int")
+        elif L > R:
+            raise ValueError("L must be lower or equal than R")
+        elif self.inverted:
+            raise ValueError("Can't add to an inverted registry")
+
+        added = 0
+        first_key, last_key = L // BLOCK_SIZE, R // BLOCK_SIZE
+        for key in range(first_key, last_key + 1):
+            first = L % BLOCK_SIZE if key == first_key else 0
+            last = R % BLOCK_SIZE if key == last_key else BLOCK_SIZE - 1
+            bits = self._container(key)
+            new = mask(first, last) & ~bits
+            if new:
+                added += popcount(new)
+                self._set(key, bits | new)
+        return added
+
+    def update(self, idxs):
+        """Add every idx of `idxs`. Return the number of new idxs."""
+        blocks = {}
+        for idx in idxs:
+            if not isinstance(idx, int):
+                raise TypeError("idx must be int")
+            key, low = divmod(idx, BLOCK_SIZE)
+            blocks.setdefault(key, set()).add(low)
+
+        added = 0
+        for key, lows in blocks.items():
+            bits = self._container(key)
+            new = bits_from_positions(lows, BLOCK_SIZE) & ~bits
+            if new:
+                added += popcount(new)
+                self._set(key, bits | new)
+        return added
+
+    def clear(self):
+        self.containers.clear()
+        del self.keys[:]
+        self._acked = None
+
+    def size(self):
+        """Number of containers."""
+        return len(self.containers)
+
+    def count(self):
+        """Number of idxs in the containers."""
+        return sum(popcount(c) if isinstance(c, int) else len(c)
+                   for c in self.containers.values())
+
+    @property
+    def acked(self):
+        """Sorted segments of the registry, as in `Registry.acked`."""
+        if self._acked is None:
+            segments = []
+            for key in self.keys:
+                base = key * BLOCK_SIZE
+                for first, last in container_runs(self.containers[key]):
+                    if segments and segments[-1].R == base + first - 1:
+                        segments[-1] = S(segments[-1].L, base + last)
+                    else:
+                        segments.append(S(base + first, base + last))
+
+            if self.inverted:
+                gaps = []
+                pos = S.MIN
+                for segment in segments:
+                    if segment.L > pos:
+                        gaps.append(S(pos, segment.L - 1))
+                    pos = segment.R + 1
+                if pos <= S.MAX:
+                    gaps.append(S(pos, S.MAX))
+                segments = gaps
+
+            self._acked = segments
+        return self._acked
+
+    @staticmethod
+    def _merge(a, b, op):
+        merged = {}
+        for key in set(a) | set(b):
+            bits = op(to_bits(a.get(key, 0)), to_bits(b.get(key, 0)))
+            if bits:
+                merged[key] = compact(bits)
+        return merged
+
+    @classmethod
+    def _coerce(cls, other):
+        if isinstance(other, cls):
+            return other
+        return cls.from_segments(other.acked)
+
+    def __or__(self, other):
+        other = self._coerce(other)
+        a, b = self.containers, other.containers
+        if not self.inverted and not other.inverted:
+            return BitmapRegistry(self._merge(a, b, int.__or__))
+        elif self.inverted and other.inverted:
+            return BitmapRegistry(self._merge(a, b, int.__and__), True)
+        elif self.inverted:
+            return BitmapRegistry(self._merge(a, b, lambda x, y: x & ~y),
+                                  True)
+        else:
+            return BitmapRegistry(self._merge(b, a, lambda x, y: x & ~y),
+                                  True)
+
+    def __and__(self, other):
+        other = self._coerce(other)
+        a, b = self.containers, other.containers
+        if not self.inverted and not other.inverted:
+            return BitmapRegistry(self._merge(a, b, int.__and__))
+        elif self.inverted and other.inverted:
+            return BitmapRegistry(self._merge(a, b, int.__or__), True)
+        elif self.inverted:
+            return BitmapRegistry(self._merge(b, a, lambda x, y: x & ~y))
+        else:
+            return BitmapRegistry(self._merge(a, b, lambda x, y: x & ~y))
+
+    def __invert__(self):
+        # Arrays are updated in place, so they are copied.
+        containers = {key: c if isinstance(c, int) else array('H', c)
+                      for key, c in self.containers.items()}
+        return BitmapRegistry(containers, not self.inverted)
+
+
+class CursorBitmap(BitmapSearch):
+    """Bitmap stored in a `Bitmap` database read through `cursor`."""
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.cache = {}
+
+    def _container(self, key):
+        try:
+            return self.cache[key]
+        except KeyError:
+            bits = self.cache[key] = self.cursor.get(key, default=0)
+            return bits
+
+    def _key(self):
+        return BitmapDB.K.python_value(self.cursor.cursor.key())
+
+    def _next_key(self, key):
+        if self.cursor.set_range(key + 1):
+            return self._key()
+        return None
+
+    def _prev_key(self, key):
+        if self.cursor.set_range(key):
+            found = self.cursor.prev()
+        else:
+            found = self.cursor.last()
+        return self._key() if found else None
+
+
+class BitmapDBRegistry(BaseDBRegistry):
+    """Bitmap registry stored in the readers environment."""
+    registry_db = BitmapDB
+    inverted = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._bitmap = None
+
+    @property
+    def bitmap(self):
+        if self._bitmap is None:
+            self._bitmap = CursorBitmap(self.cursor)
+        return self._bitmap
+
+    def refresh(self):
+        self._bitmap = None
+        super().refresh()
+
+    close = refresh
+
+    @MaskException(lmdb.ReadonlyError, ReaderDoesNotExist)
+    def __contains__(self, value):
+        key, low = divmod(value, BLOCK_SIZE)
+        bits = self.bitmap._container(key)
+        return bool(bits >> low & 1) is not self.inverted
+
+    @MaskException(lmdb.ReadonlyError, ReaderDoesNotExist)
+    def _get_segment_by_pos(self, pos):
+        return self.bitmap.segment_at(pos, self.direction, self.inverted)
+
+    def __invert__(self):
+        return IBitmapDBRegistry(self.name, self.conn,
+                                 direction=self.direction)
+
+
+class IBitmapDBRegistry(BitmapDBRegistry):
+    """Inverted BitmapDBRegistry"""
+    inverted = True
+
+    def __invert__(self):
+        return BitmapDBRegistry(self.name, self.conn,
+                                direction=self.direction)
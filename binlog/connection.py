@@ -1,21 +1,36 @@
-from collections import namedtuple
-from contextlib import contextmanager
+from collections import namedtuple, Counter
+from contextlib import contextmanager, suppress
 from functools import reduce, wraps
-from itertools import islice
+from itertools import chain, islice
 from pathlib import Path
 import operator as op
 import os
 import threading
+import time
+import warnings
+import weakref
 
 import lmdb
 
-from .databases import Config, Entries
+from .allocator import IDAllocator
+from .bitmap import BitmapRegistry, BitmapDBRegistry, CursorBitmap
+from .databases import Bitmap as BitmapDB
+from .databases import Config, Entries, ReaderStats
 from .databases import Registry as RegistryDB
 from .exceptions import IntegrityError, ReaderDoesNotExist, BadUsageError
+from .notify import Notifier
 from .reader import Reader
-from .util import MaskException
+from .registry import S, Registry, DBRegistry, MemoryCachedDBRegistry
+from .serializer import CompressedSerializer, SERIALIZERS
+from .util import popcount
+from .util import MaskException, Replayable
+from .writer import BatchedWriter
 
-RESERVED_READER_NAMES = {"hints"}
+RESERVED_READER_NAMES = {"hints", "readerstats"}
+
+#: In-memory and stored registry classes of each reader encoding.
+REGISTRY_ENCODINGS = {'segments': (Registry, DBRegistry),
+                      'bitmap': (BitmapRegistry, BitmapDBRegistry)}
 
 Resources = namedtuple('Resources', ['env', 'txn', 'db'])
 
@@ -63,6 +78,36 @@ def open_db(f):
     return wrapper
 
 
+def grow_map(env_name):
+    """
+    Retry the decorated write operation after growing the map of the
+    `env_name` environment when it gets full.
+
+    Only the outermost decorated call retries, so the map is never resized
+    with a transaction of the operation still open.
+
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(self, *args, **kwargs):
+            if self._growing_map:
+                return f(self, *args, **kwargs)
+
+            self._growing_map = True
+            try:
+                while True:
+                    try:
+                        return f(self, *args, **kwargs)
+                    except lmdb.MapFullError:
+                        if not self._grow_map(env_name):
+                            raise
+            finally:
+                self._growing_map = False
+
+        return wrapper
+    return decorator
+
+
 class Connection:
     def __init__(self, model, path, kwargs):
         self.model = model
@@ -74,6 +119,25 @@ class Connection:
         self._readers_env = None
         self.refcount = 0
 
+        self._serializer = None
+        self._format = None
+        self._compression = None
+        self._entries = None
+        self._serializer_saved = False
+
+        self._ids = IDAllocator(self,
+                                block_size=self.model._meta['id_block_size'])
+
+        # Wakes up the readers following the binlog when entries are stored.
+        self._notify = Notifier(self._gen_path('notify_directory'))
+
+        self._open_txns = Counter()
+        # Stored registries holding a read transaction of the readers
+        # environment, see `_end_registry_txns`.
+        self._registry_txns = weakref.WeakSet()
+        self._growing_map = False
+        self.map_growths = []
+
         self.pid = os.getpid()
         self.tid = threading.current_thread()
         if self.tid != threading.main_thread():
@@ -111,6 +175,190 @@ class Connection:
             max_dbs=2**20,
             **self.kwargs)
 
+    @property
+    def serializer(self):
+        """Name of the serializer of the entries."""
+        self.entries  # Load it
+        return self._serializer
+
+    @property
+    def compression(self):
+        """
+        Name of the compression of the entries written (None if not
+        compressed).
+
+        """
+        self.entries  # Load it
+        return self._compression
+
+    @property
+    def entries(self):
+        """`Entries` database using the serializer of the binlog."""
+        if self._entries is None:
+            with suppress(lmdb.ReadonlyError):
+                with self.data(write=False):
+                    pass  # Loads it
+            if self._entries is None:
+                # Nothing stored yet.
+                self._use_serializer(*self._new_serializer())
+        return self._entries
+
+    def _new_serializer(self):
+        """Return the serializer name and format of a new binlog."""
+        if self.model._meta['compression'] is None:
+            return self.model._meta['serializer'], 'plain'
+        else:
+            return self.model._meta['serializer'], 'framed'
+
+    def _sync_serializer(self, res):
+        """
+        Serialize the entries with the serializer and format stored in
+        `Config`, read with the transaction in `res`.
+
+        New binlogs use the serializer of the model (`__meta_serializer__`),
+        stored on the first write. If the model compresses them
+        (`__meta_compression__`) they use the 'framed' format: every value
+        starts with a flag byte, so the values are written with the current
+        compression of the model, whatever it is. Otherwise, and in binlogs
+        created before it was stored (pickle), the values are stored as is,
+        in the 'plain' format, and can't be compressed.
+
+        """
+        with Config.cursor(res) as cursor:
+            name = cursor.get('serializer', default=None)
+            value_format = cursor.get('format', default='plain')
+
+        if name is not None:
+            self._serializer_saved = True
+        elif res.txn.stat(res.db['entries'])['entries']:
+            name, value_format = 'pickle', 'plain'
+        else:
+            name, value_format = self._new_serializer()
+
+        if (name, value_format) != (self._serializer, self._format):
+            self._use_serializer(name, value_format)
+
+    def _use_serializer(self, name, value_format):
+        if name not in SERIALIZERS:
+            raise ValueError("Unknown serializer %r" % name)
+        elif name != self.model._meta['serializer']:
+            warnings.warn("The entries of %s are serialized with %r, not "
+                          "with the %r serializer of the model"
+                          % (self.path, name, self.model._meta['serializer']),
+                          RuntimeWarning)
+
+        serializer = SERIALIZERS[name]
+        compression = self.model._meta['compression']
+        if value_format == 'framed':
+            serializer = CompressedSerializer.wrapping(
+                serializer, compression,
+                self.model._meta['compression_threshold'])
+        elif compression is not None:
+            warnings.warn("The entries of %s can't be compressed, the "
+                          "binlog was created without compression"
+                          % self.path, RuntimeWarning)
+            compression = None
+
+        self._serializer = name
+        self._format = value_format
+        self._compression = compression
+        self._entries = Entries.serialized_with(serializer)
+
+    def _save_serializer(self, res):
+        """
+        Store the serializer and format in `Config` on the first write of
+        the binlog, using the transaction in `res`.
+
+        """
+        if not self._serializer_saved:
+            with Config.cursor(res) as cursor:
+                cursor.put('serializer', self._serializer)
+                cursor.put('format', self._format)
+            self._serializer_saved = True
+
+    def _begin(self, env_name, write):
+        """
+        Begin a transaction in the `env_name` environment and count it as
+        open. The caller must decrement `_open_txns[env_name]` when the
+        transaction ends.
+
+        The map can't be resized while this process has other transactions
+        open in the environment, buffers returned by them would point to the
+        old map.
+
+        """
+        env = getattr(self, env_name)
+        self._open_txns[env_name] += 1
+        try:
+            return env.begin(write=write, buffers=True)
+        except lmdb.MapResizedError:
+            if self._open_txns[env_name] > 1:
+                raise
+            else:
+                # The map was grown by another process.
+                env.set_mapsize(0)
+                return env.begin(write=write, buffers=True)
+
+    def _grow_map(self, env_name):
+        """
+        Grow the map of the `env_name` environment by the model's
+        `map_size_growth` factor up to `map_size_max`.
+
+        Return True if the map was grown.
+
+        """
+        factor = self.model._meta['map_size_growth']
+        if not factor:
+            return False
+
+        if env_name == 'readers_env':
+            self._end_registry_txns()
+
+        env = getattr(self, env_name)
+        old_size = env.info()['map_size']
+        new_size = int(old_size * factor)
+
+        max_size = self.model._meta['map_size_max']
+        if max_size is not None:
+            new_size = min(new_size, max_size)
+
+        if new_size <= old_size or self._open_txns[env_name]:
+            return False
+
+        try:
+            env.set_mapsize(new_size)
+        except lmdb.Error:
+            return False
+        else:
+            self.map_growths.append((env_name, old_size, new_size))
+            return True
+
+    def _end_registry_txns(self):
+        """
+        End the read transactions held by the stored registries of this
+        connection. They begin a new one on their next access.
+
+        """
+        for registry in list(self._registry_txns):
+            registry.refresh()
+
+    @open_db
+    @same_thread
+    def sync(self, force=True):
+        """
+        Flush both environments to disk. Needed to make the transactions
+        durable when the environments are opened with `sync=False`.
+
+        """
+        self.data_env.sync(force)
+        self.readers_env.sync(force)
+
+    @open_db
+    def stats(self):
+        return {'data_map_size': self.data_env.info()['map_size'],
+                'readers_map_size': self.readers_env.info()['map_size'],
+                'map_growths': list(self.map_growths)}
+
     def close(self):
         if self.refcount == 1:
             self.closed = True
@@ -174,27 +422,45 @@ class Connection:
     @contextmanager
     def data(self, write=True):
         env = self.data_env
-        with env.begin(write=write, buffers=True) as txn:
-            dbs = {}
-            dbs['config'] = self._get_db(env, txn, 'config_db_name')
-            dbs['entries'] = self._get_db(env, txn, 'entries_db_name')
-            for index_name in self.model._indexes:
-                index_db_name = self._get_index_name(index_name)
-                dbs[index_db_name] = self._get_idx(env, txn, index_db_name,
-                                                  dupsort=True)
-
-            yield Resources(env=env, txn=txn, db=dbs)
+        ids_state = self._ids.snapshot()
+        serializer_saved = self._serializer_saved
+        try:
+            with self._begin('data_env', write) as txn:
+                dbs = {}
+                dbs['config'] = self._get_db(env, txn, 'config_db_name')
+                dbs['entries'] = self._get_db(env, txn, 'entries_db_name')
+                for index_name in self.model._indexes:
+                    index_db_name = self._get_index_name(index_name)
+                    dbs[index_db_name] = self._get_idx(env, txn, index_db_name,
+                                                      dupsort=True)
+
+                res = Resources(env=env, txn=txn, db=dbs)
+                if not self._serializer_saved:
+                    # Until stored, other processes may store other ones.
+                    self._sync_serializer(res)
+                yield res
+        except BaseException:
+            # Ids reserved in an aborted transaction are not reserved, nor is
+            # the serializer saved.
+            self._ids.restore(ids_state)
+            self._serializer_saved = serializer_saved
+            raise
+        finally:
+            self._open_txns['data_env'] -= 1
 
     @open_db
     @same_thread
     @contextmanager
     def readers(self, write=True):
         env = self.readers_env
-        with env.begin(write=write, buffers=True) as txn:
-#            checkpoints_db = self._get_db(env, txn, 'checkpoints_db_name')
-            yield Resources(env=env,
-                            txn=txn,
-                            db=DBOpener(env, txn))
+        try:
+            with self._begin('readers_env', write) as txn:
+#                checkpoints_db = self._get_db(env, txn, 'checkpoints_db_name')
+                yield Resources(env=env,
+                                txn=txn,
+                                db=DBOpener(env, txn))
+        finally:
+            self._open_txns['readers_env'] -= 1
 
     def _get_next_event_idx(self, res):
         with Config.cursor(res) as cursor:
@@ -204,20 +470,44 @@ class Connection:
         with Config.cursor(res) as cursor:
             return cursor.put('next_event_id', value, overwrite=True)
 
-    def _index(self, res, entry):
+    def _index_keys(self, entry):
+        """Yield `(index_name, index, key)` for every index of `entry`."""
         for index_name, index in self.model._indexes.items():
+            key = entry.get(index_name)
+            if index.mandatory and key is None:
+                raise ValueError("value %s is mandatory" % index_name)
+            elif key is not None:
+                yield index_name, index, key
+
+    def _index(self, res, entry):
+        for index_name, index, key in self._index_keys(entry):
             db_name = self._get_index_name(index_name)
             with index.cursor(res, db_name=db_name) as cursor:
-                key = entry.get(index_name)
-                if index.mandatory and key is None:
-                    raise ValueError("value %s is mandatory" % index_name)
-                elif key is not None:
-                    value = entry.pk
-                    if not cursor.put(key,
-                                      value,
-                                      overwrite=True,
-                                      dupdata=True):
-                        raise RuntimeError("Cannot index %s=%s" % (key, value))
+                value = entry.pk
+                if not cursor.put(key,
+                                  value,
+                                  overwrite=True,
+                                  dupdata=True):
+                    raise RuntimeError("Cannot index %s=%s" % (key, value))
+
+    def _bulk_index(self, res, pending):
+        """
+        Write the raw `(key, pk)` pairs collected in `pending` for each index
+        in one sorted pass using a single cursor per index database.
+
+        """
+        for index_name, pairs in pending.items():
+            if not pairs:
+                continue
+
+            pairs.sort()
+            db_name = self._get_index_name(index_name)
+            with res.txn.cursor(res.db[db_name]) as cursor:
+                consumed, added = cursor.putmulti(pairs,
+                                                  dupdata=True,
+                                                  overwrite=True)
+            if consumed != added:
+                raise RuntimeError("Cannot index %s" % index_name)
 
     def _unindex(self, res, entry):
         for index_name, index in self.model._indexes.items():
@@ -230,6 +520,7 @@ class Connection:
 
     @open_db
     @same_thread
+    @grow_map('data_env')
     def _drop_indexes(self):
         with self.data(write=True) as res:
             for index_name, index in self.model._indexes.items():
@@ -238,9 +529,10 @@ class Connection:
 
     @open_db
     @same_thread
+    @grow_map('data_env')
     def _reindex(self):
         with self.data(write=True) as res:
-            with Entries.cursor(res) as cursor:
+            with self.entries.cursor(res) as cursor:
                 found = cursor.first()
                 if found:
                     for key, value in cursor.iternext():
@@ -277,73 +569,289 @@ class Connection:
 
     @open_db
     @same_thread
+    @grow_map('data_env')
     def create(self, **kwargs):
         with self.data(write=True) as res:
-            next_idx = self._get_next_event_idx(res)
+            self._save_serializer(res)
+            next_idx = self._ids.allocate(res)
 
             entry = self.model(**kwargs)
-            with Entries.cursor(res) as cursor:
-                success = cursor.put(next_idx,
-                                     entry.copy(),
-                                     overwrite=False,
-                                     append=True)
-
-            self._update_next_event_idx(res, next_idx + 1)
+            with self.entries.cursor(res) as cursor:
+                # Ids from reserved blocks of different processes can be
+                # stored out of order, so `append` is only a hint.
+                success = (cursor.put(next_idx,
+                                      entry.copy(),
+                                      overwrite=False,
+                                      append=True)
+                           or cursor.put(next_idx,
+                                         entry.copy(),
+                                         overwrite=False))
 
             if success:
                 entry.pk = next_idx
                 entry.saved = True
                 self._index(res, entry)
-                return entry
             else:
                 raise IntegrityError("Key already exists")
 
+        self._notify()
+        return entry
+
+    def _put_raw(self, res, items, max_bytes=None, stored=None):
+        """
+        Store the `(raw_value, index_values)` pairs of `items` in the
+        `Entries` database using the transaction in `res`. `raw_value` is
+        stored as is and `index_values` is a mapping with the values of the
+        indexed fields.
+
+        If `max_bytes` is given stop consuming `items` once the values stored
+        reach that size. If `stored` is given it is called with the `pk`
+        and the `index_values` of every item as soon as its `pk` is
+        allocated, so the items are not kept until the write ends.
+
+        Return the number of items stored.
+
+        """
+        items = iter(items)
+        first = next(items, None)
+        if first is None:
+            return 0
+
+        self._save_serializer(res)
+
+        size = 0
+        pending = {index_name: [] for index_name in self.model._indexes}
+
+        def get_raw():
+            nonlocal size
+            for raw, index_values in chain([first], items):
+                pk = self._ids.allocate(res)
+                for index_name, index, key in self._index_keys(index_values):
+                    pending[index_name].append((index.K.db_value(key),
+                                                index.V.db_value(pk)))
+                if stored is not None:
+                    stored(pk, index_values)
+                yield (Entries.K.db_value(pk), raw)
+
+                size += raw.nbytes if isinstance(raw, memoryview) else len(raw)
+                if max_bytes is not None and size >= max_bytes:
+                    return
+
+        with res.txn.cursor(res.db['entries']) as cursor:
+            # Allocated ids always increase, so `append` is safe if the first
+            # one is past the last stored entry.
+            append = (not cursor.last()
+                      or (Entries.K.python_value(cursor.key())
+                          < self._ids.peek(res)))
+            consumed, added = cursor.putmulti(get_raw(),
+                                              dupdata=False,
+                                              overwrite=False,
+                                              append=append)
+
+        if consumed != added:
+            raise IntegrityError("Some key already exists")
+        else:
+            self._bulk_index(res, pending)
+            return added
+
+    def _put_entries(self, res, entries, max_bytes=None):
+        """
+        Store the model instances of `entries` using the transaction in `res`
+        and mark them as saved. Return the number of entries stored.
+
+        """
+        def serialize():
+            for entry in entries:
+                yield (self.entries.V.db_value(entry.copy()), entry)
+
+        def mark_as_saved(pk, entry):
+            entry.mark_as_saved(pk)
+
+        return self._put_raw(res, serialize(), max_bytes=max_bytes,
+                             stored=mark_as_saved)
+
+    @open_db
+    @same_thread
+    @grow_map('data_env')
+    def reserve_ids(self, count):
+        """
+        Reserve `count` entry ids for this connection with a single `Config`
+        update. The following `create` and `bulk_create` calls use them
+        without touching `Config`.
+
+        Return the range of reserved ids.
+
+        """
+        with self.data(write=True) as res:
+            start = self._ids.reserve(res, count)
+            return range(start, start + count)
+
     @open_db
     @same_thread
     def bulk_create(self, entries):
+        """
+        Store the model instances of `entries` in a single write transaction
+        and return the number of entries stored.
+
+        If the map can grow (`__meta_map_size_growth__`) the entries consumed
+        are kept until the write ends, to store them again if it fails
+        because the map is full. Use `bulk_create_stream` for large
+        iterables.
+
+        """
+        if self.model._meta['map_size_growth']:
+            # Retried after growing the map with the consumed entries first.
+            entries = Replayable(entries)
+        return self._bulk_create(entries)
+
+    @grow_map('data_env')
+    def _bulk_create(self, entries, max_bytes=None):
         with self.data(write=True) as res:
-            next_idx = self._get_next_event_idx(res)
+            added = self._put_entries(res, entries, max_bytes=max_bytes)
+        self._notify()
+        return added
 
-            def get_raw():
-                for pk, entry in enumerate(entries, next_idx):
-                    entry.mark_as_saved(pk)
-                    self._index(res, entry)
-                    yield (pk, entry.copy())
+    @open_db
+    @same_thread
+    def bulk_create_stream(self, entries, chunk_size=1000, chunk_bytes=None):
+        """
+        Store an arbitrarily long iterable of entries (models or dicts)
+        committing a write transaction every `chunk_size` entries or every
+        `chunk_bytes` bytes of serialized values, whatever comes first.
 
-            with Entries.cursor(res) as cursor:
-                consumed, added = cursor.putmulti(get_raw(),
-                                                  dupdata=False,
-                                                  overwrite=False,
-                                                  append=True)
+        Return a generator yielding the running count of stored entries after
+        each commit. Nothing is stored until the generator is consumed.
 
-            self._update_next_event_idx(res, next_idx + consumed)
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be greater than 0")
+        if chunk_bytes is not None and chunk_bytes < 1:
+            raise ValueError("chunk_bytes must be greater than 0")
 
-            if consumed != added:
-                raise IntegrityError("Some key already exists")
-            else:
-                return added
+        entries = (e if isinstance(e, self.model) else self.model(**e)
+                   for e in entries)
+
+        def stream():
+            total = 0
+            chunk = []
+            while True:
+                chunk.extend(islice(entries, chunk_size - len(chunk)))
+                if not chunk:
+                    break
+
+                added = self._bulk_create(chunk, max_bytes=chunk_bytes)
+                # Entries not stored because of `chunk_bytes` go to the next
+                # chunk.
+                chunk = chunk[added:]
+                total += added
+                yield total
+
+        return stream()
+
+    @open_db
+    @same_thread
+    @grow_map('data_env')
+    def create_raw(self, value, **index_values):
+        """
+        Store an already serialized entry and return its `pk`.
+
+        `value` is a bytes-like object (ex. `memoryview`) with the value
+        exactly as serialized by the serializer of the binlog
+        (`connection.entries.V`); it is stored without building a model
+        instance nor copying it. The values of the indexed fields must
+        be given as keyword arguments.
+
+        """
+        with self.data(write=True) as res:
+            pks = []
+            self._put_raw(res, [(value, index_values)],
+                          stored=lambda pk, _: pks.append(pk))
+        self._notify()
+        return pks[0]
+
+    @open_db
+    @same_thread
+    def bulk_create_raw(self, items):
+        """
+        Store the already serialized entries of `items` in a single write
+        transaction.
+
+        `items` is an iterable of `(value, index_values)` pairs. See
+        `create_raw`. Return the list of assigned `pk`.
+
+        """
+        items = [(value, {} if index_values is None else index_values)
+                 for value, index_values in items]
+        return self._bulk_create_raw(items)
+
+    @grow_map('data_env')
+    def _bulk_create_raw(self, items):
+        with self.data(write=True) as res:
+            pks = []
+            self._put_raw(res, items, stored=lambda pk, _: pks.append(pk))
+        self._notify()
+        return pks
+
+    @open_db
+    @same_thread
+    def batched_writer(self, max_entries=1000, max_delay_ms=None):
+        return BatchedWriter(self,
+                             max_entries=max_entries,
+                             max_delay_ms=max_delay_ms)
 
     @open_db
     @same_thread
     @MaskException(lmdb.ReadonlyError, ReaderDoesNotExist)
-    def reader(self, name=None):
-        if name is not None and name not in self.list_readers():
-            raise ReaderDoesNotExist("%s reader does not exists" % name)
+    def reader(self, name=None, lazy=False, commit_every=None,
+               commit_interval=None, commit_max_segments=None):
+        """
+        Return a `Reader` of the binlog using the registry of reader `name`
+        (all the entries if `name` is None).
 
-        from binlog.registry import MemoryCachedDBRegistry
-        from binlog.abstract import Direction
+        With `lazy=True` the reader returns `LazyModel` instances decoding
+        each entry on first field access. See `Reader` for the automatic
+        commit options.
 
-        registry = MemoryCachedDBRegistry(
-            name=name,
-            connection=self,
-            direction=Direction.F) if name in self.list_readers() else None
+        """
+        if name is None:
+            registry = None
+        elif name not in self.list_readers():
+            raise ReaderDoesNotExist("%s reader does not exists" % name)
+        else:
+            from binlog.abstract import Direction
 
-        return Reader(self, name, registry)
+            with self.readers(write=False) as res:
+                encoding = self._get_reader_stats(res, name)['encoding']
+            memory_class, db_class = REGISTRY_ENCODINGS[encoding]
+            registry = MemoryCachedDBRegistry(
+                name=name,
+                connection=self,
+                direction=Direction.F,
+                registry=memory_class(),
+                db_class=db_class)
+
+        return Reader(self, name, registry,
+                      lazy=lazy,
+                      commit_every=commit_every,
+                      commit_interval=commit_interval,
+                      commit_max_segments=commit_max_segments)
 
     @open_db
     @same_thread
-    def register_reader(self, name, content=None):
-        if name in self.list_readers():
+    @grow_map('readers_env')
+    def register_reader(self, name, content=None, encoding='segments'):
+        """
+        Register the reader `name`.
+
+        `encoding` is the format of its registry: 'segments' (one record per
+        range of acked pks, best for acks in order) or 'bitmap' (one
+        compressed bitmap per block of 2**16 pks, best for acks in random
+        order).
+
+        """
+        if encoding not in REGISTRY_ENCODINGS:
+            raise ValueError("Unknown registry encoding %r" % encoding)
+        elif name in self.list_readers():
             return False
         else:
             path = name.split('.')
@@ -355,16 +863,20 @@ class Connection:
                     if content is not None:
                         raise NotImplementedError("XXX")
                     result = True
+                self._put_reader_stats(res, name,
+                                       self._empty_reader_stats(encoding))
 
             parents = path[:-1]
             if not parents:
                 return result
             else:
-                parents_result = self.register_reader('.'.join(parents))
+                parents_result = self.register_reader('.'.join(parents),
+                                                      encoding=encoding)
                 return result or parents_result
 
     @open_db
     @same_thread
+    @grow_map('readers_env')
     def clone_reader(self, src, dst):
         readers = self.list_readers()
         if src not in readers:
@@ -373,9 +885,14 @@ class Connection:
             raise RuntimeError("%s reader already exists." % dst)
         else:
             with self.readers(write=True) as res:
-                with RegistryDB.named(src).cursor(res) as scursor:
-                    with RegistryDB.named(dst).cursor(res) as dcursor:
+                # Copied raw, as the values depend on the encoding.
+                src_db = res.db[RegistryDB.named(src).get_db_name(None)]
+                dst_db = res.db[RegistryDB.named(dst).get_db_name(None)]
+                with res.txn.cursor(src_db) as scursor:
+                    with res.txn.cursor(dst_db) as dcursor:
                         dcursor.putmulti(scursor.iternext())
+                self._put_reader_stats(res, dst,
+                                       self._get_reader_stats(res, src))
 
     @open_db
     @same_thread
@@ -386,65 +903,220 @@ class Connection:
         else:
             with self.readers(write=True) as res:
                 res.txn.drop(res.db[name])
+                with ReaderStats.cursor(res) as cursor:
+                    if cursor.get(name) is not None:
+                        cursor.delete2()
                 return True
 
     @open_db
     @same_thread
+    @grow_map('readers_env')
     def save_registry(self, name, added):
+        """
+        Merge the `added` registry into the stored registry of reader `name`.
+
+        Both are sorted, so they are merged in a single pass seeking the
+        stored segments that overlap or are adjacent to each new segment.
+        Stored segments already containing the new ones are left untouched.
+
+        The read transactions of the stored registries of the connection are
+        ended first: they would pin the pages replaced by the write and stop
+        the map from growing.
+
+        """
+        self._end_registry_txns()
         with self.readers(write=True) as res:
+            stats = self._get_reader_stats(res, name)
+            if stats['encoding'] == 'bitmap':
+                self._save_bitmap_registry(res, name, added, stats)
+                self._put_reader_stats(res, name, stats)
+                return True
+
             with RegistryDB.named(name).cursor(res) as cursor:
-                for s in added.acked:
-                    s_L = max([s.MIN, s.L - 1])
-                    s_R = min([s.MAX, s.R + 1])
 
-                    if cursor.set_range(s_L):
-                        f_R, f_L = cursor.item()
-                        if f_L <= s_L:
-                            first = (f_L, f_R)
-                        else:
-                            first = None
-                    else:
-                        first = None
+                def delete2():
+                    # Keep the stats in sync with the stored segments.
+                    c_R, c_L = cursor.item()
+                    stats['segments'] -= 1
+                    stats['acked'] -= c_R - c_L + 1
+                    cursor.delete2()
+                    # Return whether the cursor is on the next segment.
+                    return bool(cursor.cursor.key())
+
+                def put(segment):
+                    stats['segments'] += 1
+                    stats['acked'] += segment.R - segment.L + 1
+                    cursor.put(segment.R, segment.L)
+
+                # Merged segment not written yet, key of the stored segment
+                # equal to it and keys of stored segments merged into it.
+                pending = kept = None
+                stale = []
+
+                def flush():
+                    for key in stale:
+                        if cursor.get(key) is not None:
+                            delete2()
+                    del stale[:]
+                    if pending is not None and kept is None:
+                        put(pending)
 
-                    if cursor.set_range(s_R):
-                        l_R, l_L = cursor.item()
-                        if l_L <= s_R:
-                            last = (l_L, l_R)
-                        else:
-                            last = None
+                for s in added.acked:
+                    if pending is not None and s.L <= pending.R + 1:
+                        pending = S(pending.L, max(pending.R, s.R))
                     else:
-                        last = None
+                        flush()
+                        pending, kept = s, None
+
+                    found = cursor.set_range(max(S.MIN, pending.L - 1))
+                    while found:
+                        c_R, c_L = cursor.item()
+                        if c_L > pending.R + 1:
+                            break
+                        elif c_L <= pending.L and pending.R <= c_R:
+                            # Already stored
+                            pending, kept = S(c_L, c_R), c_R
+                            found = cursor.next()
+                        else:
+                            if kept is not None and kept != c_R:
+                                stale.append(kept)
+                            pending = S(min(pending.L, c_L),
+                                        max(pending.R, c_R))
+                            kept = None
+                            found = delete2()
+
+                flush()
+
+                stats['first_unacked'] = self._first_unacked(cursor)
+                stats['committed_at'] = time.time()
+            self._put_reader_stats(res, name, stats)
+            return True
+
+    def _save_bitmap_registry(self, res, name, added, stats):
+        """OR the containers of `added` into the stored ones."""
+        if isinstance(added, MemoryCachedDBRegistry):
+            added = added.memory.registry
+        if not isinstance(added, BitmapRegistry):
+            added = BitmapRegistry.from_segments(added.acked)
+
+        with BitmapDB.named(name).cursor(res) as cursor:
+            for key in added.keys:
+                old = cursor.get(key, default=0)
+                new = old | added._container(key)
+                if new != old:
+                    stats['segments'] += not old
+                    stats['acked'] += popcount(new ^ old)
+                    cursor.put(key, new)
+
+            stats['first_unacked'] = CursorBitmap(cursor).next_unset(S.MIN)
+            stats['committed_at'] = time.time()
+
+    def _empty_reader_stats(self, encoding='segments'):
+        return {'segments': 0,
+                'acked': 0,
+                'first_unacked': S.MIN,
+                'committed_at': None,
+                'encoding': encoding}
+
+    def _first_unacked(self, cursor):
+        """Return the lowest pk not in the registry of `cursor`."""
+        if cursor.first():
+            R, L = cursor.item()
+            if L == S.MIN:
+                return R + 1
+        return S.MIN
+
+    def _get_reader_stats(self, res, name):
+        """
+        Return the stored stats of reader `name`, computing them from its
+        registry if missing (readers registered by older versions).
+
+        """
+        try:
+            with ReaderStats.cursor(res) as cursor:
+                stats = cursor.get(name)
+        except lmdb.ReadonlyError:
+            stats = None
+
+        if stats is None:
+            stats = self._empty_reader_stats()
+            with RegistryDB.named(name).cursor(res) as cursor:
+                for R, L in cursor.iternext():
+                    stats['segments'] += 1
+                    stats['acked'] += R - L + 1
+                stats['first_unacked'] = self._first_unacked(cursor)
+
+        stats.setdefault('encoding', 'segments')
+        return stats
+
+    def _put_reader_stats(self, res, name, stats):
+        with ReaderStats.cursor(res) as cursor:
+            cursor.put(name, stats)
 
-                    if first is None and last is None:
-                        cursor.put(s.R, s.L)
+    @open_db
+    @same_thread
+    @MaskException(lmdb.ReadonlyError, ReaderDoesNotExist)
+    def reader_stats(self, name):
+        """
+        Return the stats of the registry of reader `name` as of its last
+        commit:
+
+        - `segments`: number of stored segments (containers for bitmap
+          registries).
+        - `acked`: number of acked pks.
+        - `first_unacked`: lowest pk not acked.
+        - `committed_at`: timestamp of the last commit (or None).
+        - `encoding`: encoding of the registry.
+
+        """
+        with self.readers(write=False) as res:
+            return self._get_reader_stats(res, name)
+
+    @open_db
+    @same_thread
+    def reader_lag(self):
+        """
+        Return a dict with the lag of every reader as of its last commit:
+        the number of pks up to the last stored entry not acked.
+
+        The lag is computed from the reader stats without scanning the
+        entries, so it also counts the pks reserved by the id allocator but
+        never used and the entries removed before the reader acked them.
+        Only the stored segments past the last entry are read, to discount
+        the pks acked beyond it.
+
+        """
+        try:
+            with self.data(write=False) as res:
+                with res.txn.cursor(res.db['entries']) as cursor:
+                    if cursor.last():
+                        next_pk = Entries.K.python_value(cursor.key()) + 1
                     else:
-                        if last is None:
-                            cursor.get(f_R)
-                            while cursor.delete2():
-                                pass
-                            cursor.put(s.R, f_L)
-                        elif first is None:
-                            while cursor.first():
-                                c_R, c_L = cursor.item()
-                                cursor.delete2()
-                                if (c_L, c_R) == (l_L, l_R):
-                                    break
-                            cursor.put(l_R, s.L)
-                        else:
-                            # Both present
-                            if first == last:
-                                # This means is already in the segment, so
-                                # already acked. Nothing to do here.
-                                pass
-                            else:
-                                cursor.get(f_R)
-                                while cursor.delete2():
-                                    c_R, c_L = cursor.item()
-                                    if (c_L, c_R) == (l_L, l_R):
-                                        cursor.delete2()
-                                        break
-                                cursor.put(l_R, f_L)
-                return True
+                        next_pk = 0
+        except lmdb.ReadonlyError:
+            next_pk = 0
+
+        lag = {}
+        readers = self.list_readers()
+        if readers:
+            with self.readers(write=False) as res:
+                for name in readers:
+                    stats = self._get_reader_stats(res, name)
+                    acked = stats['acked'] - self._acked_from(
+                        name, stats['encoding'], next_pk)
+                    lag[name] = next_pk - acked
+        return lag
+
+    def _acked_from(self, name, encoding, pk):
+        """Return the number of pks from `pk` on acked by reader `name`."""
+        db_class = REGISTRY_ENCODINGS[encoding][1]
+        acked = 0
+        with db_class(name, self) as registry, suppress(StopIteration):
+            registry.seek(pk)
+            while True:
+                L, R = registry.next_range()
+                acked += R - L + 1
+        return acked
 
     @open_db
     @same_thread
@@ -464,6 +1136,7 @@ class Connection:
 
     @open_db
     @same_thread
+    @grow_map('data_env')
     def remove(self, entry):
         readers = self.list_readers()
         if not readers:
@@ -475,7 +1148,7 @@ class Connection:
                     return False
         else:
             with self.data(write=True) as res:
-                with Entries.cursor(res) as cursor:
+                with self.entries.cursor(res) as cursor:
                     success = cursor.pop(entry.pk) is not None
                     if success:
                         self._unindex(res, entry)
@@ -487,6 +1160,18 @@ class Connection:
         if chunk_size < 1:
             raise ValueError("chunk_size must be greater than 0")
 
+        counts = [0, 0]
+        self._purge(chunk_size, counts)
+        return tuple(counts)
+
+    @grow_map('data_env')
+    def _purge(self, chunk_size, counts):
+        """
+        Remove the entries acked by every reader in chunks of `chunk_size`,
+        adding the removed and not found pks of every committed chunk to
+        `counts`, so retrying after growing the map doesn't lose them.
+
+        """
         registries = []
 
         for name in self.list_readers():
@@ -495,22 +1180,29 @@ class Connection:
             except ReaderDoesNotExist:
                 pass
 
-        removed = not_found = 0
-        if registries:
-            with self.data(write=False) as resr:
-                with Entries.cursor(resr) as rcursor:
-                    common_acked = iter(reduce(op.and_, registries, rcursor))
-                    idx = chunk_size
-                    while idx == chunk_size:
-                        idx = 0
-                        it = islice(common_acked, 0, chunk_size)
-                        with self.data(write=True) as res:
-                            with Entries.cursor(res) as cursor:
-                                for idx, pk in enumerate(it, 1):
-                                    value = cursor.pop(pk)
-                                    if value is not None:
-                                        removed += 1
-                                        self._unindex(res, self.model(**value))
-                                    else:
-                                        not_found += 1
-        return removed, not_found
+        try:
+            if registries:
+                with self.data(write=False) as resr:
+                    with self.entries.cursor(resr) as rcursor:
+                        common_acked = iter(reduce(op.and_,
+                                                   registries,
+                                                   rcursor))
+                        idx = chunk_size
+                        while idx == chunk_size:
+                            idx = removed = not_found = 0
+                            it = islice(common_acked, 0, chunk_size)
+                            with self.data(write=True) as res:
+                                with self.entries.cursor(res) as cursor:
+                                    for idx, pk in enumerate(it, 1):
+                                        value = cursor.pop(pk)
+                                        if value is not None:
+                                            removed += 1
+                                            self._unindex(
+                                                res, self.model(**value))
+                                        else:
+                                            not_found += 1
+                            counts[0] += removed
+                            counts[1] += not_found
+        finally:
+            for registry in registries:
+                registry.close()
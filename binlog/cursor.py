@@ -1,5 +1,7 @@
 from collections import namedtuple
 
+import lmdb
+
 from .abstract import IterSeek, Direction
 
 
@@ -67,6 +69,17 @@ class CursorProxy(IterSeek):
                 return self._from_key(raw_key)
 
 
+    def cardinality(self):
+        """Number of duplicates of `dupkey`, or of entries of the DB."""
+        try:
+            if not self.dupsort:
+                return self.res.txn.stat(self.res.db[self.db_name])['entries']
+            elif self.dupkey is not None:
+                return self.cursor.count()
+        except lmdb.Error:
+            pass
+        return None
+
     @property
     def dupkey(self):
         return self._dupkey
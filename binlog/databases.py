@@ -1,6 +1,7 @@
 from .abstract import Database
 from .index import NumericIndex
 
+from .serializer import BitmapSerializer
 from .serializer import NumericSerializer
 from .serializer import ObjectSerializer
 from .serializer import TextSerializer
@@ -15,6 +16,10 @@ class Config(Database):
 class Entries(NumericIndex):
     V = ObjectSerializer
 
+    @classmethod
+    def serialized_with(cls, serializer):
+        return type(cls.__name__, (cls, ), {'V': serializer})
+
 
 class Checkpoints(Database):
     K = NullListSerializer
@@ -30,6 +35,15 @@ class Registry(Database):
         return type(name, (cls, ), {})
 
 
+class Bitmap(Registry):
+    V = BitmapSerializer
+
+
 class Hints(Database):
     K = TextSerializer
     V = NumericSerializer
+
+
+class ReaderStats(Database):
+    K = TextSerializer
+    V = ObjectSerializer
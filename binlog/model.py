@@ -1,9 +1,34 @@
+from collections.abc import Mapping
 import re
 
 from .connection import Connection
+from .databases import Entries
 from .exceptions import BadUsageError
 from .index import Index
-from .serializer import NumericSerializer, ObjectSerializer
+from .serializer import CompressedSerializer, NumericSerializer
+from .serializer import COMPRESSIONS, SERIALIZERS
+
+
+#: Named sets of LMDB flags trading durability for write throughput.
+#:
+#: - `durable`: flush data and metadata on every commit (LMDB defaults).
+#: - `balanced`: don't flush the metadata page on commit. A system crash can
+#:   lose the last committed transaction but the database stays consistent.
+#: - `fast`: leave flushing to the OS (see `Connection.sync`). A system crash
+#:   can lose recent transactions and even corrupt the database.
+DURABILITY_PROFILES = {
+    'durable': {'sync': True,
+                'metasync': True,
+                'writemap': False,
+                'map_async': False},
+    'balanced': {'sync': True,
+                 'metasync': False,
+                 'writemap': False,
+                 'map_async': False},
+    'fast': {'sync': False,
+             'metasync': False,
+             'writemap': True,
+             'map_async': True}}
 
 
 class ModelMeta(type):
@@ -18,6 +43,14 @@ class ModelMeta(type):
                                 '{index_name}'),
             'readers_env_directory': 'readers',
             'data_env_directory': 'data',
+            'notify_directory': 'notify',
+            'id_block_size': 1,
+            'map_size_growth': 2,
+            'map_size_max': None,
+            'durability': None,
+            'serializer': 'pickle',
+            'compression': None,
+            'compression_threshold': 256,
             'connection_class': Connection}
         for attr, value in namespace.copy().items():
             # Replace any __meta_*__ by an entry in the _meta dict.
@@ -37,9 +70,29 @@ class ModelMeta(type):
         return result
 
 
+class ModelSerializer:
+    """
+    Serializer of the entries of new binlogs of the model, from
+    `__meta_serializer__` and `__meta_compression__`, unless `V` is
+    redefined in a subclass. Binlogs can use another one, see
+    `Connection.entries`.
+
+    """
+    def __get__(self, instance, owner):
+        if owner._meta['serializer'] not in SERIALIZERS:
+            raise ValueError(
+                "Unknown serializer %r" % owner._meta['serializer'])
+        serializer = SERIALIZERS[owner._meta['serializer']]
+        if owner._meta['compression'] is not None:
+            serializer = CompressedSerializer.wrapping(
+                serializer, owner._meta['compression'],
+                owner._meta['compression_threshold'])
+        return serializer
+
+
 class Model(dict, metaclass=ModelMeta):
     K = NumericSerializer
-    V = ObjectSerializer
+    V = ModelSerializer()
 
     def __init__(self, *args, **kwargs):
         self.pk = None
@@ -48,7 +101,42 @@ class Model(dict, metaclass=ModelMeta):
         super().__init__(*args, **kwargs)
 
     @classmethod
-    def open(cls, path, **kwargs):
+    def open(cls, path, durability=None, **kwargs):
+        """
+        Open a connection to the binlog in `path`.
+
+        `durability` is the name of one of `DURABILITY_PROFILES` (defaults
+        to `__meta_durability__`). Its flags are used for any LMDB flag not
+        given in `kwargs`.
+
+        New binlogs serialize their entries with the serializer named by
+        `__meta_serializer__` (see `SERIALIZERS`). Existing binlogs keep the
+        serializer they were created with, warning if it is not the one of
+        the model. Values longer than `__meta_compression_threshold__` bytes
+        are written compressed if `__meta_compression__` names one of
+        `COMPRESSIONS`, only in binlogs created with compression.
+
+        """
+        if cls._meta['serializer'] not in SERIALIZERS:
+            raise ValueError(
+                "Unknown serializer %r" % cls._meta['serializer'])
+        elif (cls._meta['compression'] is not None
+              and cls._meta['compression'] not in COMPRESSIONS):
+            raise ValueError(
+                "Unknown compression %r" % cls._meta['compression'])
+
+        if durability is None:
+            durability = cls._meta['durability']
+
+        if durability is not None:
+            try:
+                profile = DURABILITY_PROFILES[durability]
+            except KeyError:
+                raise ValueError(
+                    "Unknown durability profile %r" % durability) from None
+            else:
+                kwargs = dict(profile, **kwargs)
+
         # This MUST be imported every time because can be invalidated by
         # `reset_connections`.
         from .connectionmanager import PROCESS_CONNECTIONS
@@ -63,10 +151,16 @@ class Model(dict, metaclass=ModelMeta):
         self.pk = pk
         self.saved = True
 
-    def save(self, pk, db, txn):
+    def save(self, pk, db, txn, connection=None):
+        """
+        Store the entry as `pk` in `db` using `txn`, serialized with the
+        serializer of the binlog of `connection` if given, `V` otherwise.
+
+        """
+        serializer = self.V if connection is None else connection.entries.V
         with txn.cursor(db) as cursor:
             success = cursor.put(self.K.db_value(pk),
-                                 self.V.db_value(self.copy()),
+                                 serializer.db_value(self.copy()),
                                  overwrite=False)
 
             if success:
@@ -85,3 +179,55 @@ class Model(dict, metaclass=ModelMeta):
 
         with cls.open(path, **kwargs) as conn:
             conn._reindex()
+
+
+class LazyModel(Mapping):
+    """
+    Read-only view of a stored entry of `model` keeping the serialized
+    value and decoding it with `serializer` on first field access.
+
+    `raw` is copied, so it can be a buffer only valid during the read
+    transaction.
+
+    """
+    __slots__ = ('model', 'pk', 'saved', 'serializer', '_raw', '_entry')
+
+    def __init__(self, model, pk, raw, serializer=Entries.V):
+        self.model = model
+        self.pk = pk
+        self.saved = True
+        self.serializer = serializer
+        self._raw = bytes(raw)
+        self._entry = None
+
+    @property
+    def decoded(self):
+        return self._entry is not None
+
+    def decode(self):
+        """Return the entry as a `model` instance."""
+        if self._entry is None:
+            entry = self.model(**self.serializer.python_value(self._raw))
+            entry.mark_as_saved(self.pk)
+            self._entry = entry
+            self._raw = None
+
+        return self._entry
+
+    def __getitem__(self, key):
+        return self.decode()[key]
+
+    def __iter__(self):
+        return iter(self.decode())
+
+    def __len__(self):
+        return len(self.decode())
+
+    def __repr__(self):  # pragma: no cover
+        if self.decoded:
+            return "<%s %s pk=%r>" % (type(self).__name__,
+                                     dict(self._entry),
+                                     self.pk)
+        else:
+            return "<%s pk=%r (not decoded)>" % (type(self).__name__,
+                                                 self.pk)
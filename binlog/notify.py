@@ -0,0 +1,174 @@
+"""
+Wake up readers waiting for new entries.
+
+Every waiting reader owns a FIFO in the notification directory of the
+binlog. Writers write a byte to each of them after committing.
+
+"""
+from contextlib import suppress
+import errno
+import os
+import select
+import time
+import uuid
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    else:
+        return True
+
+
+def _notify(directory, names):
+    notified = 0
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.startswith('.'):
+            # Not opened by its subscriber yet, or left behind if the
+            # subscriber died before.
+            pid = name[1:].split('-', 1)[0]
+            if pid.isdigit() and not _alive(int(pid)):
+                with suppress(FileNotFoundError):
+                    os.unlink(path)
+            continue
+
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        except FileNotFoundError:
+            continue
+        except OSError as exc:
+            if exc.errno == errno.ENXIO:
+                # Nobody has the FIFO open, the subscriber died.
+                with suppress(FileNotFoundError):
+                    os.unlink(path)
+            continue
+
+        try:
+            os.write(fd, b'\0')
+        except BlockingIOError:
+            # The FIFO is full, the subscriber is already notified.
+            pass
+        finally:
+            os.close(fd)
+
+        notified += 1
+
+    return notified
+
+
+def notify(directory):
+    """
+    Wake up every subscription of `directory`.
+
+    Return the number of subscriptions notified.
+
+    """
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return 0
+
+    return _notify(directory, names)
+
+
+class Notifier:
+    """
+    `notify` the subscriptions of `directory`, with just a `stat` while
+    the directory is known to have none.
+
+    """
+    #: Seconds a directory must be unchanged to trust it has no entries,
+    #: changes within the resolution of its mtime go unnoticed.
+    STABLE_AFTER = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._empty_mtime = None
+
+    def __call__(self):
+        try:
+            mtime = os.stat(self.directory).st_mtime
+            if mtime == self._empty_mtime:
+                return 0
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+
+        if not names and time.time() - mtime > self.STABLE_AFTER:
+            self._empty_mtime = mtime
+        else:
+            self._empty_mtime = None
+        return _notify(self.directory, names)
+
+
+class Subscription:
+    """
+    Wait for the notifications sent to `directory`.
+
+    Without FIFO support `wait` just sleeps, with an exponential backoff
+    from `min_delay` to `max_delay` seconds reset by `reset`.
+
+    """
+    def __init__(self, directory, min_delay=0.001, max_delay=0.1):
+        self.directory = directory
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min_delay
+
+        self.path = None
+        self.fd = None
+        if hasattr(os, 'mkfifo'):
+            os.makedirs(directory, exist_ok=True)
+            name = '%d-%s' % (os.getpid(), uuid.uuid4().hex)
+            tmp_path = os.path.join(directory, '.' + name)
+            os.mkfifo(tmp_path)
+            # Opened for writing too so it never reads EOF.
+            self.fd = os.open(tmp_path, os.O_RDWR | os.O_NONBLOCK)
+            self.path = os.path.join(directory, name)
+            os.rename(tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_, **__):
+        self.close()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            with suppress(FileNotFoundError):
+                os.unlink(self.path)
+
+    def reset(self):
+        self.delay = self.min_delay
+
+    def wait(self, timeout=None):
+        """
+        Block until a notification arrives or `timeout` seconds elapse.
+
+        Return True if notified. Notifications are consumed, so every
+        notification sent before the call wakes up at most one `wait`.
+
+        """
+        if self.fd is None:
+            delay = self.delay if timeout is None else min(self.delay,
+                                                           timeout)
+            time.sleep(delay)
+            self.delay = min(self.delay * 2, self.max_delay)
+            return False
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+
+        with suppress(BlockingIOError):
+            while os.read(self.fd, 4096):
+                pass
+
+        return True
@@ -1,13 +1,25 @@
-from binlog.abstract import IterSeek, Direction
-from binlog.registry import S
+from heapq import heappop, heappush
 
+from binlog.abstract import Direction
+from binlog.registry import EXHAUSTED, RangeIterSeek, S
+
+
+class BinaryIterSeek(RangeIterSeek):
+    """
+    Combine the ranges of `things`.
+
+    `things` not implementing the range protocol produce one range per
+    value, so they are combined value by value.
+
+    """
+    #: Whether nested operations of the same class are flattened.
+    associative = True
 
-class BinaryIterSeek(IterSeek):
     def __init__(self, *things):
         self.things = list()
 
         for thing in things:
-            if isinstance(thing, self.__class__):
+            if self.associative and isinstance(thing, self.__class__):
                 self.things.extend(thing.things)
             else:
                 self.things.append(thing)
@@ -18,50 +30,280 @@ class BinaryIterSeek(IterSeek):
         self.direction = self.things[0].direction
         self.seeked = None
 
+        # Current range of every thing (None if exhausted)
+        self.current = None
+        # Things whose current range was used up, see `_start`.
+        self.stale = []
+
     def seek(self, value):
+        self._pending = None
         self.seeked = value
 
+    def _fetch(self, thing):
+        try:
+            return thing.next_range()
+        except StopIteration:
+            return None
+
+    def _start(self):
+        """
+        Seek the things if needed and return their current ranges.
+
+        The things in `stale` are only advanced here, on the call after
+        their last range was returned, so a cursor stays on the last value
+        returned until the next one is requested.
+
+        """
+        if self.seeked is not None:
+            seeked, self.seeked = self._clamp(self.seeked), None
+            self.stale = []
+            if seeked is EXHAUSTED:
+                self.current = [None] * len(self.things)
+                return self.current
+            for thing in self.things:
+                thing.seek(seeked)
+            self.current = None
+
+        if self.current is None:
+            self.current = [self._fetch(t) for t in self.things]
+        else:
+            for idx in self.stale:
+                self.current[idx] = self._fetch(self.things[idx])
+        self.stale = []
+        return self.current
+
 
 class ANDIterSeek(BinaryIterSeek):
-    def __next__(self):
-        first, rest = self.things[0], self.things[1:]
-        if self.seeked is not None and S.MIN <= self.seeked <= S.MAX:
-            first.seek(self.seeked)
-            self.seeked = None
-        for cf in first:
-            for t in rest:
-                t.seek(cf)
-                ct = next(t)
-                if cf != ct:
-                    first.seek(ct)
-                    break
+    """
+    Intersection of `things`, computed leapfrog style: the operand lagging
+    behind is sought to the furthest position reached by the others,
+    starting with the operand with fewer values.
+
+    """
+    def __init__(self, *things):
+        super().__init__(*things)
+
+        def estimate(thing):
+            cardinality = thing.cardinality()
+            return float('inf') if cardinality is None else cardinality
+
+        self.things.sort(key=estimate)
+
+    def cardinality(self):
+        known = [c for c in (t.cardinality() for t in self.things)
+                 if c is not None]
+        return min(known) if known else None
+
+    def _next_range(self):
+        current = self._start()
+        if None in current:
+            raise StopIteration
+
+        forward = self.direction is Direction.F
+        if forward:
+            frontier = max(r.L for r in current)
+        else:
+            frontier = min(r.R for r in current)
+
+        # Visit the operands in turn until all of them contain `frontier`.
+        agreed = idx = 0
+        while agreed < len(current):
+            r = current[idx]
+            if forward and r.R < frontier or not forward and r.L > frontier:
+                # Lagging behind
+                self.things[idx].seek(frontier)
+                r = current[idx] = self._fetch(self.things[idx])
+                if r is None:
+                    raise StopIteration
+
+            if r.L <= frontier <= r.R:
+                agreed += 1
             else:
-                self.seeked = cf + self.direction.value
-                return cf
+                frontier = r.L if forward else r.R
+                agreed = 1
+            idx = (idx + 1) % len(current)
+
+        if forward:
+            L, R = frontier, min(r.R for r in current)
         else:
-            raise StopIteration
+            L, R = max(r.L for r in current), frontier
+
+        # Keep what is left of every range past the intersection.
+        for i, r in enumerate(current):
+            if forward:
+                left = S(R + 1, r.R) if r.R > R else None
+            else:
+                left = S(r.L, L - 1) if r.L < L else None
+            current[i] = left
+            if left is None:
+                self.stale.append(i)
+        return S(L, R)
 
 
 class ORIterSeek(BinaryIterSeek):
-    def __next__(self):
-        if self.direction is Direction.F:
-            comp = min
-            R = float('inf')
-        else:
-            comp = max
-            R = float('-inf')
-
-        for t in self.things:
-            if self.seeked is not None:
-                t.seek(self.seeked)
-            c = next(t, R)
-            if c == self.seeked:
-                self.seeked += self.direction.value
-                return c
+    """
+    Union of `things`, merged with a heap of their current ranges so only
+    the operands whose ranges are returned are advanced.
+
+    """
+    heap = None
+
+    def cardinality(self):
+        cardinalities = [t.cardinality() for t in self.things]
+        if None in cardinalities:
+            return None
+        return sum(cardinalities)
+
+    def _push(self, idx, r):
+        if r is not None:
+            if self.direction is Direction.F:
+                heappush(self.heap, (r.L, idx))
             else:
-                R = comp((R, c))
-        if R < S.MIN or R > S.MAX:
+                heappush(self.heap, (-r.R, idx))
+
+    def _advance(self, idx):
+        r = self.current[idx] = self._fetch(self.things[idx])
+        self._push(idx, r)
+
+    def _next_range(self):
+        if self.heap is None or self.seeked is not None:
+            self.heap = []
+            for idx, r in enumerate(self._start()):
+                self._push(idx, r)
+
+        if not self.heap:
             raise StopIteration
-        else:
-            self.seeked = R + self.direction.value
-            return R
+
+        forward = self.direction is Direction.F
+        _, idx = heappop(self.heap)
+        L, R = self.current[idx]
+        self._advance(idx)
+
+        # Join the ranges overlapping or adjacent to the union.
+        while self.heap:
+            idx = self.heap[0][1]
+            r = self.current[idx]
+            if forward and r.L > R + 1 or not forward and r.R < L - 1:
+                break
+            heappop(self.heap)
+            L, R = min(L, r.L), max(R, r.R)
+            self._advance(idx)
+
+        return S(L, R)
+
+
+class DIFFIterSeek(BinaryIterSeek):
+    """
+    Values of `minuend` not in `subtrahend`.
+
+    Ranges of the subtrahend covering the current range of the minuend
+    seek the minuend past them.
+
+    """
+    associative = False
+
+    def __init__(self, minuend, subtrahend):
+        super().__init__(minuend, subtrahend)
+
+    def cardinality(self):
+        return self.things[0].cardinality()
+
+    def _next_range(self):
+        current = self._start()
+        minuend, subtrahend = self.things
+        forward = self.direction is Direction.F
+        while True:
+            a, b = current
+            if a is None:
+                raise StopIteration
+            elif (b is None
+                  or forward and b.L > a.R
+                  or not forward and b.R < a.L):
+                # Nothing to subtract from `a`
+                current[0] = None
+                self.stale.append(0)
+                return a
+            elif forward and b.R < a.L or not forward and b.L > a.R:
+                # `b` is behind
+                subtrahend.seek(a.L if forward else a.R)
+                current[1] = self._fetch(subtrahend)
+            elif forward and b.L > a.L:
+                current[0] = S(b.L, a.R)
+                return S(a.L, b.L - 1)
+            elif not forward and b.R < a.R:
+                current[0] = S(a.L, b.R)
+                return S(b.R + 1, a.R)
+            elif forward and b.R < a.R:
+                current[0] = S(b.R + 1, a.R)
+            elif not forward and b.L > a.L:
+                current[0] = S(a.L, b.L - 1)
+            else:
+                # `a` is covered by `b`
+                if forward and b.R < S.MAX:
+                    minuend.seek(b.R + 1)
+                elif not forward and b.L > S.MIN:
+                    minuend.seek(b.L - 1)
+                else:
+                    raise StopIteration
+                current[0] = self._fetch(minuend)
+
+
+class NOTIterSeek(RangeIterSeek):
+    """
+    Values from `S.MIN` to `S.MAX` not in `thing`.
+
+    """
+    def __init__(self, thing):
+        self.thing = thing
+        self.direction = thing.direction
+        self.pos = None
+        self.current = None
+
+    def cardinality(self):
+        cardinality = self.thing.cardinality()
+        return None if cardinality is None else S.MAX + 1 - cardinality
+
+    def __invert__(self):
+        return self.thing
+
+    def seek(self, pos):
+        self._pending = None
+        self.pos = self._clamp(pos)
+        self.current = None
+        if self.pos is not EXHAUSTED:
+            self.thing.seek(self.pos)
+
+    def _fetch(self):
+        try:
+            return self.thing.next_range()
+        except StopIteration:
+            return None
+
+    def _next_range(self):
+        forward = self.direction is Direction.F
+        if self.pos is None:
+            self.seek(S.MIN if forward else S.MAX)
+        if self.current is None and self.pos is not EXHAUSTED:
+            self.current = [self._fetch()]
+
+        while self.pos is not EXHAUSTED:
+            r = self.current[0]
+            if r is None:
+                if forward:
+                    gap = S(self.pos, S.MAX)
+                else:
+                    gap = S(S.MIN, self.pos)
+                self.pos = EXHAUSTED
+                return gap
+
+            self.current[0] = self._fetch()
+            if forward:
+                gap = S(self.pos, r.L - 1) if r.L > self.pos else None
+                self.pos = r.R + 1 if r.R < S.MAX else EXHAUSTED
+            else:
+                gap = S(r.R + 1, self.pos) if r.R < self.pos else None
+                self.pos = r.L - 1 if r.L > S.MIN else EXHAUSTED
+            if gap is not None:
+                return gap
+
+        raise StopIteration
@@ -1,25 +1,59 @@
-from contextlib import ExitStack
+from contextlib import ExitStack, contextmanager, suppress
 from itertools import takewhile, islice
 import json
+import time
 
 import lmdb
 
 from .abstract import Direction
 from .databases import Entries, Hints
-from .serializer import NumericSerializer, ObjectSerializer
+from .notify import Subscription
+from .serializer import NumericSerializer
 from .util import MaskException, cmp
 from .registry import RegistryIterSeek, Registry
 
 
 class Reader:
-    def __init__(self, connection, name, registry):
+    """
+    Iterate the entries of the binlog not acked by the reader `name`.
+
+    Acks are kept in memory until `commit` is called. They are also
+    committed automatically every `commit_every` acks, when `commit_interval`
+    seconds have passed since the last commit (checked on every ack) or when
+    the in-memory registry has more than `commit_max_segments` segments
+    (containers for bitmap registries).
+
+    """
+    def __init__(self, connection, name, registry, lazy=False,
+                 commit_every=None, commit_interval=None,
+                 commit_max_segments=None):
+        for option, value in (('commit_every', commit_every),
+                              ('commit_interval', commit_interval),
+                              ('commit_max_segments', commit_max_segments)):
+            if value is not None and value <= 0:
+                raise ValueError("%s must be greater than 0" % option)
+
         self.connection = connection
         self.name = name
         self.registry = registry
+        self.lazy = lazy
         self._parent = None
 
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self.commit_max_segments = commit_max_segments
+
+        self.pending_acks = 0
+        self.last_commit_at = time.monotonic()
+        self.commits = 0
+        self.last_commit_latency = None
+        self.total_commit_latency = 0.0
+
         self.closed = False
 
+        # Nesting of the operations using the registry, see `_operation`.
+        self._operations = 0
+
     @property
     def parent(self):
         if self.name is None:
@@ -37,11 +71,56 @@ class Reader:
         else:
             return self._parent
 
+    @contextmanager
+    def _operation(self):
+        """
+        Share the read transaction of the registry among the lookups done
+        until the outermost operation ends, then end it so acks committed
+        meanwhile are seen and no LMDB reader slot is held.
+
+        Acks are not operations on their own: the ones made while iterating
+        share the transaction of the iteration and the rest are followed by
+        a `commit`, which ends it. Commits, automatic ones included, end the
+        transactions of the iteration too (see `Connection.save_registry`)
+        so the readers map can grow; the iteration goes on with new ones.
+
+        """
+        self._operations += 1
+        try:
+            yield
+        finally:
+            self._operations -= 1
+            if not self._operations and self.registry is not None:
+                self.registry.refresh()
+
     def is_acked(self, entry):
-        if entry.saved and self.registry is not None and \
-                entry.pk in self.registry:
-            return True
-        return False
+        with self._operation():
+            if entry.saved and self.registry is not None and \
+                    entry.pk in self.registry:
+                return True
+            return False
+
+    def stats(self):
+        """
+        Return the stats of the reader registry as of the last commit (see
+        `Connection.reader_stats`) and of the commits made by this instance:
+        `pending_acks`, `commits`, `last_commit_latency` and
+        `mean_commit_latency` (in seconds).
+
+        """
+        if self.registry is None:
+            raise RuntimeError("Anonymous readers have no stats.")
+
+        stats = self.connection.reader_stats(self.name)
+        stats['pending_acks'] = self.pending_acks
+        stats['commits'] = self.commits
+        stats['last_commit_latency'] = self.last_commit_latency
+        if self.commits:
+            stats['mean_commit_latency'] = (self.total_commit_latency
+                                            / self.commits)
+        else:
+            stats['mean_commit_latency'] = None
+        return stats
 
     def close(self):
         self.commit()
@@ -49,7 +128,18 @@ class Reader:
 
     def commit(self):
         if self.registry:
+            start = time.monotonic()
+
+            # Ends the registry read transactions, so the saved registry is
+            # seen and the map can be grown.
             self.connection.save_registry(self.name, self.registry)
+            self.registry.clear_memory()
+
+            self.last_commit_at = time.monotonic()
+            self.last_commit_latency = self.last_commit_at - start
+            self.total_commit_latency += self.last_commit_latency
+            self.commits += 1
+            self.pending_acks = 0
 
         if self.parent is not None:
             self.parent.commit()
@@ -60,21 +150,135 @@ class Reader:
     def __exit__(self, *_, **__):
         self.close()
 
-    def ack(self, entry):
+    def _get_pk(self, entry):
         # FIXME: import on top, fix recursive import
-        from .model import Model
-
-        if self.registry is None:
-            raise RuntimeError("Cannot ACK events on anonymous reader.")
+        from .model import Model, LazyModel
 
         if isinstance(entry, int):
-            return self.registry.add(entry)
-        elif not isinstance(entry, Model):
+            return entry
+        elif not isinstance(entry, (Model, LazyModel)):
             raise TypeError("ACK accepts either pk or model instance")
         elif not entry.saved:
             raise ValueError("Entry must be saved first")
         else:
-            return self.registry.add(entry.pk)
+            return entry.pk
+
+    def _acked(self, count):
+        """Count `count` new acks and commit if the policy says so."""
+        self.pending_acks += count
+        if not self.pending_acks:
+            return
+        elif ((self.commit_every is not None
+               and self.pending_acks >= self.commit_every)
+              or (self.commit_interval is not None
+                  and (time.monotonic() - self.last_commit_at
+                       >= self.commit_interval))
+              or (self.commit_max_segments is not None
+                  and (self.registry.memory.registry.size()
+                       > self.commit_max_segments))):
+            self.commit()
+
+    def ack(self, entry):
+        if self.registry is None:
+            raise RuntimeError("Cannot ACK events on anonymous reader.")
+
+        added = self.registry.add(self._get_pk(entry))
+        self._acked(int(added))
+        return added
+
+    def ack_range(self, start, stop):
+        """
+        ACK the entries with pk from `start` to `stop` (not included).
+
+        Return the number of entries not previously acked.
+
+        """
+        if self.registry is None:
+            raise RuntimeError("Cannot ACK events on anonymous reader.")
+        elif start >= stop:
+            return 0
+        else:
+            added = self.registry.add_range(start, stop - 1)
+            self._acked(added)
+            return added
+
+    def ack_batch(self, entries):
+        """
+        ACK all the `entries` (pks or model instances) at once.
+
+        Return the number of entries not previously acked.
+
+        """
+        if self.registry is None:
+            raise RuntimeError("Cannot ACK events on anonymous reader.")
+
+        added = self.registry.update([self._get_pk(e) for e in entries])
+        self._acked(added)
+        return added
+
+    def read_batch(self, n, timeout=None):
+        """
+        Return a list with up to `n` unacked entries read in a single
+        cursor pass.
+
+        If there are no unacked entries wait up to `timeout` seconds for new
+        ones, woken up by the writers like `follow`. With `timeout=None`
+        return immediately.
+
+        """
+        if n < 1:
+            raise ValueError("n must be greater than 0")
+
+        if timeout is None:
+            return list(islice(self, n))
+
+        deadline = time.monotonic() + timeout
+        directory = self.connection._gen_path('notify_directory')
+        with Subscription(directory) as subscription:
+            while True:
+                # Subscribed before reading, so no commit goes unnoticed.
+                batch = list(islice(self, n))
+                if batch:
+                    return batch
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return batch
+                else:
+                    subscription.wait(remaining)
+
+    def follow(self, timeout=None):
+        """
+        Yield the unacked entries and then the new ones as they are stored.
+
+        Writers of any process notify the followers when they commit, so
+        there is no busy polling. Stop when no new entry arrives for
+        `timeout` seconds (never if `timeout=None`).
+
+        """
+        directory = self.connection._gen_path('notify_directory')
+        with Subscription(directory) as subscription:
+            # Entries of other processes can be stored below the last pk
+            # yielded (see `__meta_id_block_size__`), so the yielded pks are
+            # skipped instead of seeking past the last one.
+            yielded = Registry()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while True:
+                for entry in self._iter_except(yielded):
+                    yielded.add(entry.pk)
+                    yield entry
+                    subscription.reset()
+                    if timeout is not None:
+                        deadline = time.monotonic() + timeout
+
+                if deadline is None:
+                    subscription.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    else:
+                        subscription.wait(remaining)
 
     def recursive_ack(self, entry):
         if self.parent is None:
@@ -87,8 +291,9 @@ class Reader:
         with MaskException(lmdb.Error, RuntimeError):
             with MaskException(lmdb.ReadonlyError, RuntimeError):
                 with self.connection.data(write=False) as res:
-                    it = self.__iterseek__(direction=Direction.F)
                     with ExitStack() as index_filter:
+                        it = index_filter.enter_context(
+                            self._iterseek(Direction.F))
                         for key, value in filters.items():
                             index = self.connection.model._indexes.get(key)
                             if index is None:
@@ -171,21 +376,52 @@ class Reader:
             return None
 
     def _iter(self, cursor_attr, *args, start=None, **kwargs):
-        with MaskException(lmdb.ReadonlyError, StopIteration):
+        with suppress(lmdb.ReadonlyError), self._operation():
             with self.connection.data(write=False) as res:
                 with Entries.cursor(res) as cursor:
                     if start is not None:
                         cursor.set_range(start)
-                    it = getattr(cursor, cursor_attr)(*args, **kwargs)
-                    for key, value in it:
+                    it = getattr(cursor.cursor, cursor_attr)(*args, **kwargs)
+                    for raw_key, raw_value in it:
+                        key = Entries.K.python_value(raw_key)
                         if self.registry is None or key not in self.registry:
-                            yield (key, value)
+                            yield (key, raw_value)
+
+    def _to_model(self, key, raw_value):
+        """
+        Return the entry `key` from its serialized value, as a `LazyModel`
+        if the reader is lazy.
 
-    def _to_model(self, key, value):
-        entry = self.connection.model(**value)
-        entry.pk = key
-        entry.saved = True
-        return entry
+        """
+        if self.lazy:
+            # FIXME: import on top, fix recursive import
+            from .model import LazyModel
+
+            return LazyModel(self.connection.model, key, raw_value,
+                             serializer=self.connection.entries.V)
+        else:
+            entry = self.connection.model(
+                **self.connection.entries.V.python_value(raw_value))
+            entry.mark_as_saved(key)
+            return entry
+
+    def _get_from_cursor(self, res, cursor, pk):
+        """
+        Return the entry `pk` using the transaction of `cursor`.
+
+        The value is read from the cursor when it is already positioned on
+        `pk`, otherwise it is looked up without moving the cursor.
+
+        """
+        raw_key = Entries.K.db_value(pk)
+        if cursor.cursor.key() == raw_key:
+            raw_value = cursor.cursor.value()
+        else:
+            raw_value = res.txn.get(raw_key, db=res.db['entries'])
+            if raw_value is None:
+                raise IndexError
+
+        return self._to_model(pk, raw_value)
 
     def __iterseek__(self, direction):
         from .registry import DBRegistry, MemoryCachedDBRegistry
@@ -197,67 +433,190 @@ class Reader:
                 name=self.name,
                 direction=direction,
                 inverted=True,
-                registry=self.registry.memory.registry)
+                registry=self.registry.memory.registry,
+                db_class=type(self.registry.db))
         # if self.registry is None:
         # else:
         #     return RegistryIterSeek(~self.registry, direction=direction)
 
+    @contextmanager
+    def _iterseek(self, direction):
+        """
+        `__iterseek__` ending its registry read transaction, and the one of
+        the reader registry, on exit.
+
+        """
+        with self._operation():
+            it = self.__iterseek__(direction=direction)
+            try:
+                yield it
+            finally:
+                if self.name is not None:
+                    it.close()
+
     def __iter__(self):
-        with MaskException(lmdb.ReadonlyError, StopIteration):
+        return self._iter_except(None)
+
+    def _iter_except(self, skip):
+        """Iterate the unacked entries with pk not in the `skip` registry."""
+        with suppress(lmdb.ReadonlyError):
             with self.connection.data(write=False) as res:
-                with Entries.cursor(res) as cursor:
-                    it = cursor & self.__iterseek__(direction=Direction.F)
+                with Entries.cursor(res) as cursor, \
+                        self._iterseek(Direction.F) as unacked:
+                    it = cursor & unacked
+                    if skip is not None:
+                        it -= RegistryIterSeek(skip)
                     for pk in it:
                         try:
-                            yield self[pk]
+                            yield self._get_from_cursor(res, cursor, pk)
                         except IndexError:
                             pass
 
     def __reversed__(self):
-        with MaskException(lmdb.ReadonlyError, StopIteration):
+        with suppress(lmdb.ReadonlyError):
             with self.connection.data(write=False) as res:
-                with Entries.cursor(res, direction=Direction.B) as cursor:
-                    it = cursor & self.__iterseek__(direction=Direction.B)
+                with Entries.cursor(res, direction=Direction.B) as cursor, \
+                        self._iterseek(Direction.B) as unacked:
+                    it = cursor & unacked
                     for pk in it:
                         try:
-                            yield self[pk]
+                            yield self._get_from_cursor(res, cursor, pk)
                         except IndexError:
                             pass
 
+    @staticmethod
+    def _empty_plan():
+        return {'indexes': [], 'entries': False, 'registry': False,
+                'filters': [], 'rows': 0}
+
+    def _plan(self, res, stack, cursor, unacked, filters):
+        """
+        Choose how to evaluate `filters` and return the plan (see
+        `explain`) and the iterseeks to intersect, most selective first.
+        The iterseeks are None if no entry can match.
+
+        """
+        plan = self._empty_plan()
+
+        index_cursors = []
+        for key, value in filters.items():
+            index = self.connection.model._indexes.get(key)
+            if index is None:
+                plan['filters'].append(key)
+                continue
+
+            db_name = self.connection._get_index_name(key)
+            index_cursor = stack.enter_context(
+                index.cursor(res, db_name=db_name))
+            try:
+                index_cursor.dupkey = value
+            except ValueError:
+                rows = 0
+            else:
+                rows = index_cursor.cardinality()
+                index_cursors.append((rows, index_cursor))
+            plan['indexes'].append({'field': key, 'value': value,
+                                    'rows': rows})
+
+        plan['indexes'].sort(key=lambda i: i['rows'])
+        if len(index_cursors) < len(plan['indexes']):
+            # A value not in its index.
+            return plan, None
+
+        # Every pk of an index is an entry (or was, if removed), so the
+        # entries cursor is only scanned when there is no index to drive.
+        index_cursors.sort(key=lambda i: i[0])
+        things = [c for _, c in index_cursors]
+        if things:
+            plan['rows'] = index_cursors[0][0]
+        else:
+            plan['entries'] = True
+            plan['rows'] = cursor.cardinality()
+            things.append(cursor)
+
+        # The registry only reduces the candidates if it has acked pks
+        # between the first and the last one.
+        if self.registry is not None and plan['rows'] \
+                and self.registry.cardinality():
+            span = self._span(things[0])
+            if span is not None and self.registry.overlaps(*span):
+                plan['registry'] = True
+                things.append(unacked)
+
+        return plan, things
+
+    @staticmethod
+    def _span(cursor):
+        """
+        Return the first and last pk yielded by `cursor` (the duplicates of
+        its `dupkey`, if set) or None if it is empty.
+
+        """
+        raw = cursor.cursor
+        if cursor.dupkey is not None:
+            raw.first_dup()
+            first = cursor._from_value(raw.value())
+            raw.last_dup()
+            return first, cursor._from_value(raw.value())
+        elif raw.first():
+            first = cursor._from_key(raw.key())
+            raw.last()
+            return first, cursor._from_key(raw.key())
+        else:
+            return None
+
+    def explain(self, **filters):
+        """
+        Return the plan `filter` would follow for `filters`, a dict with:
+
+        - `indexes`: the indexed fields in intersection order (most
+          selective first), as dicts with the `field`, the `value` and
+          its estimated `rows`.
+        - `entries`: whether every entry is scanned (no indexed field).
+        - `registry`: whether the entries acked by the reader are skipped
+          (False when none of the candidates can be acked).
+        - `filters`: non-indexed fields, compared on every candidate.
+        - `rows`: estimated number of candidate entries.
+
+        """
+        try:
+            with self.connection.data(write=False) as res:
+                with Entries.cursor(res) as cursor, \
+                        self._iterseek(Direction.F) as unacked, \
+                        ExitStack() as stack:
+                    plan, _ = self._plan(res, stack, cursor, unacked,
+                                         filters)
+                    return plan
+        except lmdb.ReadonlyError:
+            # Nothing stored yet.
+            return self._empty_plan()
+
     def filter(self, **filters):
-        with MaskException(lmdb.Error, StopIteration):
-            with MaskException(lmdb.ReadonlyError, StopIteration):
-                with self.connection.data(write=False) as res:
-                    with Entries.cursor(res) as cursor:
-                        it = cursor & self.__iterseek__(direction=Direction.F)
-                        non_index_filter = {}
-                        with ExitStack() as index_filter:
-                            for key, value in filters.items():
-                                index = self.connection.model._indexes.get(key)
-                                if index is None:
-                                    non_index_filter[key] = value
-                                else:
-                                    db_name = self.connection._get_index_name(key)
-                                    index_cursor = index_filter.enter_context(
-                                        index.cursor(res, db_name=db_name))
-                                    try:
-                                        index_cursor.dupkey = value
-                                    except ValueError:
-                                        return
-                                    else:
-                                        it &= index_cursor
+        with suppress(lmdb.ReadonlyError):
+            with self.connection.data(write=False) as res:
+                with Entries.cursor(res) as cursor, \
+                        self._iterseek(Direction.F) as unacked, \
+                        ExitStack() as index_filter:
+                    plan, things = self._plan(res, index_filter, cursor,
+                                              unacked, filters)
+                    if things is None:
+                        return
+
+                    it = things[0]
+                    for thing in things[1:]:
+                        it &= thing
 
-                            for pk in it:
-                                try:
-                                    entry = self[pk]
-                                except IndexError:
-                                    pass
-                                else:
-                                    for key, value in non_index_filter.items():
-                                        if entry.get(key) != value:
-                                            break
-                                    else:
-                                        yield entry
+                    for pk in it:
+                        try:
+                            entry = self._get_from_cursor(res, cursor, pk)
+                        except IndexError:
+                            pass
+                        else:
+                            for key in plan['filters']:
+                                if entry.get(key) != filters[key]:
+                                    break
+                            else:
+                                yield entry
 
     @MaskException(lmdb.ReadonlyError, IndexError)
     def __getitem__(self, key):
@@ -268,12 +627,9 @@ class Reader:
                         for idx, raw_item in enumerate(cursor.iterprev(), 1):
                             if key + idx == 0:
                                 raw_key, raw_value = raw_item
-                                entry = self.connection.model(
-                                    **ObjectSerializer.python_value(raw_value))
-                                entry.saved = True
-                                entry.pk = NumericSerializer.python_value(
-                                    raw_key)
-                                break
+                                return self._to_model(
+                                    NumericSerializer.python_value(raw_key),
+                                    raw_value)
                         else:
                             raise IndexError
                     else:
@@ -281,11 +637,7 @@ class Reader:
                         if raw_value is None:
                             raise IndexError
                         else:
-                            entry = self.connection.model(
-                                **ObjectSerializer.python_value(raw_value))
-                            entry.saved = True
-                            entry.pk = key 
-                    return entry
+                            return self._to_model(key, raw_value)
         elif isinstance(key, slice):
             def to_num(v):
                 return 0 if v is None else v
@@ -1,12 +1,13 @@
-from bisect import insort, bisect_left
+from bisect import bisect_left, bisect_right
 from collections import namedtuple
-from itertools import count, cycle
+from contextlib import ExitStack
+from heapq import merge
 import lmdb
 
 from .abstract import IterSeek, Direction
 from .exceptions import ReaderDoesNotExist
 from .databases import Registry as RegistryDB
-from .util import popminleft, consume
+from .util import popminleft
 from .util import MaskException
 
 
@@ -32,21 +33,104 @@ class S(namedtuple('Segment', ('L', 'R'))):
         return iter(range(self.R, self.L - 1, -1))
 
 
+#: Position of a RangeIterSeek with no values left until sought again.
+EXHAUSTED = object()
+
+
+class RangeIterSeek(IterSeek):
+    """
+    IterSeek producing ranges with `_next_range`. `__next__` takes the
+    values of the ranges one by one.
+
+    """
+    _pending = None  # Values of the current range not returned yet
+
+    def _next_range(self):  # pragma: no cover
+        raise NotImplementedError("Must be implemented in subclass.")
+
+    def _clamp(self, pos):
+        """
+        Return `pos` clamped to `S.MIN`..`S.MAX` in the direction of the
+        iterseek, or EXHAUSTED if no value can follow it.
+
+        """
+        if self.direction is Direction.F:
+            return EXHAUSTED if pos > S.MAX else max(pos, S.MIN)
+        else:
+            return EXHAUSTED if pos < S.MIN else min(pos, S.MAX)
+
+    def next_range(self):
+        if self._pending is not None:
+            segment, self._pending = self._pending, None
+            return segment
+        return self._next_range()
+
+    def __next__(self):
+        L, R = self.next_range()
+        if self.direction is Direction.F:
+            if L < R:
+                self._pending = S(L + 1, R)
+            return L
+        else:
+            if L < R:
+                self._pending = S(L, R - 1)
+            return R
+
+
+class SegmentIterSeek(RangeIterSeek):
+    """
+    RangeIterSeek of sorted disjoint segments, looked up from a position
+    with `_segment_from`.
+
+    """
+    _pos = None  # Where the next segment is looked up from
+
+    def _segment_from(self, pos):  # pragma: no cover
+        """
+        Return the segment containing `pos` (cut at `pos`) or the next one
+        in direction. None if there is none.
+
+        """
+        raise NotImplementedError("Must be implemented in subclass.")
+
+    def seek(self, pos):
+        self._pending = None
+        self._pos = self._clamp(pos)
+
+    def _next_range(self):
+        if self._pos is None:
+            self._pos = S.MIN if self.direction is Direction.F else S.MAX
+        elif self._pos is EXHAUSTED:
+            raise StopIteration
+
+        segment = self._segment_from(self._pos)
+        if segment is None:
+            self._pos = EXHAUSTED
+            raise StopIteration
+        elif self.direction is Direction.F:
+            self._pos = segment.R + 1 if segment.R < S.MAX else EXHAUSTED
+        else:
+            self._pos = segment.L - 1 if segment.L > S.MIN else EXHAUSTED
+        return segment
+
+
 class MemoryCachedDBRegistry(IterSeek):
     def __init__(self, connection, name, direction=Direction.F, inverted=False,
-                 registry=None):
+                 registry=None, db_class=None):
 
         self.inverted = inverted
 
         if registry is None:
             registry = Registry()
+        if db_class is None:
+            db_class = DBRegistry
 
         if self.inverted:
             self.memory = RegistryIterSeek(~registry, direction=direction)
-            self.db = ~DBRegistry(name, connection, direction=direction)
+            self.db = ~db_class(name, connection, direction=direction)
         else:
             self.memory = RegistryIterSeek(registry, direction=direction)
-            self.db = DBRegistry(name, connection, direction=direction)
+            self.db = db_class(name, connection, direction=direction)
 
         self.seeked = True
         self.direction = direction
@@ -56,23 +140,73 @@ class MemoryCachedDBRegistry(IterSeek):
         return value in self.memory.registry or value in self.db
 
     def length(self):
-        return {'memory': len(self.memory.registry.acked),
+        return {'memory': self.memory.registry.size(),
                 'disk': len(self.db)}
 
     @property
     def acked(self):
         return self.memory.registry.acked
 
-    @property
-    def add(self):
-        return self.memory.registry.add
+    def _stored_gaps(self, L, R):
+        """Yield the segments between `L` and `R` not in the DB registry."""
+        pos = L
+        while pos <= R:
+            segment = self.db._get_segment_by_pos(pos)
+            if segment is None or segment.L > R:
+                yield S(pos, R)
+                return
+            elif segment.L > pos:
+                yield S(pos, segment.L - 1)
+            pos = segment.R + 1
+
+    def overlaps(self, L, R):
+        """Whether any idx between `L` and `R` is in the registry."""
+        for registry in (self.memory, self.db):
+            segment = registry._segment_from(L)
+            if segment is not None and segment.L <= R:
+                return True
+        return False
+
+    # Acks already in the DB registry are not added to memory, so they are
+    # not counted as new nor saved again.
+
+    def add(self, idx):
+        if not isinstance(idx, int):
+            raise TypeError("idx must be int")
+        elif idx in self.db:
+            return False
+        else:
+            return self.memory.registry.add(idx)
+
+    def add_range(self, L, R):
+        if not isinstance(L, int) or not isinstance(R, int):
+            raise TypeError("idx must be int")
+        elif L > R:
+            raise ValueError("L must be lower or equal than R")
+        else:
+            return sum(self.memory.registry.add_range(*gap)
+                       for gap in self._stored_gaps(L, R))
+
+    def update(self, idxs):
+        return self.memory.registry.update(
+            [idx for idx in idxs if idx not in self.db])
+
+    def clear_memory(self):
+        """Forget the in-memory acks, once they are saved."""
+        self.memory.registry.clear()
 
     def seek(self, pos):
         self.memory.seek(pos)
         self.db.seek(pos)
         self.seeked = True
 
-    def __next__(self):
+    def refresh(self):
+        self.db.refresh()
+
+    def close(self):
+        self.db.close()
+
+    def _combined(self):
         if self.seeked:
             if self.inverted:
                 self._iter = iter(self.memory & self.db)
@@ -80,7 +214,16 @@ class MemoryCachedDBRegistry(IterSeek):
                 self._iter = iter(self.memory | self.db)
 
             self.seeked = False
-        return next(self._iter)
+        return self._iter
+
+    def __next__(self):
+        return next(self._combined())
+
+    def next_range(self):
+        return self._combined().next_range()
+
+    def cardinality(self):
+        return self._combined().cardinality()
 
 
 def writefixture(conn, name):
@@ -101,25 +244,69 @@ def console(conn, name):
             cursor
 
 
-class BaseDBRegistry(IterSeek):
+class BaseDBRegistry(SegmentIterSeek):
+    """
+    Registry stored in the readers environment.
+
+    A read transaction is begun on first access and held until `refresh`
+    or `close` are called, so changes committed meanwhile are not seen.
+    The connection also ends it before saving a registry, so it never
+    stops the readers map from growing (see `Connection.save_registry`).
+
+    """
+    registry_db = RegistryDB
+    inverted = False
+
     def __init__(self, name, connection, direction=Direction.F):
         self.name = name
         self.conn = connection
         self.direction = direction
-        self.last = None
-        self._iter = None
 
-        self.curr_s = None  # Current segment
+        self._txn_stack = None
+        self._res = None
+        self._cursor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_, **__):
+        self.close()
+
+    @property
+    def cursor(self):
+        """Cursor of the read transaction held by the registry."""
+        if self._cursor is None:
+            with ExitStack() as stack:
+                self._res = stack.enter_context(
+                    self.conn.readers(write=False))
+                self._cursor = stack.enter_context(
+                    self.registry_db.named(self.name).cursor(self._res))
+                self._txn_stack = stack.pop_all()
+            self.conn._registry_txns.add(self)
+        return self._cursor
+
+    def refresh(self):
+        """End the read transaction, the next access begins a new one."""
+        if self._txn_stack is not None:
+            stack, self._txn_stack = self._txn_stack, None
+            self._res = self._cursor = None
+            self.conn._registry_txns.discard(self)
+            stack.close()
+
+    close = refresh
 
     @MaskException(lmdb.ReadonlyError, ReaderDoesNotExist)
     def __len__(self):
-        with self.conn.readers(write=False) as res:
-            with RegistryDB.named(self.name).cursor(res) as cursor:
-                found = cursor.first()
-                if not found:
-                    return 0
-                else:
-                    return sum(1 for _ in cursor.iternext())
+        """Number of stored segments."""
+        self.cursor  # Begin the transaction
+        return self.conn._get_reader_stats(self._res, self.name)['segments']
+
+    @MaskException(lmdb.ReadonlyError, ReaderDoesNotExist)
+    def cardinality(self):
+        """Number of pks in the registry as of its last commit."""
+        self.cursor  # Begin the transaction
+        acked = self.conn._get_reader_stats(self._res, self.name)['acked']
+        return S.MAX + 1 - acked if self.inverted else acked
 
     def _get_segment_by_pos(self, pos):
         raise NotImplementedError("Must be implemented in subclass.")
@@ -131,49 +318,19 @@ class BaseDBRegistry(IterSeek):
         else:
             return segment.L <= value <= segment.R
 
-    def seek(self, pos):
+    def _segment_from(self, pos):
         segment = self._get_segment_by_pos(pos)
         if segment is None:
-            return False
+            return None
+        elif self.direction is Direction.F:
+            return S(max(segment.L, pos), segment.R)
         else:
-            if segment.L <= pos <= segment.R:
-                if self.direction is Direction.F:
-                    self._iter = iter(range(pos, segment.R + 1))
-                else:
-                    self._iter = iter(range(pos, segment.L - 1, -1))
-            else:
-                if self.direction is Direction.F:
-                    self._iter = iter(range(segment.L, segment.R + 1))
-                else:
-                    self._iter = iter(range(segment.R, segment.L - 1, -1))
-
-            return True
-
-    def __next__(self):
-        if self._iter is None:
-            if self.direction is Direction.F:
-                if not self.seek(0):
-                    raise StopIteration
-            else:
-                if not self.seek(MAXINT):
-                    raise StopIteration
-
-        try:
-            self.last = next(self._iter)
-        except StopIteration:
-            if self.direction is Direction.F:
-                if not self.seek(self.last + 1):
-                    raise StopIteration
-            else:
-                if not self.seek(self.last - 1):
-                    raise StopIteration
-            return self.__next__()
-        else:
-            return self.last
+            return S(segment.L, min(segment.R, pos))
 
 
 class IDBRegistry(BaseDBRegistry):
     """Inverted DBRegistry"""
+    inverted = True
 
     @MaskException(lmdb.ReadonlyError, ReaderDoesNotExist)
     def _get_segment_by_pos(self, pos):
@@ -181,45 +338,47 @@ class IDBRegistry(BaseDBRegistry):
         Return the next segment given `pos` and self.direction.
 
         """
-        with self.conn.readers(write=False) as res:
-            with RegistryDB.named(self.name).cursor(res) as cursor:
-                found = cursor.set_range(pos)
-                if not found:
-                    # Past the end of the database
-                    if self.direction is Direction.F:
-                        return S(pos, S.MAX)
+        cursor = self.cursor
+        found = cursor.set_range(pos)
+        if not found:
+            # Past the end of the database
+            if self.direction is Direction.F:
+                return S(pos, S.MAX)
+            else:
+                if cursor.last():
+                    end, start = cursor.item()
+                    return S(end + 1, pos)
+                else:
+                    # Empty
+                    return S(S.MIN, S.MAX)
+        else:
+            end, start = cursor.item()
+            if start <= pos <= end:
+                # `pos` is in the segment
+                if self.direction is Direction.F:
+                    if cursor.next():
+                        s2_end, s2_start = cursor.item()
+                        return S(end + 1, s2_start - 1)
                     else:
-                        if cursor.last():
-                            end, start = cursor.item()
-                            return S(end + 1, pos)
-                        else:
-                            # Empty
-                            return S(S.MIN, S.MAX)
+                        return S(end + 1, S.MAX)
                 else:
-                    end, start = cursor.item()
-                    if start <= pos <= end:
-                        # `pos` is in the segment
-                        if self.direction is Direction.F:
-                            if cursor.next():
-                                s2_end, s2_start = cursor.item()
-                                return S(end + 1, s2_start - 1)
-                            else:
-                                return S(end + 1, S.MAX)
-                        else:
-                            if cursor.prev():
-                                s2_end, s2_start = cursor.item()
-                                return S(s2_end + 1, start - 1)
-                            else:
-                                return S(S.MIN, start - 1)
+                    if cursor.prev():
+                        s2_end, s2_start = cursor.item()
+                        return S(s2_end + 1, start - 1)
+                    elif start == S.MIN:
+                        # Everything before `pos` is acked
+                        return None
+                    else:
+                        return S(S.MIN, start - 1)
+            else:
+                if self.direction is Direction.F:
+                    return S(pos, start - 1)
+                else:
+                    if cursor.prev():
+                        end, start = cursor.item()
+                        return S(end + 1, pos)
                     else:
-                        if self.direction is Direction.F:
-                            return S(pos, start - 1)
-                        else:
-                            if cursor.prev():
-                                end, start = cursor.item()
-                                return S(end + 1, pos)
-                            else:
-                                return S(S.MIN, pos)
+                        return S(S.MIN, pos)
 
     def __invert__(self):
         return DBRegistry(self.name, self.conn, direction=self.direction)
@@ -232,139 +391,71 @@ class DBRegistry(BaseDBRegistry):
         Return the next segment given `pos` and self.direction.
 
         """
-        with self.conn.readers(write=False) as res:
-            with RegistryDB.named(self.name).cursor(res) as cursor:
-                found = cursor.set_range(pos)
-                if not found:
-                    # Past the end of the database
-                    if self.direction is Direction.F:
-                        return None
-                    else:
-                        if cursor.last():
-                            end, start = cursor.item()
-                            return S(start, end)
-                        else:
-                            # Empty
-                            return None
-                else:
+        cursor = self.cursor
+        found = cursor.set_range(pos)
+        if not found:
+            # Past the end of the database
+            if self.direction is Direction.F:
+                return None
+            else:
+                if cursor.last():
                     end, start = cursor.item()
-                    if start <= pos <= end:
-                        # `pos` is in the segment
+                    return S(start, end)
+                else:
+                    # Empty
+                    return None
+        else:
+            end, start = cursor.item()
+            if start <= pos <= end:
+                # `pos` is in the segment
+                return S(start, end)
+            else:
+                if self.direction is Direction.F:
+                    # Because set_range position the cursor in the next
+                    # segment.
+                    return S(start, end)
+                else:
+                    if cursor.prev():
+                        end, start = cursor.item()
                         return S(start, end)
                     else:
-                        if self.direction is Direction.F:
-                            # Because set_range position the cursor in the next
-                            # segment.
-                            return S(start, end)
-                        else:
-                            if cursor.prev():
-                                end, start = cursor.item()
-                                return S(start, end)
-                            else:
-                                return None
+                        return None
 
     def __invert__(self):
         return IDBRegistry(self.name, self.conn, direction=self.direction)
 
 
-class RegistryIterSeek(IterSeek):
+class RegistryIterSeek(SegmentIterSeek):
+    """
+    Iterate the idxs of `registry` in `direction`.
+
+    Segments are looked up with a binary search on `registry.acked`, read
+    again every time, so changes to the registry are seen by the next
+    segment.
+
+    """
     def __init__(self, registry, direction=Direction.F):
         self.registry = registry
-        self.pos = None
         self.direction = direction
 
-        self.last = None
-
-        self.last_s = None
-        self._curr_s = None
-
-        if self.registry.acked:
-            self.segments = zip(consume(self.walk_segments(),
-                                        len(registry.acked) - 1),
-                                self.walk_segments())
-        else:
-            self.segments = None
-
-    @property
-    def curr_s(self):
-        return self._curr_s
-
-    @curr_s.setter
-    def curr_s(self, value):
-        self._curr_s = value
-        if isinstance(value, S):
-            if self.direction is Direction.F:
-                self._curr_s._iter = value.forward()
-            else:
-                self._curr_s._iter = value.backward()
-
-    def walk_segments(self):
-        if self.direction == Direction.F:
-            return cycle(self.registry.acked)
-        else:
-            return cycle(reversed(self.registry.acked))
-
-    def __next__(self):
-        if not self.registry.acked:
-            raise StopIteration
-        elif self.pos is not None:
-            pos, self.pos = self.pos, None
-
-            if ((self.direction is Direction.F
-                 and pos > self.registry.acked[-1].R)
-                or (self.direction is Direction.B
-                    and pos < self.registry.acked[0].L)):
-                raise StopIteration
-            else:
-                for (self.last_s,  # pragma: no branch
-                     self.curr_s) in self.segments:
-                    # Ex: p = 10
-                    if pos in self.curr_s:
-                        # Sc(1 -- <p> -- 20)
-                        if self.direction is Direction.F:
-                            self.curr_s = S(pos, self.curr_s.R)
-                        else:
-                            self.curr_s = S(self.curr_s.L, pos)
-                        return self.__next__()
-                    elif self.direction is Direction.F:
-                        # Sl < Sc < Sn | Except on edges
-                        if self.last_s.R < pos < self.curr_s.L:
-                            # Sl(1, 9) -- p> -- Sc(11, 20)
-                            return self.__next__()
-                        elif (pos not in self.last_s
-                              and self.last_s.R > pos < self.curr_s.L
-                              and self.last_s.R > self.curr_s.L):
-                            # Sl(190, 200) -- p> -- Sc(20, 180)
-                            return self.__next__()
-                    else:
-                        # Sl > Sc > Sn | Except on edges
-                        if self.last_s.L > pos > self.curr_s.R:
-                            return self.__next__()
-                        elif (pos not in self.last_s
-                              and self.last_s.L < pos > self.curr_s.R
-                              and self.last_s.L < self.curr_s.R):
-                            return self.__next__()
-        else:
-            if self.curr_s is None:
-                self.last_s, self.curr_s = next(self.segments)
-
-            try:
-                n = next(self.curr_s._iter)
-            except StopIteration:
-                self.curr_s = None
-                return self.__next__()
-            else:
-                if self.last is not None:
-                    if self.direction is Direction.F and n < self.last:
-                        raise StopIteration
-                    elif self.direction is Direction.B and n > self.last:
-                        raise StopIteration
-                self.last = n
-                return n
-
-    def seek(self, pos):
-        self.pos = pos
-        self.last = None
+    def cardinality(self):
+        """Span of the registry, an upper bound of its number of idxs."""
+        acked = self.registry.acked
+        return acked[-1].R - acked[0].L + 1 if acked else 0
+
+    def _segment_from(self, pos):
+        acked = self.registry.acked
+        # Last segment starting at or before `pos`.
+        idx = bisect_right(acked, (pos, float('inf'))) - 1
+        if self.direction is Direction.F:
+            if idx >= 0 and acked[idx].R >= pos:
+                return S(pos, acked[idx].R)
+            elif idx + 1 < len(acked):
+                return acked[idx + 1]
+        elif idx >= 0:
+            segment = acked[idx]
+            return S(segment.L, min(pos, segment.R))
+        return None
 
 
 class Registry:
@@ -381,38 +472,82 @@ class Registry:
         return _iter()
 
     def add(self, idx):
-        if not isinstance(idx, int):
+        return self.add_range(idx, idx) == 1
+
+    def add_range(self, L, R):
+        """
+        Add every idx from `L` to `R` (both included) merging the segments
+        overlapping or adjacent to them.
+
+        Return the number of idxs not previously in the registry.
+
+        """
+        if not isinstance(L, int) or not isinstance(R, int):
             raise TypeError("idx must be int")
-        elif not self.acked:
-            self.acked.append(S(idx, idx))
-            return True
-        elif idx in self:
-            return False
-        else:
-            for i, segment in enumerate(self.acked):
-                left, right = segment.L, segment.R
+        elif L > R:
+            raise ValueError("L must be lower or equal than R")
+
+        # Segments are sorted and disjoint, so are both their L and R.
+        start = bisect_left(self.acked, (L, ))
+        if start > 0 and self.acked[start - 1].R >= L - 1:
+            start -= 1
+        stop = bisect_right(self.acked, (R + 1, float('inf')))
+
+        merged = self.acked[start:stop]
+        added = R - L + 1
+        for segment in merged:
+            overlap = segment & S(L, R)
+            if overlap is not None:
+                added -= overlap.R - overlap.L + 1
+
+        if merged:
+            L = min(L, merged[0].L)
+            R = max(R, merged[-1].R)
+        self.acked[start:stop] = [S(L, R)]
+
+        return added
+
+    def update(self, idxs):
+        """
+        Add every idx of `idxs` merging them with the registry in a single
+        pass. Return the number of idxs not previously in the registry.
 
-                if right == idx - 1:
-                    try:
-                        if self.acked[i + 1].L == idx + 1:
-                            right = self.acked[i + 1].R
-                            del self.acked[i + 1]
-                            self.acked[i] = S(left, right)
-                            return True
-                    except IndexError:
-                        pass
-                    self.acked[i] = S(left, idx)
-                    return True
-                elif left == idx + 1:
-                    self.acked[i] = S(idx, right)
-                    return True
+        """
+        runs = []
+        for idx in sorted(set(idxs)):
+            if not isinstance(idx, int):
+                raise TypeError("idx must be int")
+            elif runs and runs[-1].R == idx - 1:
+                runs[-1] = S(runs[-1].L, idx)
             else:
-                insort(self.acked, S(idx, idx))
-                return True
+                runs.append(S(idx, idx))
+
+        # Both are sorted, join their overlapping or adjacent segments.
+        acked = []
+        for segment in merge(self.acked, runs):
+            if acked and segment.L <= acked[-1].R + 1:
+                if segment.R > acked[-1].R:
+                    acked[-1] = S(acked[-1].L, segment.R)
+            else:
+                acked.append(segment)
+
+        new = (sum(s.R - s.L + 1 for s in acked)
+               - sum(s.R - s.L + 1 for s in self.acked))
+        if new:
+            self.acked = acked
+
+        return new
 
     def __repr__(self):  # pragma: no cover
         return repr(self.acked)
 
+    def clear(self):
+        del self.acked[:]
+
+    def size(self):
+        """Number of segments."""
+        return len(self.acked)
+
     def __contains__(self, value):
         if not self.acked:
             return False
@@ -1,11 +1,16 @@
 from datetime import datetime, timedelta
 from functools import partial
 import calendar
+import json
+import lzma
+import marshal
 import pickle
 import struct
 import time
+import zlib
 
 from .abstract import Serializer
+from .util import bit_runs, bits_from_positions, popcount
 
 
 class NumericSerializer(Serializer):
@@ -34,6 +39,83 @@ class ObjectSerializer(Serializer):
                                     protocol=pickle.HIGHEST_PROTOCOL))
 
 
+class MarshalSerializer(Serializer):
+    """
+    Entries serialized with `marshal`. Faster than pickle but limited to
+    builtin types (no `datetime`, for example).
+
+    """
+    python_value = staticmethod(marshal.loads)
+    db_value = staticmethod(marshal.dumps)
+
+
+class JSONSerializer(Serializer):
+    """
+    Entries serialized as compact JSON. Tuples are read back as lists and
+    keys must be strings.
+
+    """
+    @staticmethod
+    def python_value(value):
+        return json.loads(bytes(value).decode('utf-8'))
+
+    @staticmethod
+    def db_value(value):
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+class StructSerializer(Serializer):
+    """
+    Entries with the fixed fields of `fields`, a sequence of `(name,
+    struct format)` pairs, packed with `struct` and the rest of the entry
+    serialized with `marshal`.
+
+    Entries missing any of the fields or with values `struct` can't pack
+    are serialized whole with `marshal`. Values are read back as `struct`
+    converts them (ex. `True` for any true value of a `?` field).
+
+    Subclass it setting `fields` and register the subclass with
+    `register_serializer`.
+
+    """
+    fields = ()
+    STRUCT, MARSHAL = b's', b'm'
+
+    @classmethod
+    def _layout(cls):
+        layout = cls.__dict__.get('_struct')
+        if layout is None:
+            layout = struct.Struct('<' + ''.join(f for _, f in cls.fields))
+            cls._struct = layout
+        return layout
+
+    @classmethod
+    def python_value(cls, value):
+        kind, data = bytes(value[:1]), value[1:]
+        if kind == cls.MARSHAL:
+            return marshal.loads(data)
+        elif kind == cls.STRUCT:
+            layout = cls._layout()
+            entry = marshal.loads(data[layout.size:])
+            entry.update(zip((name for name, _ in cls.fields),
+                             layout.unpack_from(data)))
+            return entry
+        else:
+            raise ValueError("Unknown entry kind %r" % kind)
+
+    @classmethod
+    def db_value(cls, value):
+        try:
+            packed = cls._layout().pack(*(value[name]
+                                          for name, _ in cls.fields))
+        except (KeyError, struct.error):
+            return cls.MARSHAL + marshal.dumps(value)
+        else:
+            names = {name for name, _ in cls.fields}
+            rest = {k: v for k, v in value.items() if k not in names}
+            return cls.STRUCT + packed + marshal.dumps(rest)
+
+
 class NullListSerializer(Serializer):
     @staticmethod
     def python_value(value):
@@ -61,3 +143,125 @@ class DatetimeSerializer(Serializer):
         timestamp = int(calendar.timegm(value.timetuple())) * 1000000
         int_val = timestamp + value.microsecond
         return NumericSerializer.db_value(int_val)
+
+
+class BitmapSerializer(Serializer):
+    """
+    Bitmap container of 2**16 bits, stored as the smallest of a sorted
+    array of the set positions, the bitmap itself or a list of runs.
+
+    """
+    SIZE = 2**16
+    ARRAY, BITMAP, RUNS = b'a', b'b', b'r'
+
+    @staticmethod
+    def _pack(values):
+        return struct.pack("<%dH" % len(values), *values)
+
+    @staticmethod
+    def _unpack(value):
+        return struct.unpack("<%dH" % (len(value) // 2), value)
+
+    @classmethod
+    def python_value(cls, value):
+        kind, data = bytes(value[:1]), value[1:]
+        if kind == cls.BITMAP:
+            return int.from_bytes(data, 'little')
+        elif kind == cls.ARRAY:
+            return bits_from_positions(cls._unpack(data), cls.SIZE)
+        elif kind == cls.RUNS:
+            values = cls._unpack(data)
+            bits = 0
+            for first, last in zip(values[::2], values[1::2]):
+                bits |= ((1 << (last - first + 1)) - 1) << first
+            return bits
+        else:
+            raise ValueError("Unknown container kind %r" % kind)
+
+    @classmethod
+    def db_value(cls, value):
+        runs = list(bit_runs(value))
+        sizes = {cls.ARRAY: popcount(value) * 2,
+                 cls.BITMAP: cls.SIZE // 8,
+                 cls.RUNS: len(runs) * 4}
+        kind = min(sorted(sizes), key=sizes.get)
+        if kind == cls.BITMAP:
+            return kind + value.to_bytes(cls.SIZE // 8, 'little')
+        elif kind == cls.ARRAY:
+            return kind + cls._pack([pos
+                                     for first, last in runs
+                                     for pos in range(first, last + 1)])
+        else:
+            return kind + cls._pack([pos for run in runs for pos in run])
+
+
+#: Compressors of the entries by name: `(flag, compress, decompress)`.
+COMPRESSIONS = {'zlib': (b'z', zlib.compress, zlib.decompress),
+                'lzma': (b'x', lzma.compress, lzma.decompress)}
+
+
+class CompressedSerializer(Serializer):
+    """
+    Values of `serializer` compressed with `compression` (none if None)
+    when longer than `threshold` bytes.
+
+    Every value starts with a flag byte telling how it is compressed
+    (`RAW` if it is not), so values compressed differently can be read
+    whatever the current settings.
+
+    """
+    serializer = ObjectSerializer
+    compression = 'zlib'
+    threshold = 256
+    RAW = b'\0'
+
+    @classmethod
+    def wrapping(cls, serializer, compression, threshold):
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError("Unknown compression %r" % compression)
+        return type('Compressed' + serializer.__name__, (cls, ),
+                    {'serializer': serializer,
+                     'compression': compression,
+                     'threshold': threshold})
+
+    @classmethod
+    def python_value(cls, value):
+        flag, data = bytes(value[:1]), value[1:]
+        if flag != cls.RAW:
+            for compression_flag, _, decompress in COMPRESSIONS.values():
+                if flag == compression_flag:
+                    data = decompress(data)
+                    break
+            else:
+                raise ValueError("Unknown compression flag %r" % flag)
+        return cls.serializer.python_value(data)
+
+    @classmethod
+    def db_value(cls, value):
+        raw = cls.serializer.db_value(value)
+        if cls.compression is not None and len(raw) > cls.threshold:
+            flag, compress, _ = COMPRESSIONS[cls.compression]
+            compressed = compress(raw)
+            if len(compressed) < len(raw):
+                return flag + compressed
+        return cls.RAW + raw
+
+
+#: Serializers of the entries by name, see `register_serializer`.
+SERIALIZERS = {'pickle': ObjectSerializer,
+               'marshal': MarshalSerializer,
+               'json': JSONSerializer}
+
+
+def register_serializer(name, serializer):
+    """
+    Make `serializer` selectable with `__meta_serializer__ = name`.
+
+    The name is stored in the binlog, so the serializer must be registered
+    with the same name by every process opening it.
+
+    """
+    registered = SERIALIZERS.get(name)
+    if registered is not None and registered is not serializer:
+        raise ValueError("Serializer %r already registered" % name)
+    SERIALIZERS[name] = serializer
@@ -1,6 +1,9 @@
 from functools import wraps
 from itertools import islice
 import collections
+import re
+
+_RUN = re.compile('1+')
 
 
 class MaskException:
@@ -25,6 +28,23 @@ class MaskException:
             raise self.mask from exc_type
 
 
+class Replayable:
+    """
+    Iterable over the items of `iterable`. Every new iteration yields again
+    the items consumed by the previous ones before taking new items.
+
+    """
+    def __init__(self, iterable):
+        self.iterator = iter(iterable)
+        self.consumed = []
+
+    def __iter__(self):
+        yield from self.consumed
+        for item in self.iterator:
+            self.consumed.append(item)
+            yield item
+
+
 def popminleft(a, b):
     if a and b:
         if a[0].L <= b[0].L:
@@ -60,3 +80,25 @@ def consume(iterator, n):  # pragma: no cover
         next(islice(iterator, n, n), None)
 
     return iterator
+
+
+if hasattr(int, 'bit_count'):  # Python >= 3.10
+    popcount = int.bit_count
+else:
+    def popcount(bits):
+        """Return the number of set bits of the int `bits`."""
+        return bin(bits).count('1')
+
+
+def bit_runs(bits):
+    """Yield the first and last position of every run of set bits."""
+    for match in _RUN.finditer(bin(bits)[:1:-1]):
+        yield match.start(), match.end() - 1
+
+
+def bits_from_positions(positions, size):
+    """Return an int with the bits at `positions` (lower than `size`) set."""
+    buf = bytearray((size + 7) // 8)
+    for pos in positions:
+        buf[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buf, 'little')
@@ -0,0 +1,118 @@
+import time
+
+from .exceptions import BadUsageError
+
+
+class BatchedWriter:
+    """
+    Group-commit writer.
+
+    Buffers the entries passed to `create` and stores them together in a
+    single write transaction using `Connection.bulk_create`.
+
+    The buffer is flushed when it reaches `max_entries`, when the oldest
+    buffered entry is older than `max_delay_ms` (checked on every `create`,
+    connections are single threaded so there is no background flusher), on
+    explicit `flush` and on `close`.
+
+    """
+    def __init__(self, connection, max_entries=1000, max_delay_ms=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be greater than 0")
+        if max_delay_ms is not None and max_delay_ms < 0:
+            raise ValueError("max_delay_ms must be positive")
+
+        self.connection = connection
+        self.max_entries = max_entries
+        self.max_delay_ms = max_delay_ms
+
+        self.buffer = []
+        self.first_buffered_at = None
+        self.closed = False
+
+        self.batches = 0
+        self.entries = 0
+        self.last_batch_size = 0
+        self.last_flush_latency = None
+        self.total_flush_latency = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_, **__):
+        self.close()
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def _expired(self):
+        if self.max_delay_ms is None or self.first_buffered_at is None:
+            return False
+        else:
+            elapsed = time.monotonic() - self.first_buffered_at
+            return elapsed * 1000 >= self.max_delay_ms
+
+    def create(self, **kwargs):
+        """
+        Buffer a new entry.
+
+        Return the (not yet saved) entry. `pk` and `saved` are set when the
+        batch containing the entry is flushed.
+
+        """
+        if self.closed:
+            raise BadUsageError("Cannot use a closed writer.")
+
+        entry = self.connection.model(**kwargs)
+        if not self.buffer:
+            self.first_buffered_at = time.monotonic()
+        self.buffer.append(entry)
+
+        if len(self.buffer) >= self.max_entries or self._expired():
+            self.flush()
+
+        return entry
+
+    def flush(self):
+        """
+        Store all the buffered entries in one write transaction.
+
+        Return the list of `pk` of the stored entries. If the transaction
+        fails the buffer is kept untouched and the exception is propagated.
+
+        """
+        if not self.buffer:
+            return []
+
+        start = time.perf_counter()
+        self.connection.bulk_create(self.buffer)
+        latency = time.perf_counter() - start
+
+        pks = [entry.pk for entry in self.buffer]
+
+        self.batches += 1
+        self.entries += len(pks)
+        self.last_batch_size = len(pks)
+        self.last_flush_latency = latency
+        self.total_flush_latency += latency
+
+        self.buffer = []
+        self.first_buffered_at = None
+
+        return pks
+
+    def close(self):
+        if not self.closed:
+            self.flush()
+            self.closed = True
+
+    def stats(self):
+        return {'batches': self.batches,
+                'entries': self.entries,
+                'pending': len(self.buffer),
+                'last_batch_size': self.last_batch_size,
+                'last_flush_latency': self.last_flush_latency,
+                'mean_batch_size': (self.entries / self.batches
+                                    if self.batches else 0),
+                'mean_flush_latency': (self.total_flush_latency / self.batches
+                                       if self.batches else None)}
@@ -1,33 +1,13 @@
-from itertools import cycle
-import atexit
-import os
-import signal
-import time
-
-from binlog.reader import TDSReader
-
-r = TDSReader('test', checkpoint='status')
-
-def save_status():
-    """
-    Save a checkpoint with the current status.
-    
-    Only the acknowledged entries will be included in the checkpoint.
-
-    """
-    r.save()
-
-    
-atexit.register(save_status)
-
-for i in cycle(range(1, 20001)):
-    if i == 20000:  # Make a checkpoint each 20k reads.
-        save_status()
-
-    n = r.next_record()  # Read the next log entry.
-
-    if n is None:
-        time.sleep(1)
-    else:
-        print('.', end='', flush=True)
-        r.ack(n)  # Acknowledge the reception of the entry.
+from binlog.model import Model
+
+with Model.open('test') as db:
+    db.register_reader('example')
+
+    # `follow` never ends, so the acks are committed every 100 acks or
+    # after a second instead of only when the reader is closed.
+    with db.reader('example', commit_every=100,
+                   commit_interval=1) as reader:
+        # Blocks until the writer stores new entries.
+        for entry in reader.follow():
+            print('.', end='', flush=True)
+            reader.ack(entry)  # Acknowledge the reception of the entry.
@@ -1,9 +1,6 @@
-from binlog.writer import TDSWriter
+from binlog.model import Model
 
-from random import randint
-
-w = TDSWriter('test')
-
-while True:
-    w.append("Hello World!")
-    print('.', end='', flush=True)
+with Model.open('test') as db:
+    while True:
+        db.create(message="Hello World!")
+        print('.', end='', flush=True)
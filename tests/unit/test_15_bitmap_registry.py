@@ -0,0 +1,156 @@
+from array import array
+
+from hypothesis import given
+from hypothesis import strategies as st
+import pytest
+
+from binlog.abstract import Direction
+from binlog.bitmap import ARRAY_MAX, BitmapRegistry, BLOCK_SIZE
+from binlog.registry import Registry, S
+from binlog.serializer import BitmapSerializer
+
+idxs = st.lists(st.integers(min_value=0, max_value=4 * BLOCK_SIZE),
+                max_size=50)
+
+
+def _segments(values):
+    registry = Registry()
+    registry.update(values)
+    return registry.acked
+
+
+@given(values=idxs)
+def test_bitmap_registry_add(values):
+    registry = BitmapRegistry()
+    added = [registry.add(v) for v in values]
+
+    seen = set()
+    for value, new in zip(values, added):
+        assert new is (value not in seen)
+        seen.add(value)
+
+    assert registry.acked == _segments(values)
+    assert all(v in registry for v in values)
+    assert registry.count() == len(seen)
+
+
+@given(values=idxs)
+def test_bitmap_registry_update(values):
+    registry = BitmapRegistry()
+    assert registry.update(values) == len(set(values))
+    assert registry.update(values) == 0
+    assert registry.acked == _segments(values)
+
+
+@given(L=st.integers(min_value=0, max_value=3 * BLOCK_SIZE),
+       length=st.integers(min_value=0, max_value=2 * BLOCK_SIZE),
+       values=idxs)
+def test_bitmap_registry_add_range(L, length, values):
+    registry = BitmapRegistry()
+    registry.update(values)
+
+    expected = len(set(range(L, L + length + 1)) - set(values))
+    assert registry.add_range(L, L + length) == expected
+    assert registry.acked == (Registry(_segments(values)) |
+                              Registry([S(L, L + length)])).acked
+
+
+def test_bitmap_registry_add_errors():
+    registry = BitmapRegistry()
+    with pytest.raises(TypeError):
+        registry.add(None)
+    with pytest.raises(ValueError):
+        registry.add_range(10, 1)
+    with pytest.raises(ValueError):
+        (~registry).add(1)
+
+
+@given(a=idxs, b=idxs)
+def test_bitmap_registry_operations(a, b):
+    ra, rb = BitmapRegistry(), BitmapRegistry()
+    ra.update(a)
+    rb.update(b)
+    sa, sb = Registry(_segments(a)), Registry(_segments(b))
+
+    assert (ra | rb).acked == (sa | sb).acked
+    assert (ra & rb).acked == (sa & sb).acked
+    assert (~ra).acked == (~sa).acked
+    assert (~ra | rb).acked == (~sa | sb).acked
+    assert (ra | ~rb).acked == (sa | ~sb).acked
+    assert (~ra & rb).acked == (~sa & sb).acked
+    assert (ra & ~rb).acked == (sa & ~sb).acked
+    assert (~ra & ~rb).acked == (~sa & ~sb).acked
+    assert (~ra | ~rb).acked == (~sa | ~sb).acked
+
+    # Mixed with segment registries
+    assert (ra | sb).acked == (sa | sb).acked
+    assert (sa & rb).acked == (sa & sb).acked
+
+
+@given(values=idxs, pos=st.integers(min_value=0, max_value=5 * BLOCK_SIZE))
+def test_bitmap_registry_segment_at(values, pos):
+    registry = BitmapRegistry()
+    registry.update(values)
+
+    for inverted in (False, True):
+        segments = (~registry if inverted else registry).acked
+        forward = [s for s in segments if s.R >= pos]
+        backward = [s for s in segments if s.L <= pos]
+
+        segment = registry.segment_at(pos, Direction.F, inverted)
+        if forward:
+            assert segment == S(max(pos, forward[0].L), forward[0].R)
+        else:
+            assert segment is None
+
+        segment = registry.segment_at(pos, Direction.B, inverted)
+        if backward:
+            assert segment == S(backward[-1].L, min(pos, backward[-1].R))
+        else:
+            assert segment is None
+
+
+def test_bitmap_registry_sparse_containers_are_arrays():
+    registry = BitmapRegistry()
+    values = list(range(BLOCK_SIZE - 1, 0, -BLOCK_SIZE // ARRAY_MAX))
+    registry.update(values[:10])
+    for value in values[10:]:
+        assert registry.add(value)
+        assert not registry.add(value)
+    assert isinstance(registry.containers[0], array)
+    assert len(registry.containers[0]) == ARRAY_MAX
+
+    assert registry.add(0)
+    assert isinstance(registry.containers[0], int)
+    assert registry.count() == ARRAY_MAX + 1
+    assert registry.acked == _segments(values + [0])
+
+    inverted = ~BitmapRegistry.from_segments([S(5, 5)])
+    registry = ~inverted
+    registry.add(6)
+    assert inverted.acked == (~Registry([S(5, 5)])).acked
+    assert registry.acked == [S(5, 6)]
+
+
+@given(values=st.lists(st.integers(min_value=0, max_value=BLOCK_SIZE - 1)))
+def test_bitmap_serializer(values):
+    registry = BitmapRegistry()
+    registry.update(values)
+    bits = registry._container(0)
+
+    raw = BitmapSerializer.db_value(bits)
+    assert BitmapSerializer.python_value(memoryview(raw)) == bits
+
+
+def test_bitmap_serializer_picks_smallest_container():
+    sparse = BitmapSerializer.db_value(1 << 10 | 1 << 500)
+    assert sparse[:1] == BitmapSerializer.ARRAY
+    assert len(sparse) == 5
+
+    dense = BitmapSerializer.db_value(int('01' * (BLOCK_SIZE // 2), 2))
+    assert dense[:1] == BitmapSerializer.BITMAP
+    assert len(dense) == 1 + BLOCK_SIZE // 8
+
+    full = BitmapSerializer.db_value((1 << BLOCK_SIZE) - 1)
+    assert full[:1] == BitmapSerializer.RUNS
+    assert len(full) == 5
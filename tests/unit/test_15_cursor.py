@@ -14,3 +14,26 @@ def test_cursorproxy_is_iterseek():
     from binlog.cursor import CursorProxy
 
     assert issubclass(CursorProxy, IterSeek)
+
+
+def test_cursorproxy_cardinality(tmpdir):
+    from binlog.databases import Entries
+    from binlog.index import TextIndex
+    from binlog.model import Model
+
+    class IndexedModel(Model):
+        kind = TextIndex()
+
+    with IndexedModel.open(tmpdir) as db:
+        db.bulk_create(IndexedModel(kind='rare' if i % 10 == 0 else 'common')
+                       for i in range(100))
+
+        with db.data(write=False) as res:
+            with Entries.cursor(res) as cursor:
+                assert cursor.cardinality() == 100
+
+            db_name = db._get_index_name('kind')
+            with TextIndex.cursor(res, db_name=db_name) as cursor:
+                assert cursor.cardinality() is None
+                cursor.dupkey = 'rare'
+                assert cursor.cardinality() == 10
@@ -165,3 +165,271 @@ def test_anditerseek_oriterseek_composed_2(dummyiterseek, direction,
     expected = (a & b) | (c & d)
 
     check_resiter(resiter, expected, direction, seeks)
+
+
+#
+# RANGES
+#
+def all_ranges(resiter):
+    ranges = []
+    while True:
+        try:
+            ranges.append(tuple(resiter.next_range()))
+        except StopIteration:
+            return ranges
+
+
+@pytest.mark.parametrize("direction", [Direction.F, Direction.B])
+@given(a=st.sets(st.integers(min_value=0, max_value=200)),
+       b=st.sets(st.integers(min_value=0, max_value=200)),
+       seeks=st.lists(st.integers(min_value=0, max_value=200), max_size=5))
+def test_iterseek_operations_ranges(direction, a, b, seeks):
+    from binlog.registry import Registry, RegistryIterSeek
+
+    ra, rb = Registry(), Registry()
+    ra.update(a)
+    rb.update(b)
+
+    for operation, expected in ((op.and_, ra & rb), (op.or_, ra | rb)):
+        resiter = operation(RegistryIterSeek(ra, direction=direction),
+                            RegistryIterSeek(rb, direction=direction))
+
+        segments = [tuple(s) for s in expected.acked]
+        if direction is Direction.B:
+            segments.reverse()
+        assert all_ranges(resiter) == segments
+
+        for s in seeks:
+            resiter.seek(s)
+            if direction is Direction.F:
+                cut = [(max(L, s), R) for L, R in segments if R >= s]
+            else:
+                cut = [(L, min(R, s)) for L, R in segments if L <= s]
+            assert all_ranges(resiter) == cut
+
+
+@pytest.mark.parametrize("direction", [Direction.F, Direction.B])
+def test_iterseek_operations_ranges_mixed(dummyiterseek, direction):
+    from binlog.registry import Registry, RegistryIterSeek, S
+
+    registry = RegistryIterSeek(Registry([S(0, 9), S(20, 29)]),
+                                direction=direction)
+    values = dummyiterseek([5, 6, 7, 15, 25], direction=direction)
+    resiter = registry & values
+
+    values = [v for L, R in all_ranges(resiter) for v in range(L, R + 1)]
+    assert values == sorted([5, 6, 7, 25], reverse=direction is Direction.B)
+
+
+@pytest.mark.parametrize("direction", [Direction.F, Direction.B])
+def test_iterseek_operations_seek_out_of_range(direction):
+    from binlog.registry import Registry, RegistryIterSeek, S
+
+    def registry(*segments):
+        return RegistryIterSeek(Registry(list(segments)), direction=direction)
+
+    seeks = [S.MIN - 1, -2**100, S.MAX + 1, 2**100, 3]
+    check_resiter(registry(S(1, 2), S(5, 5)), [1, 2, 5], direction, seeks)
+    check_resiter(registry(S(1, 2), S(5, 5)) & registry(S(0, 9)),
+                  [1, 2, 5], direction, seeks)
+    check_resiter(registry(S(1, 2)) | registry(S(5, 5)),
+                  [1, 2, 5], direction, seeks)
+    check_resiter(registry(S(0, 9)) - registry(S(3, 4)),
+                  [0, 1, 2, 5, 6, 7, 8, 9], direction, seeks)
+
+    resiter = ~registry(S(1, 2), S(5, 5))
+    gaps = [(0, 0), (3, 4), (6, S.MAX)]
+    for s in (S.MIN - 1, -2**100):
+        resiter.seek(s)
+        if direction is Direction.F:
+            assert all_ranges(resiter) == gaps
+        else:
+            assert all_ranges(resiter) == []
+    for s in (S.MAX + 1, 2**100):
+        resiter.seek(s)
+        if direction is Direction.F:
+            assert all_ranges(resiter) == []
+        else:
+            assert all_ranges(resiter) == gaps[::-1]
+
+
+def test_iterseek_operations_interleave_next_and_next_range():
+    from binlog.registry import Registry, RegistryIterSeek, S
+
+    resiter = (RegistryIterSeek(Registry([S(0, 9), S(20, 29)])) &
+               RegistryIterSeek(Registry([S(5, 24)])))
+    assert next(resiter) == 5
+    assert resiter.next_range() == S(6, 9)
+    assert next(resiter) == 20
+    assert resiter.next_range() == S(21, 24)
+    with pytest.raises(StopIteration):
+        resiter.next_range()
+
+
+@pytest.mark.parametrize("direction", [Direction.F, Direction.B])
+def test_iterseek_operations_keep_operands_on_last_value(dummyiterseek,
+                                                         direction):
+    from binlog.registry import Registry, RegistryIterSeek, S
+
+    class LastIterSeek(dummyiterseek):
+        last = None
+
+        def __next__(self):
+            self.last = super().__next__()
+            return self.last
+
+    def registry(*segments):
+        return RegistryIterSeek(Registry(list(segments)), direction=direction)
+
+    for operation, expected in (
+            (lambda v: v & registry(S(2, 4), S(7, 8)), [2, 3, 4, 7, 8]),
+            (lambda v: (v & registry(S(2, 4), S(7, 8))) - registry(S(3, 3)),
+             [2, 4, 7, 8])):
+        values = LastIterSeek(range(10), direction=direction)
+        resiter = operation(values)
+        returned = []
+        for value in resiter:
+            # Not advanced until the next value is requested (ex. a cursor
+            # stays on the entry just returned).
+            assert values.last == value
+            returned.append(value)
+        assert returned == sorted(expected, reverse=direction is Direction.B)
+
+
+#
+# LEAPFROG
+#
+@pytest.fixture
+def countingiterseek(dummyiterseek):
+    class CountingIterSeek(dummyiterseek):
+        def __init__(self, items, direction=Direction.F, estimate=None):
+            super().__init__(items, direction=direction)
+            self.estimate = estimate
+            self.nexts = 0
+
+        def cardinality(self):
+            return self.estimate
+
+        def __next__(self):
+            self.nexts += 1
+            return super().__next__()
+
+    return CountingIterSeek
+
+
+def test_anditerseek_orders_by_cardinality(countingiterseek):
+    unknown = countingiterseek([1])
+    big = countingiterseek([1], estimate=100)
+    small = countingiterseek([1], estimate=5)
+
+    resiter = unknown & big & small
+    assert resiter.things == [small, big, unknown]
+    assert resiter.cardinality() == 5
+
+
+@pytest.mark.parametrize("direction", [Direction.F, Direction.B])
+def test_anditerseek_leapfrog_skips_values(countingiterseek, direction):
+    dense = countingiterseek(range(0, 10000, 2), direction=direction,
+                             estimate=5000)
+    sparse = countingiterseek([10, 5000, 9998, 9999], direction=direction,
+                              estimate=4)
+
+    resiter = dense & sparse
+    assert list(resiter) == sorted([10, 5000, 9998],
+                                   reverse=direction is Direction.B)
+    assert dense.nexts < 10
+
+
+@pytest.mark.parametrize("direction", [Direction.F, Direction.B])
+def test_oriterseek_advances_only_merged_operands(countingiterseek,
+                                                  direction):
+    operands = [countingiterseek(range(i, 1000, 200), direction=direction)
+                for i in range(0, 200, 2)]
+
+    resiter = reduce(op.or_, operands)
+    expected = sorted(range(0, 1000, 2), reverse=direction is Direction.B)
+    assert list(resiter) == expected
+    # Every value once, plus the StopIteration of every operand.
+    assert sum(o.nexts for o in operands) == len(expected) + len(operands)
+
+
+#
+# DIFF / NOT
+#
+@pytest.mark.parametrize("direction", [Direction.F, Direction.B])
+@given(a=st.sets(st.integers(min_value=0, max_value=100)),
+       b=st.sets(st.integers(min_value=0, max_value=100)),
+       seeks=st.lists(st.integers(min_value=0, max_value=100), max_size=5))
+def test_diffiterseek_operation(dummyiterseek, direction, a, b, seeks):
+    from binlog.operations import DIFFIterSeek
+
+    resiter = (dummyiterseek(a, direction=direction) -
+               dummyiterseek(b, direction=direction))
+    assert isinstance(resiter, DIFFIterSeek)
+    check_resiter(resiter, a - b, direction, seeks)
+
+
+@pytest.mark.parametrize("direction", [Direction.F, Direction.B])
+@given(a=st.sets(st.integers(min_value=0, max_value=200)),
+       b=st.sets(st.integers(min_value=0, max_value=200)),
+       c=st.sets(st.integers(min_value=0, max_value=200)),
+       seeks=st.lists(st.integers(min_value=0, max_value=200), max_size=5))
+def test_diffiterseek_ranges(direction, a, b, c, seeks):
+    from binlog.registry import Registry, RegistryIterSeek
+
+    def registry(values):
+        r = Registry()
+        r.update(values)
+        return RegistryIterSeek(r, direction=direction)
+
+    resiter = registry(a) - (registry(b) - registry(c))
+    expected = a - (b - c)
+    check_resiter(resiter, expected, direction, seeks)
+
+    resiter = registry(a) - registry(b) - registry(c)
+    segments = [tuple(s) for s in registry(a - b - c).registry.acked]
+    if direction is Direction.B:
+        segments.reverse()
+    assert all_ranges(resiter) == segments
+
+
+@pytest.mark.parametrize("direction", [Direction.F, Direction.B])
+@given(a=st.sets(st.integers(min_value=0, max_value=100)),
+       seeks=st.lists(st.integers(min_value=0, max_value=100), max_size=5))
+def test_notiterseek_operation(dummyiterseek, direction, a, seeks):
+    from binlog.operations import NOTIterSeek
+    from binlog.registry import S
+
+    resiter = ~dummyiterseek(a, direction=direction)
+    assert isinstance(resiter, NOTIterSeek)
+
+    # Complement of `a` up to 101 (the last range goes on until S.MAX).
+    ranges = all_ranges(resiter)
+    values = [v for L, R in ranges for v in range(L, min(R, 101) + 1)]
+    assert sorted(values) == [v for v in range(102) if v not in a]
+    if direction is Direction.F:
+        assert ranges[-1][1] == S.MAX
+    else:
+        assert ranges[0][1] == S.MAX
+
+    for s in seeks:
+        resiter.seek(s)
+        if direction is Direction.B and all(v in a for v in range(s + 1)):
+            with pytest.raises(StopIteration):
+                next(resiter)
+            continue
+
+        value = next(resiter)
+        assert value not in a
+        if direction is Direction.F:
+            assert value >= s and all(v in a for v in range(s, value))
+        else:
+            assert value <= s and all(v in a for v in range(value + 1, s + 1))
+
+
+def test_notiterseek_whole_range(dummyiterseek):
+    from binlog.registry import S
+
+    assert all_ranges(~dummyiterseek([])) == [(S.MIN, S.MAX)]
+    assert all_ranges(~dummyiterseek([S.MIN, S.MAX])) == [(1, S.MAX - 1)]
+    assert all_ranges(~~dummyiterseek([3])) == [(3, 3)]
@@ -125,6 +125,53 @@ def test_registry_is_always_sorted(data):
     assert list(r.acked) == sorted(r.acked)  # sorted always returns list
 
 
+@given(data=st.lists(st.integers(min_value=0, max_value=100)))
+def test_registry_add_keeps_segments_disjoint(data):
+    from binlog.registry import Registry
+
+    r = Registry()
+
+    for n, i in enumerate(data):
+        assert r.add(i) == (i not in data[:n])
+
+    assert list(r) == sorted(set(data))
+    for a, b in zip(r.acked, r.acked[1:]):
+        assert a.R + 1 < b.L
+
+
+@given(data=st.lists(st.integers(min_value=0, max_value=100)),
+       ranges=st.lists(st.tuples(st.integers(min_value=0, max_value=100),
+                                 st.integers(min_value=0, max_value=10))))
+def test_registry_add_range(data, ranges):
+    from binlog.registry import Registry
+
+    r = Registry()
+    expected = Registry()
+    for i in data:
+        r.add(i)
+        expected.add(i)
+
+    for L, size in ranges:
+        new = len([i for i in range(L, L + size + 1) if i not in expected])
+        for i in range(L, L + size + 1):
+            expected.add(i)
+        assert r.add_range(L, L + size) == new
+
+    assert r.acked == expected.acked
+
+
+def test_registry_add_range_errors():
+    from binlog.registry import Registry
+
+    r = Registry()
+
+    with pytest.raises(TypeError):
+        r.add_range(0, None)
+
+    with pytest.raises(ValueError):
+        r.add_range(1, 0)
+
+
 @given(data=st.lists(st.integers(min_value=0, max_value=100)),
        point=st.integers(min_value=0, max_value=100))
 def test_registry_contains(data, point):
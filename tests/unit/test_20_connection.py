@@ -9,7 +9,9 @@ import pytest
 from binlog.model import Model
 from binlog.exceptions import BadUsageError
 
-io_methods = ["data", "readers", "create", "bulk_create", "reader",
+io_methods = ["data", "readers", "create", "bulk_create",
+              "bulk_create_stream", "batched_writer", "create_raw",
+              "bulk_create_raw", "reserve_ids", "sync", "reader",
               "register_reader", "unregister_reader", "save_registry", "list_readers",
               "remove", "purge"]
 
@@ -0,0 +1,45 @@
+import pytest
+
+from binlog.model import Model, DURABILITY_PROFILES
+
+
+@pytest.mark.parametrize("profile", sorted(DURABILITY_PROFILES))
+def test_durability_profile_flags(tmpdir, profile):
+    with Model.open(tmpdir, durability=profile) as db:
+        for env in (db.data_env, db.readers_env):
+            flags = env.flags()
+            for flag, value in DURABILITY_PROFILES[profile].items():
+                assert flags[flag] is value, flag
+
+        db.create(test='data')
+        db.sync()
+
+        with db.reader() as reader:
+            assert reader[0] == {'test': 'data'}
+
+
+def test_durability_profile_overridden_by_kwargs(tmpdir):
+    with Model.open(tmpdir, durability='fast', writemap=False) as db:
+        flags = db.data_env.flags()
+        assert flags['sync'] is False
+        assert flags['writemap'] is False
+
+
+def test_durability_profile_from_meta(tmpdir):
+    class FastModel(Model):
+        __meta_durability__ = 'fast'
+
+    with FastModel.open(tmpdir) as db:
+        assert db.data_env.flags()['sync'] is False
+        assert db.kwargs == DURABILITY_PROFILES['fast']
+
+
+def test_durability_default_is_lmdb_default(tmpdir):
+    with Model.open(tmpdir) as db:
+        assert db.kwargs == {}
+        assert db.data_env.flags()['sync'] is True
+
+
+def test_unknown_durability_profile(tmpdir):
+    with pytest.raises(ValueError):
+        Model.open(tmpdir, durability='unknown')
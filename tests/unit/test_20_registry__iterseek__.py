@@ -322,3 +322,52 @@ def test_registryiterseek_backward_threesegments_seek(a, b, c, d, e, f, seeks):
             assert next(r) == f, s
         else:
             assert False, "Non defined %d" % s
+
+
+#
+# ANY NUMBER OF SEGMENTS
+#
+@given(acked=st.sets(st.integers(min_value=0, max_value=1000)),
+       seeks=st.lists(st.integers(min_value=0, max_value=1001)),
+       direction=st.sampled_from(Direction))
+def test_registryiterseek_seek_then_iterate(acked, seeks, direction):
+    from binlog.registry import RegistryIterSeek
+
+    registry = Registry()
+    registry.update(acked)
+    r = RegistryIterSeek(registry, direction=direction)
+
+    for s in seeks:
+        r.seek(s)
+        if direction is Direction.F:
+            expected = sorted(i for i in acked if i >= s)
+        else:
+            expected = sorted((i for i in acked if i <= s), reverse=True)
+        assert list(r) == expected
+
+
+def test_registryiterseek_many_segments():
+    from binlog.registry import RegistryIterSeek
+
+    registry = Registry([S(i, i) for i in range(0, 200000, 2)])
+    r = RegistryIterSeek(registry)
+
+    r.seek(150001)
+    assert next(r) == 150002
+    assert next(r) == 150004
+
+    r = RegistryIterSeek(registry, direction=Direction.B)
+    r.seek(150001)
+    assert next(r) == 150000
+    assert len(list(r)) == 75000
+
+
+def test_registryiterseek_sees_registry_changes():
+    from binlog.registry import RegistryIterSeek
+
+    registry = Registry([S(0, 1), S(10, 11)])
+    r = RegistryIterSeek(registry)
+
+    assert next(r) == 0
+    registry.add(5)
+    assert list(r) == [1, 5, 10, 11]
@@ -10,6 +10,10 @@ from binlog.serializer import ObjectSerializer
 from binlog.serializer import NullListSerializer
 from binlog.serializer import TextSerializer
 from binlog.serializer import DatetimeSerializer
+from binlog.serializer import JSONSerializer
+from binlog.serializer import MarshalSerializer
+from binlog.serializer import StructSerializer
+from binlog.serializer import CompressedSerializer, COMPRESSIONS
 
 
 @pytest.mark.parametrize(
@@ -27,7 +31,13 @@ from binlog.serializer import DatetimeSerializer
                               min_size=1,
                               alphabet=ascii_letters + '.')),
      (DatetimeSerializer, st.datetimes(
-                              min_value=datetime.fromtimestamp(0)))])
+                              min_value=datetime.fromtimestamp(0))),
+     (MarshalSerializer, st.dictionaries(
+                             st.text(),
+                             st.integers() | st.text())),
+     (JSONSerializer, st.dictionaries(
+                          st.text(),
+                          st.integers() | st.text()))])
 @given(st.data())
 def test_serializers_conversion(serializer, strategy, data):
     python_value = expected = data.draw(strategy)
@@ -46,3 +56,82 @@ def test_nulllistserializer_invalid_values():
 
     with pytest.raises(ValueError):
         NullListSerializer.db_value('ñoño')
+
+
+class EventSerializer(StructSerializer):
+    fields = (('ts', 'd'), ('user', 'Q'))
+
+
+@given(ts=st.floats(allow_nan=False),
+       user=st.integers(min_value=0, max_value=2**64-1),
+       rest=st.dictionaries(st.sampled_from(['path', 'tags']), st.text()))
+def test_structserializer_conversion(ts, user, rest):
+    expected = dict(rest, ts=ts, user=user)
+    raw = EventSerializer.db_value(expected)
+
+    assert raw[:1] == StructSerializer.STRUCT
+    assert EventSerializer.python_value(memoryview(raw)) == expected
+
+
+@pytest.mark.parametrize("entry", [{'ts': 1.5},
+                                   {'ts': 1.5, 'user': -1},
+                                   {'ts': 'now', 'user': 1}])
+def test_structserializer_fallback(entry):
+    raw = EventSerializer.db_value(entry)
+
+    assert raw[:1] == StructSerializer.MARSHAL
+    assert EventSerializer.python_value(memoryview(raw)) == entry
+
+
+def test_structserializer_unknown_kind():
+    with pytest.raises(ValueError):
+        EventSerializer.python_value(memoryview(b'x'))
+
+
+@pytest.mark.parametrize("compression", sorted(COMPRESSIONS))
+@given(value=st.dictionaries(st.text(), st.text()))
+def test_compressedserializer_conversion(compression, value):
+    serializer = CompressedSerializer.wrapping(ObjectSerializer,
+                                               compression, 16)
+    current = serializer.python_value(
+        memoryview(serializer.db_value(value)))
+
+    assert current == value
+
+
+def test_compressedserializer_threshold():
+    serializer = CompressedSerializer.wrapping(ObjectSerializer, 'zlib', 64)
+    small = {'a': 'b'}
+    large = {'a': 'b' * 100}
+
+    assert serializer.db_value(small) == b'\0' + ObjectSerializer.db_value(
+        small)
+    assert serializer.db_value(large)[:1] == b'z'
+    assert len(serializer.db_value(large)) < len(
+        ObjectSerializer.db_value(large))
+
+
+def test_compressedserializer_reads_any_compression():
+    value = {'a': 'b' * 100}
+    zlib = CompressedSerializer.wrapping(ObjectSerializer, 'zlib', 0)
+    lzma = CompressedSerializer.wrapping(ObjectSerializer, 'lzma', 0)
+
+    assert zlib.python_value(memoryview(lzma.db_value(value))) == value
+    assert lzma.python_value(memoryview(zlib.db_value(value))) == value
+
+
+def test_compressedserializer_without_compression():
+    value = {'a': 'b' * 100}
+    raw = CompressedSerializer.wrapping(ObjectSerializer, None, 0)
+    zlib = CompressedSerializer.wrapping(ObjectSerializer, 'zlib', 0)
+
+    assert raw.db_value(value) == b'\0' + ObjectSerializer.db_value(value)
+    assert raw.python_value(memoryview(zlib.db_value(value))) == value
+
+
+def test_compressedserializer_unknown():
+    with pytest.raises(ValueError):
+        CompressedSerializer.wrapping(ObjectSerializer, 'unknown', 0)
+
+    with pytest.raises(ValueError):
+        CompressedSerializer.python_value(memoryview(b'?data'))
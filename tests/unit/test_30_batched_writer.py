@@ -0,0 +1,92 @@
+import time
+
+import pytest
+
+from binlog.exceptions import BadUsageError
+from binlog.model import Model
+
+
+def test_batched_writer_buffers_until_flush(tmpdir):
+    with Model.open(tmpdir) as db:
+        writer = db.batched_writer(max_entries=10)
+
+        entry = writer.create(test='data')
+        assert not entry.saved
+        assert len(writer) == 1
+
+        with db.reader() as reader:
+            with pytest.raises(IndexError):
+                reader[0]
+
+        pks = writer.flush()
+        assert pks == [0]
+        assert entry.saved
+        assert entry.pk == 0
+
+        with db.reader() as reader:
+            assert reader[0] == {'test': 'data'}
+
+
+def test_batched_writer_flush_on_max_entries(tmpdir):
+    with Model.open(tmpdir) as db:
+        writer = db.batched_writer(max_entries=3)
+
+        entries = [writer.create(idx=i) for i in range(7)]
+
+        assert [e.pk for e in entries[:6]] == list(range(6))
+        assert not entries[6].saved
+        assert writer.stats()['batches'] == 2
+        assert writer.stats()['last_batch_size'] == 3
+        assert writer.stats()['pending'] == 1
+
+
+def test_batched_writer_flush_on_max_delay(tmpdir):
+    with Model.open(tmpdir) as db:
+        writer = db.batched_writer(max_entries=100, max_delay_ms=1)
+
+        first = writer.create(idx=0)
+        time.sleep(0.01)
+        second = writer.create(idx=1)
+
+        assert first.saved and second.saved
+        assert writer.stats()['last_batch_size'] == 2
+
+
+def test_batched_writer_flush_on_close(tmpdir):
+    with Model.open(tmpdir) as db:
+        with db.batched_writer(max_entries=100) as writer:
+            for i in range(10):
+                writer.create(idx=i)
+
+        stats = writer.stats()
+        assert stats['batches'] == 1
+        assert stats['entries'] == 10
+        assert stats['last_flush_latency'] is not None
+
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader] == list(range(10))
+
+        with pytest.raises(BadUsageError):
+            writer.create(idx=10)
+
+
+def test_batched_writer_interleaves_with_create(tmpdir):
+    with Model.open(tmpdir) as db:
+        with db.batched_writer() as writer:
+            writer.create(idx=0)
+            writer.flush()
+            db.create(idx=1)
+            writer.create(idx=2)
+
+        with db.reader() as reader:
+            assert [(e.pk, e['idx']) for e in reader] == [(0, 0),
+                                                          (1, 1),
+                                                          (2, 2)]
+
+
+def test_batched_writer_invalid_params(tmpdir):
+    with Model.open(tmpdir) as db:
+        with pytest.raises(ValueError):
+            db.batched_writer(max_entries=0)
+        with pytest.raises(ValueError):
+            db.batched_writer(max_delay_ms=-1)
@@ -0,0 +1,67 @@
+import pytest
+
+from binlog.model import Model
+
+
+def test_bulk_create_stream_is_lazy(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=-1)
+        stream = db.bulk_create_stream({'idx': i} for i in range(10))
+
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader] == [-1]
+
+        assert list(stream) == [10]
+
+
+def test_bulk_create_stream_commits_every_chunk_size(tmpdir):
+    with Model.open(tmpdir) as db:
+        stream = db.bulk_create_stream(({'idx': i} for i in range(25)),
+                                       chunk_size=10)
+
+        assert next(stream) == 10
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader] == list(range(10))
+
+        assert list(stream) == [20, 25]
+        with db.reader() as reader:
+            assert [(e.pk, e['idx']) for e in reader] == [(i, i)
+                                                         for i in range(25)]
+
+
+def test_bulk_create_stream_commits_every_chunk_bytes(tmpdir):
+    with Model.open(tmpdir) as db:
+        entries = [Model(data='x' * 100) for _ in range(10)]
+        counts = list(db.bulk_create_stream(entries,
+                                            chunk_size=1000,
+                                            chunk_bytes=300))
+
+        assert counts == [3, 6, 9, 10]
+        assert [e.pk for e in entries] == list(range(10))
+        assert all(e.saved for e in entries)
+
+
+def test_bulk_create_stream_keeps_next_event_id(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+        list(db.bulk_create_stream(({'idx': i} for i in range(1, 8)),
+                                   chunk_size=3))
+        entry = db.create(idx=8)
+
+        assert entry.pk == 8
+        with db.reader() as reader:
+            assert [(e.pk, e['idx']) for e in reader] == [(i, i)
+                                                         for i in range(9)]
+
+
+def test_bulk_create_stream_empty(tmpdir):
+    with Model.open(tmpdir) as db:
+        assert list(db.bulk_create_stream([])) == []
+
+
+@pytest.mark.parametrize("kwargs", [{'chunk_size': 0},
+                                    {'chunk_bytes': 0}])
+def test_bulk_create_stream_invalid_params(tmpdir, kwargs):
+    with Model.open(tmpdir) as db:
+        with pytest.raises(ValueError):
+            db.bulk_create_stream([], **kwargs)
@@ -0,0 +1,121 @@
+import os
+import struct
+
+import lmdb
+import pytest
+
+from binlog.exceptions import IntegrityError
+from binlog.model import Model
+
+
+class BlockModel(Model):
+    __meta_id_block_size__ = 10
+
+
+def _config_next_event_id(db):
+    with db.data(write=False) as res:
+        return db._get_next_event_idx(res)
+
+
+def test_default_block_size_keeps_config_updated(tmpdir):
+    with Model.open(tmpdir) as db:
+        for i in range(3):
+            assert db.create(idx=i).pk == i
+            assert _config_next_event_id(db) == i + 1
+
+
+def test_block_size_reserves_ids(tmpdir):
+    with BlockModel.open(tmpdir) as db:
+        assert db.create(idx=0).pk == 0
+        assert _config_next_event_id(db) == 10
+
+        assert [db.create(idx=i).pk for i in range(1, 10)] == list(
+            range(1, 10))
+        assert _config_next_event_id(db) == 10
+
+        assert db.create(idx=10).pk == 10
+        assert _config_next_event_id(db) == 20
+
+
+def test_block_size_used_by_bulk_create(tmpdir):
+    with BlockModel.open(tmpdir) as db:
+        db.create(idx=0)
+        entries = [BlockModel(idx=i) for i in range(1, 25)]
+        db.bulk_create(entries)
+
+        assert [e.pk for e in entries] == list(range(1, 25))
+        assert _config_next_event_id(db) == 30
+
+
+def test_reserve_ids(tmpdir):
+    with Model.open(tmpdir) as db:
+        assert db.reserve_ids(5) == range(0, 5)
+        assert _config_next_event_id(db) == 5
+
+        assert [db.create(idx=i).pk for i in range(5)] == list(range(5))
+        assert _config_next_event_id(db) == 5
+
+        assert db.create(idx=5).pk == 5
+        assert _config_next_event_id(db) == 6
+
+
+def test_reserve_ids_invalid_count(tmpdir):
+    with Model.open(tmpdir) as db:
+        with pytest.raises(ValueError):
+            db.reserve_ids(0)
+
+
+def test_unused_reserved_ids_are_not_reused(tmpdir):
+    with BlockModel.open(tmpdir) as db:
+        db.create(idx=0)
+
+    with BlockModel.open(tmpdir) as db:
+        assert db.create(idx=1).pk == 10
+
+
+def test_interleaved_blocks_of_two_connections(tmpdir):
+    with BlockModel.open(tmpdir) as db:
+        db.create(idx=0)
+
+        # Another writer reserves the next block and writes on it.
+        with db.data(write=True) as res:
+            db._update_next_event_idx(res, 20)
+        db2_entry = BlockModel(idx=10)
+        with db.data(write=True) as res:
+            with res.txn.cursor(res.db['entries']) as cursor:
+                cursor.put(BlockModel.K.db_value(15),
+                           BlockModel.V.db_value(db2_entry.copy()))
+
+        # The remaining ids of the first block are written out of order.
+        assert db.create(idx=1).pk == 1
+        entries = [BlockModel(idx=i) for i in range(2, 5)]
+        db.bulk_create(entries)
+        assert [e.pk for e in entries] == [2, 3, 4]
+
+        with db.reader() as reader:
+            assert [e.pk for e in reader] == [0, 1, 2, 3, 4, 15]
+
+
+def test_aborted_transaction_does_not_keep_reservation(tmpdir):
+    with BlockModel.open(tmpdir) as db:
+        with pytest.raises(RuntimeError):
+            with db.data(write=True) as res:
+                db._ids.reserve(res, 10)
+                raise RuntimeError
+
+        assert len(db._ids) == 0
+        assert db.create(idx=0).pk == 0
+
+
+def test_next_event_id_behind_entries_is_detected(tmpdir):
+    env = lmdb.open(os.path.join(str(tmpdir),
+                                 Model._meta["data_env_directory"]), max_dbs=1)
+    with env.begin(write=True) as txn:
+        entries_db = env.open_db(Model._meta["entries_db_name"].encode("utf-8"),
+                                 txn=txn)
+        txn.put(struct.pack("!Q", 3), Model.V.db_value({}), db=entries_db)
+    env.close()
+
+    with Model.open(tmpdir) as db:
+        with pytest.raises(IntegrityError):
+            db.create(idx=0)
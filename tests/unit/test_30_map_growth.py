@@ -0,0 +1,166 @@
+import lmdb
+import pytest
+
+from binlog.model import Model
+
+SMALL_MAP = 2**16
+
+
+class FixedMapModel(Model):
+    __meta_map_size_growth__ = None
+
+
+class CappedMapModel(Model):
+    __meta_map_size_max__ = 2**18
+
+
+def _payload(size=1024):
+    return 'x' * size
+
+
+def test_create_grows_map(tmpdir):
+    with Model.open(tmpdir, map_size=SMALL_MAP) as db:
+        for i in range(200):
+            db.create(idx=i, data=_payload())
+
+        stats = db.stats()
+        assert stats['data_map_size'] > SMALL_MAP
+        assert stats['map_growths']
+        assert all(env == 'data_env' for env, _, _ in stats['map_growths'])
+        assert all(new == old * 2 for _, old, new in stats['map_growths'])
+
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader] == list(range(200))
+
+
+def test_bulk_create_grows_map(tmpdir):
+    with Model.open(tmpdir, map_size=SMALL_MAP) as db:
+        entries = (Model(idx=i, data=_payload()) for i in range(200))
+        assert db.bulk_create(entries) == 200
+        assert db.stats()['map_growths']
+
+        with db.reader() as reader:
+            assert [e.pk for e in reader] == list(range(200))
+
+
+def test_bulk_create_stream_grows_map(tmpdir):
+    with Model.open(tmpdir, map_size=SMALL_MAP) as db:
+        entries = ({'idx': i, 'data': _payload()} for i in range(200))
+        assert list(db.bulk_create_stream(entries, chunk_size=150)) == [150,
+                                                                        200]
+
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader] == list(range(200))
+
+
+def test_save_registry_grows_readers_map(tmpdir):
+    with Model.open(tmpdir, map_size=SMALL_MAP) as db:
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            for pk in range(0, 20000, 2):
+                reader.ack(pk)
+
+        assert any(env == 'readers_env'
+                   for env, _, _ in db.stats()['map_growths'])
+
+
+def test_purge_counts_chunks_committed_before_growing(tmpdir, monkeypatch):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(30))
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack_range(0, 30)
+
+        # The map gets full once, in the middle of the second chunk.
+        unindex, calls = db._unindex, []
+
+        def _unindex(res, entry):
+            calls.append(entry['idx'])
+            if len(calls) == 15:
+                raise lmdb.MapFullError("Simulated")
+            return unindex(res, entry)
+
+        monkeypatch.setattr(db, '_unindex', _unindex)
+        assert db.purge(chunk_size=10) == (30, 0)
+        assert db.stats()['map_growths']
+
+        with db.reader() as reader:
+            assert list(reader) == []
+
+
+def test_map_growth_disabled(tmpdir):
+    with FixedMapModel.open(tmpdir, map_size=SMALL_MAP) as db:
+        with pytest.raises(lmdb.MapFullError):
+            for i in range(200):
+                db.create(idx=i, data=_payload())
+
+        assert db.stats()['map_growths'] == []
+
+
+def test_bulk_create_streams_entries_without_growth(tmpdir):
+    with FixedMapModel.open(tmpdir) as db:
+        def entries():
+            for i in range(10):
+                # Consumed inside the write transaction, not loaded first.
+                assert db._open_txns['data_env'] == 1
+                yield FixedMapModel(idx=i)
+
+        assert db.bulk_create(entries()) == 10
+
+
+def test_bulk_create_doesnt_hold_entries_without_growth(tmpdir):
+    import weakref
+
+    with FixedMapModel.open(tmpdir) as db:
+        refs = []
+
+        def entries():
+            for i in range(100):
+                entry = FixedMapModel(idx=i)
+                refs.append(weakref.ref(entry))
+                yield entry
+            # Only the entries being written are alive.
+            assert sum(ref() is not None for ref in refs) <= 2
+
+        assert db.bulk_create(entries()) == 100
+
+
+def test_bulk_create_grows_map_replaying_consumed_entries(tmpdir):
+    with Model.open(tmpdir, map_size=SMALL_MAP) as db:
+        consumed = 0
+
+        def entries():
+            nonlocal consumed
+            for i in range(200):
+                # Not copied before writing.
+                assert db._open_txns['data_env'] == 1
+                consumed += 1
+                yield Model(idx=i, data=_payload())
+
+        assert db.bulk_create(entries()) == 200
+        assert consumed == 200
+        assert db.stats()['map_growths']
+
+        with db.reader() as reader:
+            assert [(e.pk, e['idx']) for e in reader] == [(i, i) for i in
+                                                          range(200)]
+
+
+def test_map_growth_capped(tmpdir):
+    with CappedMapModel.open(tmpdir, map_size=SMALL_MAP) as db:
+        with pytest.raises(lmdb.MapFullError):
+            for i in range(1000):
+                db.create(idx=i, data=_payload())
+
+        assert db.stats()['data_map_size'] == 2**18
+
+
+def test_map_not_grown_with_open_transactions(tmpdir):
+    with Model.open(tmpdir, map_size=SMALL_MAP) as db:
+        db.create(idx=0)
+        with db.data(write=False):
+            with pytest.raises(lmdb.MapFullError):
+                for i in range(200):
+                    db.create(idx=i, data=_payload())
+
+        assert db.stats()['map_growths'] == []
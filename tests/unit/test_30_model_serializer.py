@@ -0,0 +1,268 @@
+import multiprocessing
+
+import lmdb
+import pytest
+
+from binlog.model import Model
+from binlog.databases import Config
+from binlog.serializer import ObjectSerializer, JSONSerializer, SERIALIZERS
+from binlog.serializer import StructSerializer, register_serializer
+
+
+class JSONModel(Model):
+    __meta_serializer__ = 'json'
+
+
+def test_model_serializer_defaults_to_pickle(tmpdir):
+    with Model.open(tmpdir) as db:
+        assert db.serializer == 'pickle'
+        assert db.entries.V is ObjectSerializer
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_model_serializer_from_meta(tmpdir, lazy):
+    with JSONModel.open(tmpdir) as db:
+        assert db.serializer == 'json'
+        db.create(name='a', idx=0)
+        db.bulk_create([JSONModel(name='b', idx=1)])
+
+        with db.data(write=False) as res:
+            raw = res.txn.get(db.entries.K.db_value(0), db=res.db['entries'])
+            assert JSONSerializer.python_value(raw) == {'name': 'a', 'idx': 0}
+
+        with db.reader(lazy=lazy) as reader:
+            assert [dict(e) for e in reader] == [{'name': 'a', 'idx': 0},
+                                                 {'name': 'b', 'idx': 1}]
+
+
+def test_model_serializer_is_kept_by_the_binlog(tmpdir):
+    with JSONModel.open(tmpdir) as db:
+        db.create(idx=0)
+
+    with Model.open(tmpdir) as db:
+        with pytest.warns(RuntimeWarning):
+            assert db.serializer == 'json'
+        db.create(idx=1)
+
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader] == [0, 1]
+
+
+def _old_binlog(tmpdir):
+    """Binlog with an entry stored before the serializer was stored."""
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+        with db.data(write=True) as res:
+            with Config.cursor(res) as cursor:
+                cursor.delete('serializer')
+                cursor.delete('format')
+
+
+def test_model_serializer_of_binlogs_without_it(tmpdir):
+    _old_binlog(tmpdir)
+
+    with JSONModel.open(tmpdir) as db:
+        with pytest.warns(RuntimeWarning):
+            assert db.serializer == 'pickle'
+        with db.reader() as reader:
+            assert reader[0] == {'idx': 0}
+
+
+def _create_json(path):
+    with JSONModel.open(path) as db:
+        db.create(idx=0)
+
+
+def test_model_serializer_stored_by_other_process(tmpdir):
+    with Model.open(tmpdir) as db:
+        assert db.serializer == 'pickle'
+
+        ctx = multiprocessing.get_context('spawn')
+        writer = ctx.Process(target=_create_json, args=(str(tmpdir), ))
+        writer.start()
+        writer.join()
+
+        with pytest.warns(RuntimeWarning):
+            with db.reader() as reader:
+                assert [dict(e) for e in reader] == [{'idx': 0}]
+        assert db.serializer == 'json'
+
+
+def test_model_v_is_the_serializer_of_new_binlogs():
+    assert Model.V is ObjectSerializer
+    assert JSONModel.V is JSONSerializer
+    assert CompressedModel.V.serializer is ObjectSerializer
+    assert CompressedModel.V.compression == 'zlib'
+    assert CompressedModel.V.threshold == 64
+
+
+def test_model_v_is_reachable_from_entries():
+    assert Model(idx=0).V is ObjectSerializer
+    assert JSONModel(idx=0).V is JSONSerializer
+    assert CompressedModel(idx=0).V.compression == 'zlib'
+
+
+def test_model_save_uses_the_model_serializer(tmpdir):
+    with CompressedModel.open(tmpdir) as db:
+        db.create(idx=0)
+        with db.data(write=True) as res:
+            entry = CompressedModel(idx=1, payload='x' * 1000)
+            assert entry.save(1, res.db['entries'], res.txn)
+
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader] == [0, 1]
+
+
+def test_model_save_uses_the_binlog_serializer(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+
+    with CompressedModel.open(tmpdir) as db:
+        with pytest.warns(RuntimeWarning):
+            assert db.compression is None
+        with db.data(write=True) as res:
+            entry = CompressedModel(idx=1, payload='x' * 1000)
+            assert entry.save(1, res.db['entries'], res.txn, connection=db)
+
+    with Model.open(tmpdir) as db:
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader] == [0, 1]
+
+
+def _stored_serializer(db):
+    try:
+        with db.data(write=False) as res:
+            with Config.cursor(res) as cursor:
+                return cursor.get('serializer', default=None)
+    except lmdb.ReadonlyError:
+        # Nothing written yet.
+        return None
+
+
+def test_model_serializer_stored_on_first_write(tmpdir):
+    with JSONModel.open(tmpdir) as db:
+        with db.reader() as reader:
+            assert list(reader) == []
+        assert db.serializer == 'json'
+        assert _stored_serializer(db) is None
+
+        db.bulk_create([])
+        assert _stored_serializer(db) is None
+
+    with Model.open(tmpdir) as db:
+        assert db.serializer == 'pickle'
+        db.create(idx=0)
+        assert _stored_serializer(db) == 'pickle'
+
+    with JSONModel.open(tmpdir) as db:
+        with pytest.warns(RuntimeWarning):
+            assert db.serializer == 'pickle'
+        with db.reader() as reader:
+            assert reader[0] == {'idx': 0}
+
+
+def test_model_serializer_unknown(tmpdir):
+    class UnknownModel(Model):
+        __meta_serializer__ = 'unknown'
+
+    with pytest.raises(ValueError):
+        UnknownModel.open(tmpdir)
+
+
+def test_model_serializer_registered(tmpdir):
+    class EventSerializer(StructSerializer):
+        fields = (('ts', 'd'), )
+
+    class EventModel(Model):
+        __meta_serializer__ = 'test_event'
+
+    register_serializer('test_event', EventSerializer)
+    try:
+        with pytest.raises(ValueError):
+            register_serializer('test_event', JSONSerializer)
+
+        with EventModel.open(tmpdir) as db:
+            db.create(ts=1.5, path='/')
+            with db.reader() as reader:
+                assert reader[0] == {'ts': 1.5, 'path': '/'}
+    finally:
+        del SERIALIZERS['test_event']
+
+    with Model.open(tmpdir) as db:
+        with pytest.raises(ValueError):
+            db.create(ts=2.5)
+
+
+class CompressedModel(Model):
+    __meta_compression__ = 'zlib'
+    __meta_compression_threshold__ = 64
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_model_compression_from_meta(tmpdir, lazy):
+    entries = [{'idx': 0}, {'idx': 1, 'payload': 'x' * 1000}]
+    with CompressedModel.open(tmpdir) as db:
+        assert db.compression == 'zlib'
+        db.create(**entries[0])
+        db.bulk_create([CompressedModel(**entries[1])])
+
+        with db.data(write=False) as res:
+            get = lambda pk: bytes(res.txn.get(db.entries.K.db_value(pk),
+                                               db=res.db['entries']))
+            assert get(0)[:1] == b'\0'
+            assert get(1)[:1] == b'z'
+            assert len(get(1)) < 100
+
+        with db.reader(lazy=lazy) as reader:
+            assert [dict(e) for e in reader] == entries
+
+
+def test_model_compression_can_change(tmpdir):
+    with CompressedModel.open(tmpdir) as db:
+        db.create(payload='x' * 1000)
+
+    with Model.open(tmpdir) as db:
+        assert db.compression is None
+        db.create(payload='y' * 1000)
+
+    class LZMAModel(Model):
+        __meta_compression__ = 'lzma'
+
+    with LZMAModel.open(tmpdir) as db:
+        assert db.compression == 'lzma'
+        db.create(payload='z' * 1000)
+
+        with db.data(write=False) as res:
+            flags = [bytes(v[:1]) for v in res.txn.cursor(
+                res.db['entries']).iternext(keys=False)]
+            assert flags == [b'z', b'\0', b'x']
+
+        with db.reader() as reader:
+            assert [e['payload'][0] for e in reader] == ['x', 'y', 'z']
+
+
+@pytest.mark.parametrize("old", [False, True])
+def test_model_compression_not_added_to_binlogs_without_it(tmpdir, old):
+    if old:
+        _old_binlog(tmpdir)
+    else:
+        with Model.open(tmpdir) as db:
+            db.create(idx=0)
+
+    with CompressedModel.open(tmpdir) as db:
+        with pytest.warns(RuntimeWarning):
+            assert db.compression is None
+        db.create(payload='x' * 1000)
+
+    with CompressedModel.open(tmpdir) as db:
+        with pytest.warns(RuntimeWarning):
+            with db.reader() as reader:
+                assert [e.get('payload', '')[:1] for e in reader] == ['', 'x']
+
+
+def test_model_compression_unknown(tmpdir):
+    class UnknownModel(Model):
+        __meta_compression__ = 'unknown'
+
+    with pytest.raises(ValueError):
+        UnknownModel.open(tmpdir)
@@ -0,0 +1,64 @@
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from tempfile import TemporaryDirectory
+
+from binlog.index import TextIndex, NumericIndex
+from binlog.model import Model
+
+
+class IndexedModel(Model):
+    name = TextIndex(mandatory=True)
+    group = NumericIndex(mandatory=False)
+
+
+def _index_content(db):
+    content = {}
+    with db.data(write=False) as res:
+        for index_name, index in IndexedModel._indexes.items():
+            db_name = db._get_index_name(index_name)
+            with index.cursor(res, db_name=db_name) as cursor:
+                if cursor.first():
+                    content[index_name] = list(cursor.iternext())
+                else:
+                    content[index_name] = []
+    return content
+
+
+@given(values=st.lists(st.tuples(st.sampled_from(['a', 'b', 'c', 'zz']),
+                                 st.one_of(st.none(),
+                                           st.integers(min_value=0,
+                                                       max_value=5))),
+                       min_size=1, max_size=30))
+@settings(deadline=None, max_examples=30)
+def test_bulk_create_index_equals_create_index(values):
+    def _entries():
+        for name, group in values:
+            if group is None:
+                yield IndexedModel(name=name)
+            else:
+                yield IndexedModel(name=name, group=group)
+
+    with TemporaryDirectory() as bulkdir, TemporaryDirectory() as singledir:
+        with IndexedModel.open(bulkdir) as db:
+            db.bulk_create(list(_entries()))
+            bulk = _index_content(db)
+
+        with IndexedModel.open(singledir) as db:
+            for entry in _entries():
+                db.create(**entry)
+            single = _index_content(db)
+
+    assert bulk == single
+
+
+def test_bulk_create_index_sorted_by_pk(tmpdir):
+    with IndexedModel.open(tmpdir) as db:
+        db.bulk_create([IndexedModel(name='b' if i % 2 else 'a', group=i % 3)
+                        for i in range(20)])
+        db.bulk_create([IndexedModel(name='a') for _ in range(5)])
+
+        with db.reader() as reader:
+            assert [e.pk for e in reader.filter(name='a')] == (
+                list(range(0, 20, 2)) + list(range(20, 25)))
+            assert [e.pk for e in reader.filter(group=2)] == list(
+                range(2, 20, 3))
@@ -0,0 +1,69 @@
+import pytest
+
+from binlog.databases import Entries
+from binlog.index import TextIndex
+from binlog.model import Model
+
+
+class IndexedModel(Model):
+    name = TextIndex(mandatory=True)
+    address = TextIndex(mandatory=False)
+
+
+def test_create_raw_bytes(tmpdir):
+    with Model.open(tmpdir) as db:
+        assert db.create_raw(Entries.V.db_value({'test': 'data'})) == 0
+        assert db.create_raw(Entries.V.db_value({'test': 'data2'})) == 1
+
+        with db.reader() as reader:
+            assert reader[0] == {'test': 'data'}
+            assert reader[1] == {'test': 'data2'}
+
+
+def test_create_raw_memoryview(tmpdir):
+    with Model.open(tmpdir) as db:
+        raw = memoryview(Entries.V.db_value({'test': 'data'}))
+        pk = db.create_raw(raw)
+
+        with db.reader() as reader:
+            assert reader[pk] == {'test': 'data'}
+
+
+def test_create_raw_shares_ids_with_create(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+        assert db.create_raw(Entries.V.db_value({'idx': 1})) == 1
+        assert db.create(idx=2).pk == 2
+
+
+def test_create_raw_index(tmpdir):
+    with IndexedModel.open(tmpdir) as db:
+        db.create(name='a')
+        pk = db.create_raw(Entries.V.db_value({'name': 'b'}), name='b')
+
+        with db.reader() as reader:
+            assert [e.pk for e in reader.filter(name='b')] == [pk]
+
+
+def test_create_raw_mandatory_index(tmpdir):
+    with IndexedModel.open(tmpdir) as db:
+        with pytest.raises(ValueError):
+            db.create_raw(Entries.V.db_value({'name': 'b'}))
+
+
+def test_bulk_create_raw(tmpdir):
+    with IndexedModel.open(tmpdir) as db:
+        items = [(Entries.V.db_value({'name': n, 'idx': i}), {'name': n})
+                 for i, n in enumerate('abab')]
+        assert db.bulk_create_raw(items) == [0, 1, 2, 3]
+
+        with db.reader() as reader:
+            assert [e['idx'] for e in reader.filter(name='a')] == [0, 2]
+            assert [e['idx'] for e in reader.filter(name='b')] == [1, 3]
+
+
+def test_bulk_create_raw_without_index_values(tmpdir):
+    with Model.open(tmpdir) as db:
+        items = [(Entries.V.db_value({'idx': i}), None) for i in range(3)]
+        assert db.bulk_create_raw(items) == [0, 1, 2]
+        assert db.bulk_create_raw([]) == []
@@ -174,6 +174,140 @@ def test_reader_filter_exact_index_and_nonindex(tmpdir):
                     assert a.pk == b
 
 
+def test_reader_filter_raises_lmdb_errors(tmpdir):
+    from unittest.mock import patch
+
+    import lmdb
+
+    from binlog.reader import Reader
+
+    with Model.open(tmpdir) as db:
+        # Nothing stored yet
+        assert list(db.reader().filter(even=True)) == []
+
+        db.bulk_create([Model(idx=i, even=(i % 2 == 0)) for i in range(10)])
+
+        get_from_cursor = Reader._get_from_cursor
+
+        def failing(self, res, cursor, pk):
+            if pk >= 4:
+                raise lmdb.Error("failure")
+            return get_from_cursor(self, res, cursor, pk)
+
+        with db.reader() as r:
+            with patch.object(Reader, '_get_from_cursor', failing):
+                entries = r.filter(even=True)
+                assert [next(entries).pk, next(entries).pk] == [0, 2]
+                with pytest.raises(lmdb.Error):
+                    next(entries)
+
+
+def test_reader_explain_most_selective_index_first(tmpdir):
+    from binlog.index import NumericIndex
+
+    class MyModel(Model):
+        fizz = NumericIndex(mandatory=True)
+        buzz = NumericIndex(mandatory=True)
+
+    with MyModel.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i,
+                              fizz=int(i % 3 == 0),
+                              buzz=int(i % 5 == 0),
+                              even=(i % 2 == 0)) for i in range(100)])
+
+        with db.reader() as r:
+            plan = r.explain(fizz=1, buzz=1, even=True)
+            assert plan == {'indexes': [{'field': 'buzz', 'value': 1,
+                                         'rows': 20},
+                                        {'field': 'fizz', 'value': 1,
+                                         'rows': 34}],
+                            'entries': False,
+                            'registry': False,
+                            'filters': ['even'],
+                            'rows': 20}
+            assert [e.pk for e in r.filter(fizz=1, buzz=1, even=True)] == [
+                x for x in range(100) if x % 30 == 0]
+
+
+def test_reader_explain_without_index(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i, even=(i % 2 == 0)) for i in range(100)])
+
+        with db.reader() as r:
+            plan = r.explain(even=True)
+            assert plan['entries']
+            assert plan['indexes'] == []
+            assert plan['filters'] == ['even']
+            assert plan['rows'] == 100
+
+
+def test_reader_explain_value_not_indexed(tmpdir):
+    from binlog.index import NumericIndex
+
+    class MyModel(Model):
+        fizz = NumericIndex(mandatory=True)
+
+    with MyModel.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i, fizz=i % 3) for i in range(10)])
+
+        with db.reader() as r:
+            assert r.explain(fizz=5)['rows'] == 0
+            assert list(r.filter(fizz=5)) == []
+
+
+def test_reader_explain_empty_binlog(tmpdir):
+    with Model.open(tmpdir) as db:
+        with db.reader() as r:
+            assert r.explain(even=True)['rows'] == 0
+
+
+def test_reader_filter_skips_registry_until_acked(tmpdir):
+    from binlog.index import NumericIndex
+
+    class MyModel(Model):
+        fizz = NumericIndex(mandatory=True)
+
+    with MyModel.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i, fizz=int(i % 3 == 0))
+                        for i in range(30)])
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as r:
+            assert not r.explain(fizz=1)['registry']
+            assert len(list(r.filter(fizz=1))) == 10
+
+            r.ack(0)  # Not committed yet
+            assert r.explain(fizz=1)['registry']
+            assert [e.pk for e in r.filter(fizz=1)] == list(range(3, 30, 3))
+
+        with db.reader('myreader') as r:
+            assert r.explain(fizz=1)['registry']
+            assert [e.pk for e in r.filter(fizz=1)] == list(range(3, 30, 3))
+
+
+def test_reader_filter_skips_registry_without_acked_candidates(tmpdir):
+    from binlog.index import NumericIndex
+
+    class MyModel(Model):
+        fizz = NumericIndex(mandatory=True)
+
+    with MyModel.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i, fizz=int(i >= 20)) for i in range(30)])
+        db.register_reader('myreader')
+
+        with db.reader('myreader') as r:
+            r.ack_range(0, 10)
+
+        with db.reader('myreader') as r:
+            assert not r.explain(fizz=1)['registry']
+            assert [e.pk for e in r.filter(fizz=1)] == list(range(20, 30))
+
+            assert r.explain(fizz=0)['registry']
+            assert [e.pk for e in r.filter(fizz=0)] == list(range(10, 20))
+
+            assert r.explain()['registry']
+            assert [e.pk for e in r.filter()] == list(range(10, 30))
+
 @pytest.mark.parametrize("name", RESERVED_READER_NAMES)
 def test_cant_register_reserved_reader_names(tmpdir, name):
     with Model.open(tmpdir) as db:
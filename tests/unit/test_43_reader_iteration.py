@@ -73,3 +73,76 @@ def test_empty_reverse_iterator(tmpdir):
         with db.reader('myreader') as reader:
             for _ in reversed(reader):
                 assert False, "SHOULD be empty"
+
+
+@pytest.mark.parametrize("iterate", [iter, reversed])
+def test_reader_iteration_uses_one_data_transaction(tmpdir, iterate):
+    with Model.open(tmpdir) as db:
+        entries = [Model(idx=i) for i in range(10)]
+        db.bulk_create(entries)
+
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack(3)
+            reader.ack(4)
+
+            calls = 0
+            data = db.data
+
+            def counted_data(*args, **kwargs):
+                nonlocal calls
+                calls += 1
+                return data(*args, **kwargs)
+
+            db.data = counted_data
+            try:
+                read = [e.pk for e in iterate(reader)]
+            finally:
+                del db.data
+
+            expected = [0, 1, 2, 5, 6, 7, 8, 9]
+            if iterate is reversed:
+                expected.reverse()
+            assert read == expected
+            assert calls == 1
+
+
+@pytest.mark.parametrize("iterate", [iter, reversed])
+@pytest.mark.parametrize("name", [None, 'myreader'])
+def test_reader_iteration_reads_values_from_cursor(tmpdir, monkeypatch,
+                                                   iterate, name):
+    from binlog.reader import Reader
+
+    get_from_cursor = Reader._get_from_cursor
+    positioned = []
+
+    def checked(self, res, cursor, pk):
+        positioned.append(cursor.cursor.key() == Entries.K.db_value(pk))
+        return get_from_cursor(self, res, cursor, pk)
+
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack_batch([0, 3, 4, 9])
+
+        monkeypatch.setattr(Reader, '_get_from_cursor', checked)
+        with db.reader(name) as reader:
+            read = [e.pk for e in iterate(reader)]
+
+        assert len(read) == (10 if name is None else 6)
+        # No entry is looked up again with `txn.get`.
+        assert positioned == [True] * len(read)
+
+
+def test_reader_reversed_read_with_first_entries_acked(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create([Model(idx=i) for i in range(10)])
+
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            for pk in range(3):
+                reader.ack(pk)
+
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reversed(reader)] == list(range(9, 2, -1))
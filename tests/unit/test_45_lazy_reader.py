@@ -0,0 +1,91 @@
+from collections.abc import Mapping
+
+import pytest
+
+from binlog.databases import Entries
+from binlog.index import TextIndex
+from binlog.model import Model, LazyModel
+
+
+class IndexedModel(Model):
+    name = TextIndex(mandatory=True)
+
+
+def test_lazy_model_decodes_on_first_access():
+    entry = LazyModel(Model, 3, memoryview(Entries.V.db_value({'a': 1})))
+
+    assert isinstance(entry, Mapping)
+    assert entry.pk == 3
+    assert entry.saved
+    assert not entry.decoded
+
+    assert entry['a'] == 1
+    assert entry.decoded
+    assert entry == {'a': 1}
+    assert dict(entry) == {'a': 1}
+    assert entry.get('b') is None
+
+    model = entry.decode()
+    assert isinstance(model, Model)
+    assert model.pk == 3
+    assert model.saved
+
+
+def test_lazy_reader_iteration(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(5))
+
+        with db.reader(lazy=True) as reader:
+            entries = list(reader)
+            assert all(isinstance(e, LazyModel) for e in entries)
+            assert [e.pk for e in entries] == list(range(5))
+            assert not any(e.decoded for e in entries)
+
+            # Values are copied out of the read transaction.
+            assert [e['idx'] for e in entries] == list(range(5))
+            assert [e['idx'] for e in reversed(reader)] == list(
+                reversed(range(5)))
+
+
+def test_lazy_reader_getitem_and_slicing(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(5))
+
+        with db.reader(lazy=True) as reader:
+            assert isinstance(reader[1], LazyModel)
+            assert reader[1] == {'idx': 1}
+            assert reader[-1].pk == 4
+            assert [e['idx'] for e in reader[1:4]] == [1, 2, 3]
+            assert [e.pk for e in reader[::-2]] == [4, 2, 0]
+            with pytest.raises(IndexError):
+                reader[10]
+
+
+def test_lazy_reader_filter(tmpdir):
+    with IndexedModel.open(tmpdir) as db:
+        db.bulk_create(IndexedModel(name=n, idx=i)
+                       for i, n in enumerate('abab'))
+
+        with db.reader(lazy=True) as reader:
+            entries = list(reader.filter(name='a'))
+            assert [e.pk for e in entries] == [0, 2]
+            assert not any(e.decoded for e in entries)
+
+            assert [e.pk for e in reader.filter(name='b', idx=3)] == [3]
+
+
+def test_lazy_reader_ack(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(3))
+
+        db.register_reader('myreader')
+        with db.reader('myreader', lazy=True) as reader:
+            first = next(iter(reader))
+            assert reader.ack(first)
+            assert reader.is_acked(first)
+            assert not first.decoded
+            assert reader.ack_batch(reader.read_batch(10)) == 2
+
+        with db.reader('myreader') as reader:
+            assert list(reader) == []
+
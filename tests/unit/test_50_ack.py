@@ -63,3 +63,27 @@ def test_dont_accept_other_types(tmpdir):
         with db.reader('myreader') as reader:
             with pytest.raises(TypeError):
                 reader.ack({})
+
+
+def test_ack_range(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(10))
+
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack(5)
+            assert reader.ack_range(2, 8) == 5
+            assert reader.ack_range(3, 3) == 0
+            assert list(reader.registry.acked) == [(2, 7)]
+
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader] == [0, 1, 8, 9]
+
+
+def test_ack_range_on_anonymous_reader(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(test='data')
+
+        with db.reader() as reader:
+            with pytest.raises(RuntimeError):
+                reader.ack_range(0, 1)
@@ -0,0 +1,91 @@
+import random
+
+from hypothesis import given, settings
+from hypothesis import strategies as st
+import pytest
+
+from binlog.bitmap import BitmapDBRegistry, BLOCK_SIZE
+from binlog.model import Model
+from binlog.registry import S
+
+
+def test_register_reader_unknown_encoding(tmpdir):
+    with Model.open(tmpdir) as db:
+        with pytest.raises(ValueError):
+            db.register_reader('myreader', encoding='unknown')
+
+
+def test_bitmap_reader_stats(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader', encoding='bitmap')
+        assert db.reader_stats('myreader')['encoding'] == 'bitmap'
+
+        with db.reader('myreader') as reader:
+            assert isinstance(reader.registry.db, BitmapDBRegistry)
+            reader.ack_range(0, 10)
+            reader.ack(BLOCK_SIZE + 1)
+            reader.commit()
+            stats = reader.stats()
+
+        assert stats['segments'] == 2
+        assert stats['acked'] == 11
+        assert stats['first_unacked'] == 10
+
+
+@settings(max_examples=20, deadline=None)
+@given(acked=st.lists(st.integers(min_value=0, max_value=299)),
+       commit_every=st.integers(min_value=1, max_value=50))
+def test_bitmap_reader_iteration(tmpdir_factory, acked, commit_every):
+    tmpdir = tmpdir_factory.mktemp('bitmap')
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(300))
+        db.register_reader('myreader', encoding='bitmap')
+
+        with db.reader('myreader', commit_every=commit_every) as reader:
+            for pk in acked:
+                reader.ack(pk)
+
+            unacked = [pk for pk in range(300) if pk not in set(acked)]
+            assert [e.pk for e in reader] == unacked
+            assert [e.pk for e in reversed(reader)] == unacked[::-1]
+
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader] == unacked
+            assert reader.stats()['acked'] == len(set(acked))
+
+
+def test_bitmap_reader_random_acks(tmpdir):
+    pks = list(range(3 * BLOCK_SIZE))
+    random.shuffle(pks)
+
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader', encoding='bitmap')
+        with db.reader('myreader', commit_every=10000) as reader:
+            for pk in pks[:-5]:
+                reader.ack(pk)
+            reader.commit()
+
+            stats = reader.stats()
+            assert stats['segments'] == 3
+            assert stats['acked'] == len(pks) - 5
+            assert stats['first_unacked'] == min(pks[-5:])
+
+            for pk in pks[-5:]:
+                assert pk not in reader.registry
+            assert pks[0] in reader.registry
+
+
+def test_bitmap_reader_clone_and_purge(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(100))
+        db.register_reader('myreader', encoding='bitmap')
+        with db.reader('myreader') as reader:
+            reader.ack_range(10, 50)
+
+        db.clone_reader('myreader', 'clone')
+        assert db.reader_stats('clone')['encoding'] == 'bitmap'
+        with db.reader('clone') as reader:
+            assert reader.registry.db._get_segment_by_pos(0) == S(10, 49)
+            reader.ack_range(20, 60)
+
+        assert db.purge() == (40, 0)
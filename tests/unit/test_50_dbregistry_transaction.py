@@ -0,0 +1,129 @@
+from binlog.abstract import Direction
+from binlog.databases import Registry as RegistryDB
+from binlog.model import Model
+from binlog.registry import DBRegistry, Registry, S
+
+
+def _fragmented(db, name, entries):
+    db.bulk_create(Model(idx=i) for i in range(entries))
+    db.register_reader(name)
+    db.save_registry(name, Registry([S(i, i) for i in range(0, entries, 2)]))
+
+
+def test_dbregistry_holds_one_transaction(tmpdir):
+    with Model.open(tmpdir) as db:
+        _fragmented(db, 'myreader', 20)
+
+        with DBRegistry('myreader', db) as registry:
+            assert db._open_txns['readers_env'] == 0
+            assert list(registry) == list(range(0, 20, 2))
+            assert 4 in registry
+            assert 5 not in registry
+            assert db._open_txns['readers_env'] == 1
+
+        assert db._open_txns['readers_env'] == 0
+
+
+def test_dbregistry_refresh(tmpdir):
+    with Model.open(tmpdir) as db:
+        _fragmented(db, 'myreader', 20)
+
+        registry = DBRegistry('myreader', db, direction=Direction.F)
+        assert 5 not in registry
+
+        with db.readers(write=True) as res:
+            with RegistryDB.named('myreader').cursor(res) as cursor:
+                cursor.put(5, 5)
+        assert 5 not in registry
+
+        registry.refresh()
+        assert 5 in registry
+        registry.close()
+
+
+def test_save_registry_ends_registry_transactions(tmpdir):
+    with Model.open(tmpdir) as db:
+        _fragmented(db, 'myreader', 20)
+
+        registry = DBRegistry('myreader', db, direction=Direction.F)
+        assert 5 not in registry
+        assert db._open_txns['readers_env'] == 1
+
+        db.save_registry('myreader', Registry([S(5, 5)]))
+        assert db._open_txns['readers_env'] == 0
+        assert 5 in registry
+        registry.close()
+
+
+def test_uncommitted_acks_dont_stop_readers_map_growth(tmpdir):
+    with Model.open(tmpdir, map_size=2**16) as db:
+        db.bulk_create(Model(idx=i) for i in range(10))
+        db.register_reader('reader_a')
+        db.register_reader('reader_b')
+
+        with db.reader('reader_a') as reader_a, \
+                db.reader('reader_b') as reader_b:
+            # Not committed, its registry keeps a read transaction.
+            reader_a.ack(0)
+
+            for pk in range(0, 20000, 2):
+                reader_b.ack(pk)
+                reader_b.commit()
+
+            assert db.stats()['map_growths']
+            assert reader_a.is_acked(db.reader()[0])
+
+        assert db.reader_stats('reader_a')['acked'] == 1
+        assert db.reader_stats('reader_b')['acked'] == 10000
+
+
+def test_reader_iteration_ends_registry_transaction(tmpdir):
+    with Model.open(tmpdir) as db:
+        _fragmented(db, 'myreader', 20)
+
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader] == list(range(1, 20, 2))
+            assert [e.pk for e in reversed(reader)] == list(
+                range(19, 0, -2))
+            assert [e.pk for e in reader.filter(idx=3)] == [3]
+            assert db._open_txns['readers_env'] == 0
+
+            assert reader.ack(3)
+            assert [e.pk for e in reader][:2] == [1, 5]
+
+
+def test_reader_operations_end_reader_registry_transaction(tmpdir):
+    with Model.open(tmpdir) as db:
+        _fragmented(db, 'myreader', 20)
+
+        with db.reader('myreader') as reader:
+            for entry in reader:
+                assert not reader.is_acked(entry)
+                reader.ack(entry)
+                # Shared with the iteration until it ends
+                assert db._open_txns['readers_env'] > 0
+            assert db._open_txns['readers_env'] == 0
+
+            assert list(reader[:]) == []
+            assert list(reader.filter(idx=3)) == []
+            assert list(reader.follow(timeout=0.01)) == []
+            assert db._open_txns['readers_env'] == 0
+
+            assert reader.ack_range(0, 2) == 0
+            reader.commit()
+            assert db._open_txns['readers_env'] == 0
+
+
+def test_reader_sees_acks_committed_by_other_reader(tmpdir):
+    with Model.open(tmpdir) as db:
+        _fragmented(db, 'myreader', 20)
+        entry = db.reader()[1]
+
+        with db.reader('myreader') as reader:
+            assert not reader.is_acked(entry)
+
+            with db.reader('myreader') as other:
+                other.ack(entry)
+
+            assert reader.is_acked(entry)
+            assert 1 not in [e.pk for e in reader]
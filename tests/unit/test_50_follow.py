@@ -0,0 +1,175 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from binlog.model import Model
+from binlog.notify import Notifier, Subscription, notify
+
+
+def _delayed_create(path, count):
+    time.sleep(0.1)
+    with Model.open(path) as db:
+        for i in range(count):
+            db.create(idx=i)
+
+
+def test_follow_yields_existing_entries(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(3))
+
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack(1)
+            assert [e['idx'] for e in reader.follow(timeout=0.01)] == [0, 2]
+
+
+def test_follow_does_not_repeat_unacked_entries(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+
+        with db.reader() as reader:
+            follow = reader.follow(timeout=0.05)
+            assert next(follow)['idx'] == 0
+
+            db.create(idx=1)
+            assert [e['idx'] for e in follow] == [1]
+
+
+class BlockModel(Model):
+    __meta_id_block_size__ = 10
+
+
+def test_follow_yields_entries_stored_below_the_last_one(tmpdir):
+    with BlockModel.open(tmpdir) as db:
+        db.create(idx=0)
+
+        # Another writer reserves the next block and writes on it.
+        with db.data(write=True) as res:
+            db._update_next_event_idx(res, 20)
+            with res.txn.cursor(res.db['entries']) as cursor:
+                cursor.put(BlockModel.K.db_value(10),
+                           db.entries.V.db_value({'idx': 10}))
+
+        with db.reader() as reader:
+            follow = reader.follow(timeout=0.05)
+            assert [next(follow)['idx'] for _ in range(2)] == [0, 10]
+
+            db.create(idx=1)
+            assert [e['idx'] for e in follow] == [1]
+
+def test_follow_timeout(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            start = time.monotonic()
+            assert list(reader.follow(timeout=0.05)) == []
+            assert time.monotonic() - start >= 0.05
+
+
+def test_follow_is_woken_by_other_process(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        ctx = multiprocessing.get_context('spawn')
+        writer = ctx.Process(target=_delayed_create, args=(str(tmpdir), 3))
+        writer.start()
+        try:
+            with db.reader('myreader') as reader:
+                entries = []
+                for entry in reader.follow(timeout=10):
+                    entries.append(entry['idx'])
+                    reader.ack(entry)
+                    if len(entries) == 3:
+                        break
+                assert entries == [0, 1, 2]
+        finally:
+            writer.join()
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason="Needs FIFO support")
+def test_notify_wakes_subscription(tmpdir):
+    directory = str(tmpdir.join('notify'))
+    with Subscription(directory) as subscription:
+        assert not subscription.wait(0)
+
+        assert notify(directory) == 1
+        assert notify(directory) == 1
+        assert subscription.wait(0)
+        # Pending notifications are consumed together.
+        assert not subscription.wait(0)
+
+    assert os.listdir(directory) == []
+    assert notify(directory) == 0
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason="Needs FIFO support")
+def test_notify_removes_dead_subscriptions(tmpdir):
+    directory = tmpdir.join('notify')
+    directory.mkdir()
+    os.mkfifo(str(directory.join('dead')))
+
+    assert notify(str(directory)) == 0
+    assert os.listdir(str(directory)) == []
+
+
+def test_notify_without_subscriptions(tmpdir):
+    assert notify(str(tmpdir.join('notify'))) == 0
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason="Needs FIFO support")
+def test_notify_removes_unopened_subscriptions_of_dead_processes(tmpdir):
+    dead = multiprocessing.get_context('spawn').Process(target=time.sleep,
+                                                        args=(0, ))
+    dead.start()
+    dead.join()
+
+    directory = tmpdir.join('notify')
+    directory.mkdir()
+    os.mkfifo(str(directory.join('.%d-dead' % dead.pid)))
+    os.mkfifo(str(directory.join('.%d-opening' % os.getpid())))
+
+    assert notify(str(directory)) == 0
+    assert os.listdir(str(directory)) == ['.%d-opening' % os.getpid()]
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason="Needs FIFO support")
+def test_notifier_skips_empty_directory(tmpdir, monkeypatch):
+    directory = tmpdir.join('notify')
+    directory.mkdir()
+    os.utime(str(directory), (time.time() - 10, time.time() - 10))
+    notifier = Notifier(str(directory))
+    assert notifier() == 0
+
+    def fail(*_):
+        assert False, "listed"
+
+    with monkeypatch.context() as m:
+        m.setattr(os, 'listdir', fail)
+        assert notifier() == 0
+
+    with Subscription(str(directory)) as subscription:
+        assert notifier() == 1
+        assert subscription.wait(0)
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason="Needs FIFO support")
+def test_only_stored_entries_notify(tmpdir):
+    with Model.open(tmpdir) as db:
+        directory = db._gen_path('notify_directory')
+        with Subscription(directory) as subscription:
+            db.reserve_ids(10)
+            db.register_reader('myreader')
+            with db.data(write=True):
+                pass
+            assert not subscription.wait(0)
+
+            db.create(idx=0)
+            assert subscription.wait(0)
+
+            db.bulk_create([Model(idx=1)])
+            assert subscription.wait(0)
+
+            with db.batched_writer() as writer:
+                writer.create(idx=2)
+            assert subscription.wait(0)
@@ -0,0 +1,128 @@
+import multiprocessing
+import time
+
+from hypothesis import given
+from hypothesis import strategies as st
+import pytest
+
+from binlog.model import Model
+from binlog.registry import Registry
+
+
+def test_read_batch_limits_entries(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(10))
+
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            batch = reader.read_batch(4)
+            assert [e['idx'] for e in batch] == [0, 1, 2, 3]
+
+            assert reader.ack_batch(batch) == 4
+            assert [e['idx'] for e in reader.read_batch(100)] == list(
+                range(4, 10))
+
+
+def test_read_batch_invalid_size(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            with pytest.raises(ValueError):
+                reader.read_batch(0)
+
+
+def test_read_batch_empty_returns_immediately(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            assert reader.read_batch(10) == []
+
+
+def test_read_batch_timeout_expires(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            start = time.monotonic()
+            assert reader.read_batch(10, timeout=0.05) == []
+            assert time.monotonic() - start >= 0.05
+
+
+def _delayed_create(path):
+    time.sleep(0.05)
+    with Model.open(path) as db:
+        db.create(idx=0)
+
+
+def test_read_batch_timeout_waits_for_entries(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        ctx = multiprocessing.get_context('spawn')
+        writer = ctx.Process(target=_delayed_create,
+                             args=(str(tmpdir), ))
+        writer.start()
+        try:
+            with db.reader('myreader') as reader:
+                batch = reader.read_batch(10, timeout=5)
+                assert [e['idx'] for e in batch] == [0]
+        finally:
+            writer.join()
+
+
+def test_read_batch_timeout_waits_for_notifications(tmpdir, monkeypatch):
+    def sleep(seconds):
+        raise AssertionError("read_batch must not poll")
+
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        ctx = multiprocessing.get_context('spawn')
+        writer = ctx.Process(target=_delayed_create,
+                             args=(str(tmpdir), ))
+        writer.start()
+        try:
+            monkeypatch.setattr(time, 'sleep', sleep)
+            with db.reader('myreader') as reader:
+                batch = reader.read_batch(10, timeout=5)
+                assert [e['idx'] for e in batch] == [0]
+        finally:
+            monkeypatch.undo()
+            writer.join()
+
+
+def test_ack_batch_counts_new_entries(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(10))
+
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            reader.ack(3)
+            assert reader.ack_batch([reader[2], 3, 4, 4, 8]) == 3
+            assert list(reader.registry.acked) == [(2, 4), (8, 8)]
+
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader] == [0, 1, 5, 6, 7, 9]
+
+
+def test_ack_batch_on_anonymous_reader(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.create(idx=0)
+        with db.reader() as reader:
+            with pytest.raises(RuntimeError):
+                reader.ack_batch([0])
+
+
+@given(first=st.lists(st.integers(min_value=0, max_value=100)),
+       second=st.lists(st.integers(min_value=0, max_value=100)))
+def test_registry_update_is_equivalent_to_add(first, second):
+    expected = Registry()
+    for idx in first + second:
+        expected.add(idx)
+
+    registry = Registry()
+    registry.update(first)
+    assert registry.update(second) == len(set(second) - set(first))
+    assert registry.acked == expected.acked
+
+
+def test_registry_update_only_accept_integers():
+    with pytest.raises(TypeError):
+        Registry().update([None])
@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from binlog.model import Model
+
+
+@pytest.fixture
+def db(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(100))
+        db.register_reader('myreader')
+        yield db
+
+
+def test_no_policy_commits_on_close(db):
+    with db.reader('myreader') as reader:
+        for pk in range(10):
+            reader.ack(pk)
+        assert reader.commits == 0
+        assert reader.stats()['acked'] == 0
+
+    assert db.reader_stats('myreader')['acked'] == 10
+
+
+def test_commit_every(db):
+    with db.reader('myreader', commit_every=3) as reader:
+        for pk in range(10):
+            reader.ack(pk)
+        # Already acked entries don't count.
+        reader.ack(0)
+
+        stats = reader.stats()
+        assert stats['commits'] == 3
+        assert stats['acked'] == 9
+        assert stats['pending_acks'] == 1
+        assert stats['last_commit_latency'] > 0
+        assert stats['mean_commit_latency'] > 0
+
+        reader.ack_batch(range(10, 20))
+        assert reader.commits == 4
+        assert reader.pending_acks == 0
+
+
+def test_commit_interval(db):
+    with db.reader('myreader', commit_interval=0.05) as reader:
+        reader.ack(0)
+        assert reader.commits == 0
+
+        time.sleep(0.05)
+        reader.ack(1)
+        assert reader.commits == 1
+        assert db.reader_stats('myreader')['acked'] == 2
+
+
+def test_commit_max_segments(db):
+    with db.reader('myreader', commit_max_segments=2) as reader:
+        reader.ack(0)
+        reader.ack(2)
+        reader.ack(1)
+        reader.ack(4)
+        assert reader.commits == 0
+
+        reader.ack(6)
+        assert reader.commits == 1
+        # The in-memory registry is emptied on commit.
+        assert reader.registry.acked == []
+        assert all(pk in reader.registry for pk in (0, 1, 2, 4, 6))
+        assert [e.pk for e in reader][:3] == [3, 5, 7]
+
+
+def test_invalid_policy(db):
+    for option in ('commit_every', 'commit_interval', 'commit_max_segments'):
+        with pytest.raises(ValueError):
+            db.reader('myreader', **{option: 0})
+
+
+@pytest.mark.parametrize('encoding', ['segments', 'bitmap'])
+def test_commit_every_while_iterating_grows_readers_map(tmpdir, encoding):
+    with Model.open(tmpdir, map_size=2**16) as db:
+        db.bulk_create(Model(idx=i) for i in range(20000))
+        db.register_reader('myreader', encoding=encoding)
+
+        with db.reader('myreader', commit_every=500) as reader:
+            for entry in reader:
+                if entry.pk % 2 == 0:
+                    reader.ack(entry)
+            assert reader.commits == 20
+
+        assert any(env == 'readers_env'
+                   for env, _, _ in db.stats()['map_growths'])
+        assert db.reader_stats('myreader')['acked'] == 10000
+        with db.reader('myreader') as reader:
+            assert [e.pk for e in reader][:3] == [1, 3, 5]
@@ -0,0 +1,145 @@
+import pytest
+
+from binlog.exceptions import ReaderDoesNotExist
+from binlog.model import Model
+from binlog.registry import DBRegistry, Registry, S
+
+
+def test_reader_stats_new_reader(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        assert db.reader_stats('myreader') == {'segments': 0,
+                                               'acked': 0,
+                                               'first_unacked': 0,
+                                               'committed_at': None,
+                                               'encoding': 'segments'}
+
+
+def test_reader_stats_after_commit(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(10))
+
+        db.register_reader('myreader')
+        with db.reader('myreader') as reader:
+            for pk in (0, 1, 2, 5, 7, 8):
+                reader.ack(pk)
+
+            # Not committed yet
+            assert reader.stats()['acked'] == 0
+
+            reader.commit()
+            stats = reader.stats()
+            assert stats['segments'] == 3
+            assert stats['acked'] == 6
+            assert stats['first_unacked'] == 3
+            assert stats['committed_at'] is not None
+
+            reader.ack_range(3, 7)
+            reader.commit()
+            stats = reader.stats()
+            assert stats['segments'] == 1
+            assert stats['acked'] == 9
+            assert stats['first_unacked'] == 9
+
+        assert db.reader_lag() == {'myreader': 1}
+
+
+def test_reader_stats_match_registry(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        for segment in ([S(10, 12)], [S(1, 1), S(20, 30)], [S(2, 9)],
+                        [S(40, 40)], [S(31, 39)]):
+            db.save_registry('myreader', Registry(segment))
+
+            with DBRegistry('myreader', db) as registry:
+                acked = list(registry)
+                stats = db.reader_stats('myreader')
+                assert stats['acked'] == len(acked)
+                assert stats['segments'] == len(registry)
+
+
+def test_reader_stats_without_stored_stats(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        db.save_registry('myreader', Registry([S(0, 4), S(6, 6)]))
+
+        # Registries saved by older versions have no stats.
+        with db.readers(write=True) as res:
+            res.txn.delete(b'myreader', db=res.db['readerstats'])
+
+        stats = db.reader_stats('myreader')
+        assert stats['segments'] == 2
+        assert stats['acked'] == 6
+        assert stats['first_unacked'] == 5
+        assert stats['committed_at'] is None
+
+
+def test_reader_stats_clone_and_unregister(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('src')
+        db.save_registry('src', Registry([S(0, 4)]))
+
+        db.clone_reader('src', 'dst')
+        assert db.reader_stats('dst') == db.reader_stats('src')
+
+        db.unregister_reader('src')
+        assert db.list_readers() == ['dst']
+        with pytest.raises(ReaderDoesNotExist):
+            db.reader_stats('src')
+
+
+def test_reader_lag(tmpdir):
+    with Model.open(tmpdir) as db:
+        assert db.reader_lag() == {}
+
+        db.register_reader('a')
+        db.register_reader('b')
+        assert db.reader_lag() == {'a': 0, 'b': 0}
+
+        db.bulk_create(Model(idx=i) for i in range(10))
+        db.save_registry('a', Registry([S(0, 3), S(8, 8)]))
+        assert db.reader_lag() == {'a': 5, 'b': 10}
+
+
+@pytest.mark.parametrize('encoding', ['segments', 'bitmap'])
+def test_reader_lag_ignores_acks_past_last_entry(tmpdir, encoding):
+    with Model.open(tmpdir) as db:
+        db.bulk_create(Model(idx=i) for i in range(10))
+        db.register_reader('a', encoding=encoding)
+        with db.reader('a') as reader:
+            reader.ack_range(0, 5)
+            reader.ack_range(100, 200)
+            reader.ack(9)
+            reader.ack(10)
+
+        assert db.reader_stats('a')['acked'] == 107
+        assert db.reader_lag() == {'a': 4}
+
+
+class BlockModel(Model):
+    __meta_id_block_size__ = 10
+
+
+def test_reader_lag_counts_unused_and_removed_pks(tmpdir):
+    with BlockModel.open(tmpdir) as db:
+        db.register_reader('a')
+        db.bulk_create(BlockModel(idx=i) for i in range(3))
+        with db.reader('a') as reader:
+            reader.ack(reader[0])
+        assert db.remove(db.reader('a')[0])
+
+    # The reserved pks 3..9 are never used.
+    with BlockModel.open(tmpdir) as db:
+        assert [db.create(idx=i).pk for i in range(2)] == [10, 11]
+        db.register_reader('b')
+        db.save_registry('b', Registry([S(0, 1), S(11, 11)]))
+
+        # Stored entries 1, 2, 10 and 11 but pks 0..11 are counted.
+        assert db.reader_lag() == {'a': 11, 'b': 9}
+
+
+def test_anonymous_reader_stats(tmpdir):
+    with Model.open(tmpdir) as db:
+        with db.reader() as reader:
+            with pytest.raises(RuntimeError):
+                reader.stats()
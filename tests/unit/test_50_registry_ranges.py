@@ -0,0 +1,71 @@
+import pytest
+
+from binlog.abstract import Direction
+from binlog.model import Model
+from binlog.registry import Registry, S
+
+ACKED = [S(0, 9), S(20, 29), S(100, 100)]
+
+
+def _ranges(iterseek):
+    ranges = []
+    while True:
+        try:
+            ranges.append(iterseek.next_range())
+        except StopIteration:
+            return ranges
+
+
+@pytest.mark.parametrize("encoding", ['segments', 'bitmap'])
+def test_dbregistry_next_range(tmpdir, encoding):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader', encoding=encoding)
+        db.save_registry('myreader', Registry(list(ACKED)))
+
+        with db.reader('myreader') as reader:
+            registry = reader.registry.db
+            assert _ranges(registry) == ACKED
+
+            registry.seek(25)
+            assert _ranges(registry) == [S(25, 29), S(100, 100)]
+
+            with ~registry as inverted:
+                assert _ranges(inverted) == [S(10, 19), S(30, 99),
+                                             S(101, S.MAX)]
+
+            with type(registry)('myreader', db,
+                                direction=Direction.B) as backward:
+                backward.seek(25)
+                assert _ranges(backward) == [S(20, 25), S(0, 9)]
+
+            registry.close()
+
+
+@pytest.mark.parametrize("encoding", ['segments', 'bitmap'])
+def test_reader_iterseek_next_range(tmpdir, encoding):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader', encoding=encoding)
+        db.save_registry('myreader', Registry([S(0, 9)]))
+
+        with db.reader('myreader') as reader:
+            reader.ack_range(20, 30)
+            with reader._iterseek(Direction.F) as unacked:
+                assert unacked.next_range() == S(10, 19)
+                assert unacked.next_range() == S(30, S.MAX)
+
+
+def test_acked_by_one_reader_but_not_by_other(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('a')
+        db.register_reader('b', encoding='bitmap')
+        with db.reader('a') as a, db.reader('b') as b:
+            a.ack_range(0, 50)
+            b.ack_range(20, 30)
+            b.ack_range(40, 60)
+            b.commit()
+
+            it = a.registry - b.registry
+            assert _ranges(it) == [S(0, 19), S(30, 39)]
+
+            it.seek(35)
+            assert list(it) == list(range(35, 40))
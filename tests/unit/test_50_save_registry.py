@@ -0,0 +1,63 @@
+from tempfile import TemporaryDirectory
+
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from binlog.databases import Registry as RegistryDB
+from binlog.model import Model
+from binlog.registry import Registry, S
+
+
+def _stored_segments(db, name):
+    with db.readers(write=False) as res:
+        with RegistryDB.named(name).cursor(res) as cursor:
+            return [S(L, R) for R, L in cursor.iternext()]
+
+
+def _registry(idxs):
+    registry = Registry()
+    registry.update(idxs)
+    return registry
+
+
+@given(saves=st.lists(st.sets(st.integers(min_value=0, max_value=60)),
+                      max_size=6))
+@settings(deadline=None)
+def test_save_registry_merges_segments(saves):
+    with TemporaryDirectory() as tmpdir:
+        with Model.open(tmpdir) as db:
+            db.register_reader('myreader')
+
+            acked = set()
+            for idxs in saves:
+                db.save_registry('myreader', _registry(idxs))
+                acked |= idxs
+
+                segments = _stored_segments(db, 'myreader')
+                assert segments == _registry(acked).acked
+
+                stats = db.reader_stats('myreader')
+                assert stats['segments'] == len(segments)
+                assert stats['acked'] == len(acked)
+
+
+def test_save_registry_keeps_unrelated_segments(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        db.save_registry('myreader', Registry([S(0, 0), S(10, 10)]))
+        db.save_registry('myreader', Registry([S(1, 1)]))
+        db.save_registry('myreader', Registry([S(20, 20)]))
+        db.save_registry('myreader', Registry([S(3, 8)]))
+
+        assert _stored_segments(db, 'myreader') == [
+            S(0, 1), S(3, 8), S(10, 10), S(20, 20)]
+
+
+def test_save_registry_bridges_stored_segments(tmpdir):
+    with Model.open(tmpdir) as db:
+        db.register_reader('myreader')
+        db.save_registry('myreader', Registry([S(0, 2), S(4, 6), S(9, 9)]))
+        db.save_registry('myreader', Registry([S(3, 3), S(7, 8)]))
+
+        assert _stored_segments(db, 'myreader') == [S(0, 9)]
+        assert db.reader_stats('myreader')['segments'] == 1